@@ -0,0 +1,135 @@
+"""Benchmark the job store on its real code path, job.json snapshots included.
+
+* Memory per job: the compact JobRecord vs the previous pydantic Job.
+* Step transitions for N jobs that carry a realistic script in their pipeline
+  data: the time a transition costs its caller (usually the event loop), and
+  the snapshot writes behind it. "sync" is the previous persistence — build
+  the Job model and write job.json on every change, on the caller's thread;
+  "compact" is JobStore as it is, writing from its own thread.
+
+    cd backend
+    python -m benchmarks.bench_job_store --jobs 2000
+"""
+
+import argparse
+import gc
+import json
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from config import config
+from job_store import JobRecord, JobStore, PIPELINE_STEPS
+from models import GenerateRequest, Job, PipelineStep
+
+CONFIG = GenerateRequest(title="The Lost City of Petra", prompt="A documentary about Petra").model_dump()
+SCRIPT = {
+    "full_text": "Narration. " * 1500,
+    "scenes": [
+        {"scene_id": f"scene_{i}", "name": f"Scene {i}", "narration": "Narration. " * 75, "word_count": 150,
+         "estimated_duration_seconds": 60.0, "visual_keywords": ["Petra", "desert", "sandstone"]}
+        for i in range(1, 21)
+    ],
+    "total_word_count": 3000,
+    "estimated_duration_minutes": 20.0,
+}
+
+
+class _SyncSnapshotStore(JobStore):
+    """The previous persistence: the API model, dumped and written on every change."""
+
+    def _persist(self, job_id: str):
+        self._write(job_id)
+
+    def _write(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if not job:
+            return
+        path = config.TEMP_DIR / job_id / "job.json"
+        snapshot = {
+            "job": job.to_model().model_dump(mode="json"),
+            "pipeline_data": self._pipeline_data.get(job_id, {}),
+        }
+        with self._persist_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(snapshot, default=str), encoding="utf-8")
+            tmp.replace(path)
+
+
+def _memory_per_job(make, n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    jobs = [make() for _ in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del jobs
+    return (after - before) / n
+
+
+def _legacy_job() -> Job:
+    return Job(
+        job_id=str(uuid.uuid4()),
+        config=dict(CONFIG),
+        steps=[PipelineStep(step=n, name=name, description=desc) for n, name, desc in PIPELINE_STEPS],
+        created_at=datetime.utcnow(),
+    )
+
+
+def _transitions(store: JobStore, n: int) -> dict:
+    writes = [0]
+    write = store._write
+
+    def counted(job_id: str):
+        writes[0] += 1
+        write(job_id)
+
+    store._write = counted
+    ids = [store.create_job(dict(CONFIG)).job_id for _ in range(n)]
+    for job_id in ids:
+        store.set_pipeline_data(job_id, "script", SCRIPT)
+
+    t0 = time.perf_counter()
+    for job_id in ids:
+        for step, _name, _desc in PIPELINE_STEPS:
+            store.start_step(job_id, step, "Working…")
+            store.complete_step(job_id, step, "Done")
+    caller = (time.perf_counter() - t0) / (n * len(PIPELINE_STEPS) * 2)
+
+    t0 = time.perf_counter()
+    store.flush()  # what the writer thread has not written yet
+    return {"caller": caller, "flush": time.perf_counter() - t0, "writes": writes[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=2000)
+    args = parser.parse_args()
+
+    legacy_mem = _memory_per_job(_legacy_job, 100_000)
+    compact_mem = _memory_per_job(lambda: JobRecord(str(uuid.uuid4()), dict(CONFIG)), 100_000)
+    print(f"memory     pydantic {legacy_mem / 1024:.2f} KiB/job | compact {compact_mem / 1024:.2f} KiB/job")
+
+    transitions = args.jobs * len(PIPELINE_STEPS) * 2
+    print(f"{args.jobs} jobs, {transitions} transitions, job.json snapshots on")
+    results = {}
+    for name, store_cls in (("sync", _SyncSnapshotStore), ("compact", JobStore)):
+        config.TEMP_DIR = Path(tempfile.mkdtemp(prefix="bench-job-store-"))
+        try:
+            r = _transitions(store_cls(), args.jobs)
+        finally:
+            shutil.rmtree(config.TEMP_DIR, ignore_errors=True)
+        results[name] = r
+        print(f"{name:<10} {r['caller'] * 1e6:8.2f} µs/transition on the caller | "
+              f"{r['writes']:6d} job.json writes | final flush {r['flush'] * 1e3:.0f} ms")
+    print(f"transitions ×{results['sync']['caller'] / results['compact']['caller']:.0f} cheaper for the caller, "
+          f"×{results['sync']['writes'] / results['compact']['writes']:.0f} fewer writes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark phase 1: two-call (analyze → script) vs fused single-call path.
+
+Hits the real Claude API, so it needs ANTHROPIC_API_KEY in backend/.env.
+
+    cd backend
+    python -m benchmarks.bench_phase1 --runs 3 --duration 5
+"""
+
+import argparse
+import statistics
+import time
+
+from config import config
+from pipeline import analyzer, script_gen
+
+TITLE = "The Lost City of Petra"
+PROMPT = (
+    "A documentary about Petra in Jordan: how the Nabataeans carved it into rock, "
+    "how they managed water in the desert, why the city declined, and how it was "
+    "rediscovered by the western world in 1812."
+)
+
+analyzer_client = analyzer.client
+script_client = script_gen.client
+
+
+class _RecordingMessages:
+    """Wraps client.messages to record per-call latency and output tokens."""
+
+    def __init__(self, messages, calls: list):
+        self._messages = messages
+        self._calls = calls
+
+    def create(self, **kwargs):
+        t0 = time.perf_counter()
+        response = self._messages.create(**kwargs)
+        self._calls.append({
+            "latency": time.perf_counter() - t0,
+            "output_tokens": response.usage.output_tokens,
+            "input_tokens": response.usage.input_tokens,
+        })
+        return response
+
+
+class _RecordingClient:
+    def __init__(self, client, calls: list):
+        self.messages = _RecordingMessages(client.messages, calls)
+
+
+def _two_call(duration: int) -> list:
+    calls: list = []
+    analyzer.client = _RecordingClient(analyzer_client, calls)
+    script_gen.client = _RecordingClient(script_client, calls)
+    analysis = analyzer.analyze_prompt(TITLE, PROMPT, "documentary", duration, "en")
+    script_gen.generate_script(TITLE, analysis, duration)
+    return calls
+
+
+def _fused(duration: int) -> list:
+    calls: list = []
+    script_gen.client = _RecordingClient(script_client, calls)
+    script_gen.analyze_and_generate_script(TITLE, PROMPT, "documentary", duration, "en")
+    return calls
+
+
+def _summarise(name: str, runs: list):
+    latencies = [sum(c["latency"] for c in calls) for calls in runs]
+    out_tokens = [sum(c["output_tokens"] for c in calls) for calls in runs]
+    in_tokens = [sum(c["input_tokens"] for c in calls) for calls in runs]
+    print(
+        f"{name:<10} "
+        f"latency {statistics.mean(latencies):6.1f}s (min {min(latencies):.1f}s) | "
+        f"output tokens {statistics.mean(out_tokens):7.0f} | "
+        f"input tokens {statistics.mean(in_tokens):6.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--duration", type=int, default=5, help="Target duration in minutes")
+    args = parser.parse_args()
+    config.LLM_CACHE_ENABLED = False  # every run must reach Claude
+
+    two_call_runs, fused_runs = [], []
+    for i in range(args.runs):
+        print(f"[bench] run {i + 1}/{args.runs}")
+        two_call_runs.append(_two_call(args.duration))
+        fused_runs.append(_fused(args.duration))
+
+    _summarise("two-call", two_call_runs)
+    _summarise("fused", fused_runs)
+
+
+if __name__ == "__main__":
+    main()
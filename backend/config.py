@@ -26,14 +26,81 @@ class Config:
     # Claude
     CLAUDE_MODEL: str = "claude-sonnet-4-6"
 
+    # Claude response cache (see pipeline/llm_cache.py)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False")
+    LLM_CACHE_DIR:     Path = Path(os.getenv("LLM_CACHE_DIR", os.path.join(os.getenv("TEMP_DIR", "temp"), "llm_cache")))
+    LLM_CACHE_TTL_HOURS: float = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+    LLM_CACHE_MAX_MB:    float = float(os.getenv("LLM_CACHE_MAX_MB", "200"))
+    # Comma-separated call sites that always go to Claude, e.g. "script,script_edit"
+    LLM_CACHE_DISABLED_SITES: set = {
+        s.strip() for s in os.getenv("LLM_CACHE_DISABLED_SITES", "").split(",") if s.strip()
+    }
+
+    # Step 5: seconds Claude may take to refine the local edit plan ("auto" planner).
+    # 0 keeps step 5 fully local.
+    BLUEPRINT_LLM_BUDGET_S: float = float(os.getenv("BLUEPRINT_LLM_BUDGET_S", "0"))
+
     # Pexels
     PEXELS_VIDEO_API: str = "https://api.pexels.com/videos/search"
     PEXELS_PHOTO_API: str = "https://api.pexels.com/v1/search"
     PEXELS_PER_PAGE:  int = 5
 
+    # Resume jobs interrupted mid-render (phase 3) when the server restarts
+    RESUME_ON_STARTUP: bool = os.getenv("RESUME_ON_STARTUP", "1") not in ("0", "false", "False")
+
+    # job.json snapshots are written this long after a change, one write per burst
+    JOB_PERSIST_DELAY_S: float = float(os.getenv("JOB_PERSIST_DELAY_S", "0.5"))
+
+    # /api/generate deduplication: Idempotency-Key lifetime, and an optional window
+    # in which an identical request returns the existing job (0 = off)
+    IDEMPOTENCY_TTL_HOURS:     float = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+    GENERATE_DEDUPE_WINDOW_S:  float = float(os.getenv("GENERATE_DEDUPE_WINDOW_S", "0"))
+
+    # Retention (see pipeline/janitor.py). 0 disables the TTL / quota.
+    JOB_RETENTION_HOURS:     float = float(os.getenv("JOB_RETENTION_HOURS", "72"))
+    IDLE_JOB_TTL_HOURS:      float = float(os.getenv("IDLE_JOB_TTL_HOURS", "72"))
+    CLEAN_TEMP_AFTER_EXPORT: bool  = os.getenv("CLEAN_TEMP_AFTER_EXPORT", "1") not in ("0", "false", "False")
+    # Hours the files scene footage replacement and variants re-render from outlive the export (0 = none)
+    KEEP_EDIT_FILES_HOURS:   float = float(os.getenv("KEEP_EDIT_FILES_HOURS", "0"))
+    DISK_QUOTA_MB:           float = float(os.getenv("DISK_QUOTA_MB", "0"))
+    JANITOR_INTERVAL_S:      float = float(os.getenv("JANITOR_INTERVAL_S", "600"))
+
+    # Step 7 voiceover encodes (kbps). 0 skips the Opus copy.
+    VOICEOVER_MP3_KBPS:  int = int(os.getenv("VOICEOVER_MP3_KBPS", "128"))
+    VOICEOVER_OPUS_KBPS: int = int(os.getenv("VOICEOVER_OPUS_KBPS", "0"))
+
+    # Step 7: also package the video as HLS (fragmented MP4) for instant playback
+    HLS_PACKAGING:   bool  = os.getenv("HLS_PACKAGING", "1") not in ("0", "false", "False")
+    HLS_SEGMENT_S:   float = float(os.getenv("HLS_SEGMENT_S", "6"))
+
+    # Deliverable storage (see storage.py): "local" (OUTPUT_DIR) or "s3"
+    STORAGE_BACKEND:        str = os.getenv("STORAGE_BACKEND", "local").lower()
+    S3_BUCKET:              str = os.getenv("S3_BUCKET", "")
+    S3_PREFIX:              str = os.getenv("S3_PREFIX", "jobs/")
+    S3_ENDPOINT_URL:        str = os.getenv("S3_ENDPOINT_URL", "")  # e.g. http://localhost:9000 for MinIO
+    S3_REGION:              str = os.getenv("S3_REGION", "")
+    S3_PRESIGN_EXPIRES_S:   int = int(os.getenv("S3_PRESIGN_EXPIRES_S", "3600"))
+    S3_MULTIPART_CHUNK_MB:  int = int(os.getenv("S3_MULTIPART_CHUNK_MB", "16"))
+    S3_UPLOAD_CONCURRENCY:  int = int(os.getenv("S3_UPLOAD_CONCURRENCY", "8"))
+
     # Words per minute for duration estimation
     NARRATION_WPM: int = 150
 
+    # Threads running pipeline steps; raise together with the render budgets below
+    PIPELINE_WORKERS: int = int(os.getenv("PIPELINE_WORKERS", "2"))
+
+    # Render admission control (see pipeline/admission.py). 0 = derive from the machine:
+    # 75% of physical RAM, every CPU core.
+    RENDER_RAM_BUDGET_MB:   float = float(os.getenv("RENDER_RAM_BUDGET_MB", "0"))
+    RENDER_CPU_BUDGET:      float = float(os.getenv("RENDER_CPU_BUDGET", "0"))
+    RENDER_ENCODER_THREADS: int   = int(os.getenv("RENDER_ENCODER_THREADS", "2"))
+    # Multiplier applied to the RAM estimate; calibrate from GET /api/admission
+    RENDER_RAM_SCALE:       float = float(os.getenv("RENDER_RAM_SCALE", "1.0"))
+
+    # Long scripts: outline locally, then expand every scene in parallel
+    SCRIPT_FANOUT_MIN_MINUTES: int = int(os.getenv("SCRIPT_FANOUT_MIN_MINUTES", "15"))
+    SCRIPT_FANOUT_WORKERS:     int = int(os.getenv("SCRIPT_FANOUT_WORKERS", "8"))
+
 
 config = Config()
 
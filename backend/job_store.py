@@ -1,7 +1,15 @@
+import base64
+import bisect
+import json
+import threading
+import time
 import uuid
-from datetime import datetime
-from typing import Dict, Optional, Any
-from models import Job, PipelineStep, StepStatus, JobStatus, JobResult
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+from config import config
+from models import Job, JobSummary, PipelineStep, StepStatus, JobStatus, JobResult
 
 PIPELINE_STEPS = [
     (1, "Prompt Analysis",     "Extracting topic, talking points, tone, and visual elements"),
@@ -12,40 +20,298 @@ PIPELINE_STEPS = [
     (6, "Video Assembly",      "Assembling footage, voice, and music into final video"),
     (7, "Export & Delivery",   "Organizing all deliverables"),
 ]
+STEP_COUNT = len(PIPELINE_STEPS)
+
+_STEP_STATUSES = list(StepStatus)
+_STEP_CODE = {s: i for i, s in enumerate(_STEP_STATUSES)}
+_UNSET = 0.0  # timestamps are epoch seconds; 0 means "not set"
+
+
+def _to_datetime(ts: float) -> Optional[datetime]:
+    if ts == _UNSET:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)  # naive UTC, like utcnow()
+
+
+def _to_ts(dt: Optional[datetime]) -> float:
+    if dt is None:
+        return _UNSET
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class JobRecord:
+    """Compact internal state of a job.
+
+    Step state lives in arrays indexed by ``step - 1`` and times are epoch
+    floats; step names and descriptions come from ``PIPELINE_STEPS``. The API
+    model (``Job``) is only built by ``to_model`` when a job is serialized.
+    """
+
+    __slots__ = (
+        "job_id", "status", "config", "current_step", "result", "error",
+        "created_at", "completed_at", "updated_at",
+        "step_status", "step_message", "step_started", "step_completed",
+    )
+
+    def __init__(self, job_id: str, config: dict, created_at: Optional[float] = None):
+        self.job_id = job_id
+        self.status = JobStatus.PENDING
+        self.config = config
+        self.current_step = 0
+        self.result: Optional[JobResult] = None
+        self.error: Optional[str] = None
+        self.created_at = created_at or time.time()
+        self.completed_at = _UNSET
+        self.updated_at = self.created_at  # last change of any kind, for idle detection
+        self.step_status = array("b", [_STEP_CODE[StepStatus.PENDING]] * STEP_COUNT)
+        self.step_message: List[str] = [""] * STEP_COUNT
+        self.step_started = array("d", [_UNSET] * STEP_COUNT)
+        self.step_completed = array("d", [_UNSET] * STEP_COUNT)
+
+    # ── Step state ─────────────────────────────────────────────────────────────
+
+    def get_step_status(self, step: int) -> StepStatus:
+        return _STEP_STATUSES[self.step_status[step - 1]]
+
+    def set_step(self, step: int, status: StepStatus, message: str,
+                 started: Optional[float] = None, completed: Optional[float] = None):
+        i = step - 1
+        self.step_status[i] = _STEP_CODE[status]
+        self.step_message[i] = message
+        if started is not None:
+            self.step_started[i] = started
+        if completed is not None:
+            self.step_completed[i] = completed
+
+    def steps_with_status(self, *statuses: StepStatus) -> List[int]:
+        codes = {_STEP_CODE[s] for s in statuses}
+        return [i + 1 for i, code in enumerate(self.step_status) if code in codes]
+
+    def step_was_started(self, step: int) -> bool:
+        return self.step_started[step - 1] != _UNSET
+
+    # ── Conversion ─────────────────────────────────────────────────────────────
+
+    def to_model(self) -> Job:
+        return Job(
+            job_id=self.job_id,
+            status=self.status,
+            config=self.config,
+            steps=[
+                PipelineStep(
+                    step=n, name=name, description=desc,
+                    status=_STEP_STATUSES[self.step_status[n - 1]],
+                    message=self.step_message[n - 1],
+                    started_at=_to_datetime(self.step_started[n - 1]),
+                    completed_at=_to_datetime(self.step_completed[n - 1]),
+                )
+                for n, name, desc in PIPELINE_STEPS
+            ],
+            current_step=self.current_step,
+            result=self.result,
+            error=self.error,
+            created_at=_to_datetime(self.created_at),
+            completed_at=_to_datetime(self.completed_at),
+        )
+
+    def to_summary(self) -> JobSummary:
+        return JobSummary(
+            job_id=self.job_id,
+            title=self.config.get("title", ""),
+            status=self.status,
+            current_step=self.current_step,
+            created_at=_to_datetime(self.created_at),
+        )
+
+    def to_dict(self) -> dict:
+        """The record as JSON-ready values, for job.json — no ``Job`` model is built."""
+        return {
+            "job_id": self.job_id,
+            "status": self.status.value,
+            "config": self.config,
+            "current_step": self.current_step,
+            "result": self.result.model_dump(mode="json") if self.result else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "step_status": [_STEP_STATUSES[code].value for code in self.step_status],
+            "step_message": list(self.step_message),
+            "step_started": list(self.step_started),
+            "step_completed": list(self.step_completed),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "JobRecord":
+        record = cls(data["job_id"], data["config"], created_at=data["created_at"])
+        record.status = JobStatus(data["status"])
+        record.current_step = data["current_step"]
+        record.result = JobResult(**data["result"]) if data.get("result") else None
+        record.error = data.get("error")
+        record.completed_at = data["completed_at"]
+        for i, status in enumerate(data["step_status"]):
+            record.set_step(i + 1, StepStatus(status), data["step_message"][i],
+                            data["step_started"][i], data["step_completed"][i])
+        return record
+
+    @classmethod
+    def from_model(cls, job: Job) -> "JobRecord":
+        record = cls(job.job_id, job.config, created_at=_to_ts(job.created_at))
+        record.status = job.status
+        record.current_step = job.current_step
+        record.result = job.result
+        record.error = job.error
+        record.completed_at = _to_ts(job.completed_at)
+        for s in job.steps:
+            record.set_step(s.step, s.status, s.message, _to_ts(s.started_at), _to_ts(s.completed_at))
+        return record
+
+
+def _encode_cursor(key: Tuple[float, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Raises ValueError for a cursor this store did not issue."""
+    try:
+        ts, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(ts), str(job_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
 
 
 class JobStore:
     def __init__(self):
-        self._jobs: Dict[str, Job] = {}
+        self._jobs: Dict[str, JobRecord] = {}
         self._pipeline_data: Dict[str, Dict[str, Any]] = {}  # job_id → {script, analysis, ...}
+        self._persist_lock = threading.Lock()
+        self._dirty: set = set()  # jobs changed since their last write
+        self._dirty_cond = threading.Condition()
+        self._writer: Optional[threading.Thread] = None
+        # (created_at, job_id) of every job, ascending — the listing index
+        self._order: List[Tuple[float, str]] = []
+        self._order_lock = threading.Lock()
+        # Deduplication of /api/generate submissions
+        self._by_idempotency_key: Dict[str, str] = {}  # key → job_id
+        self._by_request_hash: Dict[str, str] = {}     # request hash → newest job_id
+
+    def _index(self, job: JobRecord):
+        key = (job.created_at, job.job_id)
+        with self._order_lock:
+            if not self._order or key > self._order[-1]:
+                self._order.append(key)  # the common case: jobs arrive in time order
+            else:
+                bisect.insort(self._order, key)
 
-    def create_job(self, config: dict) -> Job:
+    def create_job(self, config: dict, idempotency_key: Optional[str] = None,
+                   request_hash: Optional[str] = None) -> JobRecord:
         job_id = str(uuid.uuid4())
-        steps = [
-            PipelineStep(step=n, name=name, description=desc)
-            for n, name, desc in PIPELINE_STEPS
-        ]
-        job = Job(
-            job_id=job_id,
-            config=config,
-            steps=steps,
-            created_at=datetime.utcnow(),
-        )
+        job = JobRecord(job_id, config)
         self._jobs[job_id] = job
+        self._index(job)
+        if idempotency_key or request_hash:
+            self._pipeline_data[job_id] = {
+                "submission": {"idempotency_key": idempotency_key, "request_hash": request_hash},
+            }
+            self._index_submission(job_id)
+        self._persist(job_id)
+        return job
+
+    def _index_submission(self, job_id: str):
+        submission = self.get_pipeline_data(job_id, "submission") or {}
+        if submission.get("idempotency_key"):
+            self._by_idempotency_key[submission["idempotency_key"]] = job_id
+        if submission.get("request_hash"):
+            self._by_request_hash[submission["request_hash"]] = job_id
+
+    def find_by_idempotency_key(self, key: str, ttl_s: float) -> Optional[Tuple[JobRecord, str]]:
+        """The job created with ``key`` within ``ttl_s`` and its request hash."""
+        job = self._jobs.get(self._by_idempotency_key.get(key, ""))
+        if job is None or time.time() - job.created_at > ttl_s:
+            return None
+        return job, (self.get_pipeline_data(job.job_id, "submission") or {}).get("request_hash")
+
+    def find_recent_request(self, request_hash: str, window_s: float) -> Optional[JobRecord]:
+        """The newest job for an identical request within ``window_s``, unless it failed or was cancelled."""
+        job = self._jobs.get(self._by_request_hash.get(request_hash, ""))
+        if job is None or time.time() - job.created_at > window_s:
+            return None
+        if job.status in (JobStatus.FAILED, JobStatus.CANCELLED):
+            return None
         return job
 
-    def get(self, job_id: str) -> Optional[Job]:
+    def get(self, job_id: str) -> Optional[JobRecord]:
         return self._jobs.get(job_id)
 
-    def all(self):
+    def all(self) -> List[JobRecord]:
         return list(self._jobs.values())
 
+    def delete(self, job_id: str):
+        """Forget a job (its files are removed by the janitor)."""
+        with self._persist_lock:
+            job = self._jobs.pop(job_id, None)
+        submission = self._pipeline_data.pop(job_id, {}).get("submission") or {}
+        if self._by_idempotency_key.get(submission.get("idempotency_key")) == job_id:
+            del self._by_idempotency_key[submission["idempotency_key"]]
+        if self._by_request_hash.get(submission.get("request_hash")) == job_id:
+            del self._by_request_hash[submission["request_hash"]]
+        if job is not None:
+            key = (job.created_at, job.job_id)
+            with self._order_lock:
+                i = bisect.bisect_left(self._order, key)
+                if i < len(self._order) and self._order[i] == key:
+                    del self._order[i]
+
+    def page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        statuses: Optional[Iterable[JobStatus]] = None,
+        video_type: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> Tuple[List[JobRecord], Optional[str]]:
+        """Jobs newest first, walking the ordered index from ``cursor``.
+
+        Returns the page and the cursor of the next (older) page, or None
+        when there is nothing left. Raises ValueError for a bad cursor.
+        """
+        statuses = set(statuses) if statuses else None
+        with self._order_lock:
+            hi = len(self._order)
+            if created_before is not None:
+                hi = bisect.bisect_left(self._order, (_to_ts(created_before),))
+            if cursor:
+                hi = min(hi, bisect.bisect_left(self._order, _decode_cursor(cursor)))
+            lo = 0
+            if created_after is not None:
+                lo = bisect.bisect_left(self._order, (_to_ts(created_after),))
+
+            jobs: List[JobRecord] = []
+            i = hi - 1
+            while i >= lo and len(jobs) < limit:
+                job = self._jobs.get(self._order[i][1])
+                i -= 1
+                if job is None:
+                    continue
+                if statuses is not None and job.status not in statuses:
+                    continue
+                if video_type is not None and job.config.get("video_type") != video_type:
+                    continue
+                jobs.append(job)
+
+        more = i >= lo and len(jobs) == limit
+        next_cursor = _encode_cursor((jobs[-1].created_at, jobs[-1].job_id)) if more else None
+        return jobs, next_cursor
+
     # ── Pipeline data storage ──────────────────────────────────────────────────
 
     def set_pipeline_data(self, job_id: str, key: str, value: Any):
         if job_id not in self._pipeline_data:
             self._pipeline_data[job_id] = {}
         self._pipeline_data[job_id][key] = value
+        self._persist(job_id)
 
     def get_pipeline_data(self, job_id: str, key: str) -> Optional[Any]:
         return self._pipeline_data.get(job_id, {}).get(key)
@@ -57,12 +323,9 @@ class JobStore:
             return
         job.status = JobStatus.RUNNING
         job.error = None
-        for s in job.steps:
-            if s.step >= from_step:
-                s.status = StepStatus.PENDING
-                s.message = ""
-                s.started_at = None
-                s.completed_at = None
+        for step in range(from_step, STEP_COUNT + 1):
+            job.set_step(step, StepStatus.PENDING, "", _UNSET, _UNSET)
+        self._persist(job_id)
 
     # ── Step lifecycle ─────────────────────────────────────────────────────────
 
@@ -70,46 +333,121 @@ class JobStore:
         job = self._jobs[job_id]
         job.status = JobStatus.RUNNING
         job.current_step = step
-        for s in job.steps:
-            if s.step == step:
-                s.status = StepStatus.RUNNING
-                s.message = message
-                s.started_at = datetime.utcnow()
-                break
+        job.set_step(step, StepStatus.RUNNING, message, started=time.time())
+        self._persist(job_id)
 
     def complete_step(self, job_id: str, step: int, message: str = ""):
         job = self._jobs[job_id]
-        for s in job.steps:
-            if s.step == step:
-                s.status = StepStatus.COMPLETED
-                s.message = message
-                s.completed_at = datetime.utcnow()
-                break
+        job.set_step(step, StepStatus.COMPLETED, message, completed=time.time())
+        self._persist(job_id)
 
     def fail_step(self, job_id: str, step: int, error: str):
         job = self._jobs[job_id]
         job.status = JobStatus.FAILED
         job.error = error
-        for s in job.steps:
-            if s.step == step:
-                s.status = StepStatus.FAILED
-                s.message = error
-                s.completed_at = datetime.utcnow()
-                break
+        job.set_step(step, StepStatus.FAILED, error, completed=time.time())
+        self._persist(job_id)
 
     def complete_job(self, job_id: str, result: JobResult):
         job = self._jobs[job_id]
         job.status = JobStatus.COMPLETED
         job.result = result
-        job.completed_at = datetime.utcnow()
+        job.completed_at = time.time()
+        self._persist(job_id)
 
     def fail_job(self, job_id: str, error: str, step: Optional[int] = None):
         job = self._jobs[job_id]
         job.status = JobStatus.FAILED
         job.error = error
-        job.completed_at = datetime.utcnow()
+        job.completed_at = time.time()
         if step is not None:
             self.fail_step(job_id, step, error)
+        else:
+            self._persist(job_id)
+
+    def cancel_job(self, job_id: str):
+        """Mark a job cancelled; its unfinished steps are skipped."""
+        job = self._jobs[job_id]
+        now = time.time()
+        job.status = JobStatus.CANCELLED
+        job.error = "Cancelled by user"
+        job.completed_at = now
+        for step in job.steps_with_status(StepStatus.PENDING, StepStatus.RUNNING):
+            job.set_step(step, StepStatus.SKIPPED, "Cancelled by user", completed=now)
+        self._persist(job_id)
+
+    # ── Persistence ────────────────────────────────────────────────────────────
+    # Every change marks the job dirty; a writer thread snapshots dirty jobs to
+    # TEMP_DIR/<job_id>/job.json so jobs (and their pipeline data) survive a
+    # restart. Changes within JOB_PERSIST_DELAY_S of each other share one
+    # write, and none of the serialization happens on the caller's thread.
+
+    def _persist(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if not job:
+            return
+        job.updated_at = time.time()
+        with self._dirty_cond:
+            self._dirty.add(job_id)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="job-store-writer", daemon=True)
+                self._writer.start()
+            self._dirty_cond.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._dirty_cond:
+                while not self._dirty:
+                    self._dirty_cond.wait()
+            time.sleep(config.JOB_PERSIST_DELAY_S)  # let a burst of transitions coalesce
+            self.flush()
+
+    def flush(self):
+        """Write every job changed since the last write. Also called on shutdown."""
+        with self._dirty_cond:
+            dirty, self._dirty = self._dirty, set()
+        for job_id in dirty:
+            self._write(job_id)
+
+    def _write(self, job_id: str):
+        # Under the lock, so a job deleted meanwhile is never written back to disk
+        with self._persist_lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            path = config.TEMP_DIR / job_id / "job.json"
+            snapshot = {
+                "record": job.to_dict(),
+                "pipeline_data": dict(self._pipeline_data.get(job_id, {})),
+            }
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(snapshot, default=str), encoding="utf-8")
+                tmp.replace(path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"[job_store] Could not persist {job_id}: {e}")
+
+    def load_persisted(self) -> List[JobRecord]:
+        """Reload every job snapshot under TEMP_DIR. Returns the restored jobs."""
+        restored = []
+        for path in Path(config.TEMP_DIR).glob("*/job.json"):
+            try:
+                snapshot = json.loads(path.read_text(encoding="utf-8"))
+                if "record" in snapshot:
+                    job = JobRecord.from_dict(snapshot["record"])
+                else:  # written before records were persisted directly
+                    job = JobRecord.from_model(Job(**snapshot["job"]))
+                job.updated_at = path.stat().st_mtime
+            except Exception as e:
+                print(f"[job_store] Skipping unreadable snapshot {path}: {e}")
+                continue
+            self._jobs[job.job_id] = job
+            self._pipeline_data[job.job_id] = snapshot.get("pipeline_data", {})
+            self._index(job)
+            self._index_submission(job.job_id)
+            restored.append(job)
+        return restored
 
 
 # Global singleton
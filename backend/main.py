@@ -1,21 +1,35 @@
 """FastAPI backend for the Automated Video Editor."""
 
+import asyncio
+import json
 import time as _time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from datetime import datetime
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import RedirectResponse, Response
 from pydantic import BaseModel
 import httpx
 
 from config import config, AVAILABLE_VOICES
-from models import GenerateRequest, GenerateResponse, Script
+from models import EditBlueprint, FootageResult, GenerateRequest, GenerateResponse, JobPage, Script, JobStatus, StepStatus, VideoType
 from job_store import store
+from media import file_etag, file_response, ranged_response, zip_response
+from storage import content_type, storage
+from pipeline import admission, cancellation, checkpoint, janitor
+from pipeline.exporter import video_filename
+from pipeline.tts_gen import SAMPLE_RATE, load_peaks, wav_slice
 from pipeline.orchestrator import (
+    cancel_speculative_work,
     run_pipeline_phase1,
     run_pipeline_phase2,
     run_pipeline_phase3,
+    run_pipeline_replace_scene,
+    run_pipeline_scene_voice,
     run_pipeline_script_edit,
+    run_pipeline_variant,
 )
 
 # Voice cache (avoids repeated API calls)
@@ -25,7 +39,36 @@ _voices_cache_ts: float = 0.0
 config.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 config.TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
-app = FastAPI(title="AutoVideo API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Restore persisted jobs; resume or fail the ones a restart interrupted.
+
+    Also runs the retention janitor for the lifetime of the app.
+    """
+    for job in store.load_persisted():
+        if job.status != JobStatus.RUNNING:
+            continue
+        running = job.steps_with_status(StepStatus.RUNNING)
+        if not running:
+            if job.config.get("variant_of"):
+                # Variants have no approval gates: it stopped between steps 3 and 4
+                store.fail_job(job.job_id, "Interrupted by a server restart — retry to continue")
+            continue  # paused at an approval gate — nothing was interrupted
+        if min(running) >= 4 and config.RESUME_ON_STARTUP:
+            print(f"[startup] Resuming phase 3 of {job.job_id} from checkpoints")
+            store.reset_steps_from(job.job_id, 4)
+            asyncio.create_task(run_pipeline_phase3(job.job_id))
+        else:
+            store.fail_job(job.job_id, "Interrupted by a server restart — retry to continue",
+                           step=min(running))
+    janitor_task = asyncio.create_task(janitor.run_janitor())
+    yield
+    janitor_task.cancel()
+    store.flush()
+
+
+app = FastAPI(title="AutoVideo API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,6 +81,26 @@ app.add_middleware(
 
 class EditScriptRequest(BaseModel):
     instruction: str
+    targeted: bool = True  # rewrite only the scenes the instruction affects
+
+
+class ReplaceSceneRequest(BaseModel):
+    keywords: Optional[List[str]] = None  # search again; omitted = promote the scene's alternative clip
+
+
+class VariantRequest(BaseModel):
+    language: str
+    voice_id: Optional[str] = None  # omitted = the source job's voice
+
+
+def _active_job(job_id: str):
+    """The job, if it exists and has not been cancelled (404 / 409 otherwise)."""
+    job = store.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    if job.status == JobStatus.CANCELLED:
+        raise HTTPException(409, "Job was cancelled — retry it to continue")
+    return job
 
 
 # ── Routes ─────────────────────────────────────────────────────────────────────
@@ -84,13 +147,29 @@ async def get_voices():
 
 
 @app.post("/api/generate", response_model=GenerateResponse)
-async def generate(req: GenerateRequest, background_tasks: BackgroundTasks):
+async def generate(req: GenerateRequest, background_tasks: BackgroundTasks,
+                   idempotency_key: Optional[str] = Header(None)):
+    """Start a job. Repeating an Idempotency-Key (or, with GENERATE_DEDUPE_WINDOW_S,
+    an identical request) returns the existing job instead of starting another."""
     if not config.ANTHROPIC_API_KEY:
         raise HTTPException(500, "ANTHROPIC_API_KEY not configured")
     if not config.PEXELS_API_KEY:
         raise HTTPException(500, "PEXELS_API_KEY not configured")
 
-    job = store.create_job(req.model_dump())
+    request_hash = checkpoint.inputs_hash({"req": req})
+    if idempotency_key:
+        existing = store.find_by_idempotency_key(idempotency_key, config.IDEMPOTENCY_TTL_HOURS * 3600)
+        if existing:
+            job, original_hash = existing
+            if original_hash != request_hash:
+                raise HTTPException(422, "Idempotency-Key was already used for a different request")
+            return GenerateResponse(job_id=job.job_id, deduplicated=True)
+    if config.GENERATE_DEDUPE_WINDOW_S > 0:
+        job = store.find_recent_request(request_hash, config.GENERATE_DEDUPE_WINDOW_S)
+        if job:
+            return GenerateResponse(job_id=job.job_id, deduplicated=True)
+
+    job = store.create_job(req.model_dump(), idempotency_key=idempotency_key, request_hash=request_hash)
     background_tasks.add_task(run_pipeline_phase1, job.job_id, req)
     return GenerateResponse(job_id=job.job_id)
 
@@ -100,13 +179,50 @@ def get_job(job_id: str):
     job = store.get(job_id)
     if not job:
         raise HTTPException(404, "Job not found")
-    return job
+    return job.to_model()
+
+
+@app.get("/api/jobs", response_model=JobPage)
+def list_jobs(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[List[JobStatus]] = Query(None),
+    video_type: Optional[VideoType] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    """Job summaries, newest first. Follow ``next_cursor`` for older pages.
+
+    ``status`` may be repeated; dates are ISO 8601 (naive means UTC).
+    """
+    try:
+        jobs, next_cursor = store.page(
+            limit, cursor, statuses=status, video_type=video_type.value if video_type else None,
+            created_after=created_after, created_before=created_before,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return JobPage(jobs=[j.to_summary() for j in jobs], next_cursor=next_cursor)
+
+
+@app.get("/api/jobs/{job_id}/timings")
+def get_timings(job_id: str):
+    """Wall time in seconds of every pipeline node that has run for this job."""
+    if not store.get(job_id):
+        raise HTTPException(404, "Job not found")
+    return {"timings": store.get_pipeline_data(job_id, "timings") or {}}
+
 
+@app.get("/api/admission")
+def get_admission():
+    """Render budget, running/queued renders and estimated vs observed RAM of recent ones."""
+    return admission.controller.status()
 
-@app.get("/api/jobs")
-def list_jobs():
-    jobs = sorted(store.all(), key=lambda j: j.created_at, reverse=True)
-    return {"jobs": jobs}
+
+@app.get("/api/janitor")
+def get_janitor():
+    """Retention policy, disk usage and bytes reclaimed by the janitor."""
+    return janitor.status()
 
 
 @app.get("/api/jobs/{job_id}/script")
@@ -126,8 +242,7 @@ def get_script(job_id: str):
 @app.post("/api/jobs/{job_id}/approve-script")
 async def approve_script(job_id: str, background_tasks: BackgroundTasks):
     """User approved the script — start voice generation (phase 2)."""
-    if not store.get(job_id):
-        raise HTTPException(404, "Job not found")
+    _active_job(job_id)
     if not store.get_pipeline_data(job_id, "script"):
         raise HTTPException(400, "Script not ready")
     store.reset_steps_from(job_id, 3)
@@ -138,8 +253,7 @@ async def approve_script(job_id: str, background_tasks: BackgroundTasks):
 @app.post("/api/jobs/{job_id}/approve-voice")
 async def approve_voice(job_id: str, background_tasks: BackgroundTasks):
     """User approved the voiceover — start footage + final assembly (phase 3)."""
-    if not store.get(job_id):
-        raise HTTPException(404, "Job not found")
+    _active_job(job_id)
     store.reset_steps_from(job_id, 4)
     background_tasks.add_task(run_pipeline_phase3, job_id)
     return {"ok": True}
@@ -148,8 +262,7 @@ async def approve_voice(job_id: str, background_tasks: BackgroundTasks):
 @app.post("/api/jobs/{job_id}/script/edit")
 async def edit_script(job_id: str, edit_req: EditScriptRequest, background_tasks: BackgroundTasks):
     """Modify script with a user instruction, then pause again for re-approval."""
-    if not store.get(job_id):
-        raise HTTPException(404, "Job not found")
+    _active_job(job_id)
     script_data = store.get_pipeline_data(job_id, "script")
     req_data    = store.get_pipeline_data(job_id, "req")
     if not script_data or not req_data:
@@ -158,45 +271,284 @@ async def edit_script(job_id: str, edit_req: EditScriptRequest, background_tasks
     current_script = Script(**script_data)
     gen_req = GenerateRequest(**req_data)
     store.reset_steps_from(job_id, 2)
-    background_tasks.add_task(run_pipeline_script_edit, job_id, current_script, edit_req.instruction, gen_req)
+    background_tasks.add_task(run_pipeline_script_edit, job_id, current_script, edit_req.instruction, gen_req,
+                              edit_req.targeted)
     return {"ok": True}
 
 
 @app.post("/api/jobs/{job_id}/voice/regenerate")
 async def regenerate_voice(job_id: str, background_tasks: BackgroundTasks):
     """Re-run TTS (phase 2) and pause again for re-approval."""
-    if not store.get(job_id):
-        raise HTTPException(404, "Job not found")
+    _active_job(job_id)
     if not store.get_pipeline_data(job_id, "script"):
         raise HTTPException(400, "Script not available")
     store.reset_steps_from(job_id, 3)
-    background_tasks.add_task(run_pipeline_phase2, job_id)
+    background_tasks.add_task(run_pipeline_phase2, job_id, fresh=True)
+    return {"ok": True}
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Stop a running job: in-flight API calls, downloads and the render are aborted.
+
+    Work already finished (and checkpointed) is kept, so a later retry
+    continues from where the job was stopped.
+    """
+    job = store.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    if job.status not in (JobStatus.PENDING, JobStatus.RUNNING):
+        raise HTTPException(400, f"Job is already {job.status.value}")
+    cancellation.cancel(job_id)
+    cancel_speculative_work(job_id)
+    store.cancel_job(job_id)
+    return {"ok": True}
+
+
+@app.post("/api/jobs/{job_id}/voice/scenes/{scene_id}/regenerate")
+async def regenerate_scene_voice(job_id: str, scene_id: str, background_tasks: BackgroundTasks):
+    """Re-voice one scene and splice it into the voiceover, then pause again for approval."""
+    job = _active_job(job_id)
+    script_data = store.get_pipeline_data(job_id, "script")
+    if not script_data or not store.get_pipeline_data(job_id, "tts"):
+        raise HTTPException(400, "Voice not ready yet")
+    if job.get_step_status(3) != StepStatus.COMPLETED or job.get_step_status(4) != StepStatus.PENDING:
+        raise HTTPException(409, "Scenes can only be re-voiced while the voiceover awaits approval")
+    if not any(s["scene_id"] == scene_id for s in script_data["scenes"]):
+        raise HTTPException(404, "Scene not found")
+    background_tasks.add_task(run_pipeline_scene_voice, job_id, scene_id)
+    return {"ok": True}
+
+
+@app.post("/api/jobs/{job_id}/scenes/{scene_id}/replace-footage")
+async def replace_scene_footage(job_id: str, scene_id: str, background_tasks: BackgroundTasks,
+                                replace_req: Optional[ReplaceSceneRequest] = None):
+    """Swap one scene's footage in a finished video and re-render.
+
+    Only the scene's segment is re-encoded; the others are joined from the
+    segment cache.
+    """
+    job = _active_job(job_id)
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(409, "Footage can only be replaced once the video is finished")
+    keywords = [k.strip() for k in (replace_req.keywords or []) if k.strip()] if replace_req else []
+    entry = checkpoint.load_unchecked(config.TEMP_DIR / job_id / "checkpoints", "footage", FootageResult)
+    if entry is None:
+        raise HTTPException(410, "The job's footage has been cleaned up")
+    scene = next((s for s in entry[0].scenes if s.scene_id == scene_id), None)
+    if scene is None:
+        raise HTTPException(404, "Scene not found")
+    if not keywords and not scene.secondary_assets:
+        raise HTTPException(400, "Scene has no alternative footage — pass keywords to search again")
+    store.reset_steps_from(job_id, 4)
+    background_tasks.add_task(run_pipeline_replace_scene, job_id, scene_id, keywords or None)
     return {"ok": True}
 
 
+@app.post("/api/jobs/{job_id}/variants", response_model=GenerateResponse)
+async def derive_variant(job_id: str, variant_req: VariantRequest, background_tasks: BackgroundTasks):
+    """Start a new job with a finished video in another language.
+
+    The script is translated scene by scene and voiced again; the footage and
+    edit timeline are reused, re-timed to the new voiceover, and only scenes
+    whose duration changed are re-encoded.
+    """
+    job = _active_job(job_id)
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(409, "Variants can only be derived from a finished video")
+    if not config.ANTHROPIC_API_KEY:
+        raise HTTPException(500, "ANTHROPIC_API_KEY not configured")
+    req_data = store.get_pipeline_data(job_id, "req")
+    if not req_data or not store.get_pipeline_data(job_id, "script"):
+        raise HTTPException(400, "Job has no saved script")
+    language = variant_req.language.strip()
+    if not language:
+        raise HTTPException(400, "language is required")
+    if language == req_data.get("language"):
+        raise HTTPException(400, "The video is already in that language")
+    checkpoint_dir = config.TEMP_DIR / job_id / "checkpoints"
+    if (checkpoint.load_unchecked(checkpoint_dir, "footage", FootageResult) is None
+            or checkpoint.load_unchecked(checkpoint_dir, "blueprint", EditBlueprint) is None):
+        raise HTTPException(410, "The job's footage has been cleaned up")
+
+    req = GenerateRequest(**{**req_data, "language": language,
+                             "voice_id": variant_req.voice_id or req_data["voice_id"]})
+    variant = store.create_job({**req.model_dump(), "variant_of": job_id})
+    store.set_pipeline_data(variant.job_id, "req", req.model_dump())
+    janitor.touch(job_id)
+    background_tasks.add_task(run_pipeline_variant, variant.job_id, job_id)
+    return GenerateResponse(job_id=variant.job_id)
+
+
+@app.post("/api/jobs/{job_id}/retry")
+async def retry_job(job_id: str, background_tasks: BackgroundTasks):
+    """Re-run a failed or cancelled job from the phase of its first unfinished step.
+
+    Phase 3 resumes from its checkpoints, so only the failed step (and what
+    depends on it) is recomputed. A job cancelled while waiting for approval
+    goes back to waiting.
+    """
+    job = store.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    if job.status not in (JobStatus.FAILED, JobStatus.CANCELLED):
+        raise HTTPException(400, "Only failed or cancelled jobs can be retried")
+    req_data = store.get_pipeline_data(job_id, "req")
+    if not req_data:
+        raise HTTPException(400, "Job has no saved request")
+
+    cancellation.reset(job_id)
+    unfinished = job.steps_with_status(StepStatus.FAILED, StepStatus.SKIPPED)
+    step = unfinished[0] if unfinished else max(job.current_step, 1)
+    if job.config.get("variant_of") and not job.step_was_started(4):
+        # Translation and voice come from the caches, so starting over is cheap
+        store.reset_steps_from(job_id, 1)
+        background_tasks.add_task(run_pipeline_variant, job_id, job.config["variant_of"])
+        return {"ok": True, "from_step": 1}
+    if unfinished and step in (3, 4) and not job.step_was_started(step):
+        # Cancelled at an approval gate: nothing to re-run until the user approves
+        store.reset_steps_from(job_id, step)
+        return {"ok": True, "from_step": step}
+    if step <= 2:
+        store.reset_steps_from(job_id, 1)
+        background_tasks.add_task(run_pipeline_phase1, job_id, GenerateRequest(**req_data))
+    elif step == 3:
+        store.reset_steps_from(job_id, 3)
+        background_tasks.add_task(run_pipeline_phase2, job_id)
+    else:
+        store.reset_steps_from(job_id, 4)
+        background_tasks.add_task(run_pipeline_phase3, job_id)
+    return {"ok": True, "from_step": step}
+
+
 @app.get("/api/jobs/{job_id}/voice")
-def get_voice(job_id: str):
+def get_voice(job_id: str, request: Request):
     temp_path = config.TEMP_DIR / job_id / "voiceover.wav"
     if temp_path.exists():
-        return FileResponse(str(temp_path), media_type="audio/wav")
-    output_path = config.OUTPUT_DIR / job_id / "voiceover.mp3"
-    if output_path.exists():
-        return FileResponse(str(output_path), media_type="audio/mpeg")
-    raise HTTPException(404, "Voice not ready yet")
+        return file_response(request, temp_path, "audio/wav")
+    return _serve_stored(request, job_id, "voiceover.mp3", "Voice not ready yet")
+
+
+@app.get("/api/jobs/{job_id}/voice/scenes/{scene_id}")
+def get_scene_voice(job_id: str, scene_id: str, request: Request):
+    """One scene's narration as a standalone WAV, cut from the voiceover without decoding."""
+    wav = config.TEMP_DIR / job_id / "voiceover.wav"
+    timings = (store.get_pipeline_data(job_id, "tts") or {}).get("scenes", [])
+    timing = next((t for t in timings if t["scene_id"] == scene_id), None)
+    if not wav.exists() or timing is None:
+        raise HTTPException(404, "Scene voice not found")
+    # Jobs voiced before sample-exact timings only have times rounded to 10 ms
+    start = timing.get("start_sample", round(timing["start_time"] * SAMPLE_RATE))
+    frames = timing.get("num_samples", round(timing["duration"] * SAMPLE_RATE))
+    stat = wav.stat()
+    cut = wav_slice(wav, start, frames)
+    if cut is None:
+        raise HTTPException(409, "Voiceover cannot be sliced")
+    header, offset, length = cut
+    return ranged_response(request, [header, (wav, offset, length)],
+                           file_etag(stat, f"{start}:{frames}"), stat.st_mtime, "audio/wav")
+
+
+@app.get("/api/jobs/{job_id}/voice/peaks")
+def get_voice_peaks(
+    job_id: str,
+    resolution: int = Query(1024, ge=1, description="Samples per peak; rounded up to a stored level"),
+    format: str = Query("json", pattern="^(json|binary)$"),
+):
+    """Waveform min/max peaks of the voiceover, with the scene boundaries.
+
+    ``binary`` is the peaks as little-endian int16 (min, max) pairs, with the
+    metadata in X- headers.
+    """
+    wav = config.TEMP_DIR / job_id / "voiceover.wav"
+    if not wav.exists():
+        raise HTTPException(404, "Voice not ready yet")
+    level, peaks = load_peaks(wav, resolution)
+    timings = (store.get_pipeline_data(job_id, "tts") or {}).get("scenes", [])
+    scenes = [{"scene_id": t["scene_id"], "start_time": t["start_time"], "end_time": t["end_time"]}
+              for t in timings]
+
+    if format == "binary":
+        return Response(
+            content=peaks.astype("<i2").tobytes(),
+            media_type="application/octet-stream",
+            headers={
+                "X-Sample-Rate": str(SAMPLE_RATE),
+                "X-Samples-Per-Peak": str(level),
+                "X-Peaks-Length": str(len(peaks)),
+                "X-Scenes": json.dumps(scenes, separators=(",", ":")),
+            },
+        )
+    return {
+        "sample_rate": SAMPLE_RATE,
+        "samples_per_peak": level,
+        "bits": 16,
+        "length": len(peaks),
+        "data": peaks.reshape(-1).tolist(),  # min0, max0, min1, max1, …
+        "scenes": scenes,
+    }
+
+
+def _serve_stored(request: Request, job_id: str, name: str, not_found: str = "File not found",
+                  filename: Optional[str] = None):
+    """A stored deliverable: from disk with local storage, else a redirect to a presigned URL."""
+    path = storage.local_path(job_id, name)
+    if path is not None:
+        return file_response(request, path, content_type(name), filename=filename)
+    url = storage.presigned_url(job_id, name, filename)
+    if url is None:
+        raise HTTPException(404, not_found)
+    return RedirectResponse(url, status_code=307)
+
+
+_BUNDLE_FILES = ("final_video.mp4", *(video_filename(f) for f in config.VIDEO_RESOLUTIONS),
+                 "voiceover.mp3", "voiceover.opus", "script.txt", "assets.json", "timeline.json", "subtitles.srt")
+
+
+@app.get("/api/download/{job_id}/bundle.zip")
+def download_bundle(job_id: str):
+    """Every deliverable in one ZIP, streamed as it is built (files are stored, not compressed)."""
+    files = []
+    for name in _BUNDLE_FILES:
+        stat = storage.stat(job_id, name)
+        if stat is not None:
+            files.append((name, *stat, lambda name=name: storage.open(job_id, name)))
+    if not files:
+        raise HTTPException(404, "No deliverables yet")
+    janitor.touch(job_id)
+    return zip_response(files, f"{job_id[:8]}_deliverables.zip")
 
 
 @app.get("/api/download/{job_id}/{filename}")
-def download_file(job_id: str, filename: str):
+def download_file(job_id: str, filename: str, request: Request):
+    safe_name = Path(filename).name
+    response = _serve_stored(request, job_id, safe_name, filename=safe_name)
+    janitor.touch(job_id)
+    return response
+
+
+_STREAM_SUFFIXES = (".m3u8", ".m4s", ".mp4")
+
+
+@app.get("/api/stream/{job_id}/{filename}")
+def stream_file(job_id: str, filename: str, request: Request):
+    """HLS playlist, init segment and media segments of the final video.
+
+    The playlist is always served from here, so its relative segment URLs come
+    back to this route (and, with S3 storage, on to presigned URLs).
+    """
     safe_name = Path(filename).name
-    file_path = config.OUTPUT_DIR / job_id / safe_name
-    if not file_path.exists():
+    if Path(safe_name).suffix.lower() not in _STREAM_SUFFIXES:
         raise HTTPException(404, "File not found")
-    media_types = {
-        ".mp4": "video/mp4", ".mp3": "audio/mpeg",
-        ".txt": "text/plain", ".json": "application/json", ".srt": "text/plain",
-    }
-    media_type = media_types.get(file_path.suffix.lower(), "application/octet-stream")
-    return FileResponse(str(file_path), media_type=media_type, filename=safe_name)
+    name = f"hls/{safe_name}"
+    if safe_name.endswith(".m3u8"):
+        janitor.touch(job_id)
+        if not storage.is_local:
+            if storage.stat(job_id, name) is None:
+                raise HTTPException(404, "File not found")
+            with storage.open(job_id, name) as f:
+                return Response(f.read(), media_type=content_type(safe_name))
+    return _serve_stored(request, job_id, name)
 
 
 if __name__ == "__main__":
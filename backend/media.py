@@ -0,0 +1,268 @@
+"""Byte-range and conditional responses for media endpoints.
+
+A served resource is a list of pieces — literal ``bytes`` or
+``(path, offset, length)`` spans of a file — so a response can be a whole
+file or a virtual one (a computed WAV header followed by a slice of another
+WAV) without copying it. Supported:
+
+* ``If-None-Match`` / ``If-Modified-Since`` → 304
+* a single ``Range: bytes=…`` → 206 with ``Content-Range`` (unsatisfiable → 416);
+  multi-range requests get the whole resource
+* ``If-Range``: the range applies only while the validator still matches
+
+``zip_response`` streams several files as one stored (uncompressed) ZIP,
+built while it is sent, with its exact Content-Length computed up front.
+"""
+
+import hashlib
+import os
+import struct
+import time
+import zlib
+from contextlib import closing
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+Piece = Union[bytes, Tuple[Path, int, int]]
+
+_CHUNK = 256 * 1024
+
+
+def _piece_len(piece: Piece) -> int:
+    return len(piece) if isinstance(piece, bytes) else piece[2]
+
+
+def _iter_range(pieces: List[Piece], start: int, end: int) -> Iterator[bytes]:
+    """Bytes ``start``..``end`` (inclusive) of the concatenated pieces."""
+    pos = 0
+    for piece in pieces:
+        size = _piece_len(piece)
+        lo, hi = max(start, pos), min(end + 1, pos + size)
+        if lo < hi:
+            if isinstance(piece, bytes):
+                yield piece[lo - pos:hi - pos]
+            else:
+                path, offset, _ = piece
+                with open(path, "rb") as f:
+                    f.seek(offset + lo - pos)
+                    remaining = hi - lo
+                    while remaining > 0:
+                        chunk = f.read(min(_CHUNK, remaining))
+                        if not chunk:
+                            return
+                        remaining -= len(chunk)
+                        yield chunk
+        pos += size
+        if pos > end:
+            return
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) of a single byte range, None to serve everything.
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start, end = size - int(last), size - 1  # suffix: the last N bytes
+    except ValueError:
+        return None
+    start = max(start, 0)
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def ranged_response(
+    request: Request,
+    pieces: List[Piece],
+    etag: str,
+    mtime: float,
+    media_type: str,
+    filename: Optional[str] = None,
+) -> Response:
+    size = sum(_piece_len(p) for p in pieces)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(mtime, usegmt=True),
+    }
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif _not_modified_since(request.headers.get("if-modified-since"), mtime):
+        return Response(status_code=304, headers=headers)
+
+    span = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range in (etag, headers["Last-Modified"])):
+        try:
+            span = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if span is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        (start, end), status = span, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(_iter_range(pieces, start, end), status_code=status,
+                             media_type=media_type, headers=headers)
+
+
+def file_etag(stat: os.stat_result, extra: str = "") -> str:
+    digest = hashlib.md5(f"{stat.st_mtime_ns}-{stat.st_size}-{extra}".encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def file_response(request: Request, path: Path, media_type: str, filename: Optional[str] = None) -> Response:
+    """A whole file, with Range and conditional request support."""
+    stat = path.stat()
+    return ranged_response(request, [(path, 0, stat.st_size)], file_etag(stat), stat.st_mtime,
+                           media_type, filename)
+
+
+# ── Streaming ZIP ─────────────────────────────────────────────────────────────
+# Entries are stored, with the CRC (unknown until the file has been read) in a
+# data descriptor after each one; sizes are known in advance, so the archive
+# length is too. ZIP64 fields are used only where a size or offset needs them.
+
+_ZIP64_LIMIT = 0xFFFFFFFF  # sizes / offsets from here on need ZIP64 fields
+_MAX32 = 0xFFFFFFFF        # "see the ZIP64 field" marker
+_FLAGS = 0x0808  # data descriptor follows | UTF-8 names
+
+
+def _dos_time(mtime: float) -> Tuple[int, int]:
+    t = time.localtime(max(mtime, 315532800))  # DOS dates start in 1980
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), \
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+ZipSource = Tuple[str, int, float, Callable[[], BinaryIO]]  # name, size, mtime, opener
+
+
+class _ZipEntry:
+    def __init__(self, source: ZipSource, offset: int):
+        name, self.size, self.mtime, self.open = source
+        self.name = name.encode("utf-8")
+        self.offset = offset  # of its local header
+        self.crc = 0
+
+    @property
+    def zip64_size(self) -> bool:
+        return self.size >= _ZIP64_LIMIT
+
+    def local_length(self) -> int:
+        return 30 + len(self.name) + self.size + (24 if self.zip64_size else 16)
+
+    def _zip64_extra(self) -> bytes:
+        fields = [self.size, self.size] if self.zip64_size else []
+        if self.offset >= _ZIP64_LIMIT:
+            fields.append(self.offset)
+        if not fields:
+            return b""
+        return struct.pack(f"<HH{len(fields)}Q", 0x0001, 8 * len(fields), *fields)
+
+    def central_length(self) -> int:
+        return 46 + len(self.name) + len(self._zip64_extra())
+
+    def local_header(self) -> bytes:
+        mod_time, mod_date = _dos_time(self.mtime)
+        return struct.pack("<IHHHHHIIIHH", 0x04034B50, 45 if self.zip64_size else 20, _FLAGS, 0,
+                           mod_time, mod_date, 0, 0, 0, len(self.name), 0) + self.name
+
+    def data_descriptor(self) -> bytes:
+        if self.zip64_size:
+            return struct.pack("<IIQQ", 0x08074B50, self.crc, self.size, self.size)
+        return struct.pack("<IIII", 0x08074B50, self.crc, self.size, self.size)
+
+    def central_header(self) -> bytes:
+        extra = self._zip64_extra()
+        mod_time, mod_date = _dos_time(self.mtime)
+        size = _MAX32 if self.zip64_size else self.size
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, 0x032D, 45 if extra else 20, _FLAGS, 0,  # made by Unix, v4.5
+            mod_time, mod_date, self.crc, size, size, len(self.name), len(extra), 0, 0, 0,
+            0o100644 << 16, _MAX32 if self.offset >= _ZIP64_LIMIT else self.offset,
+        ) + self.name + extra
+
+
+def _end_of_central_directory(count: int, cd_offset: int, cd_size: int) -> bytes:
+    if count < 0xFFFF and cd_offset < _ZIP64_LIMIT and cd_size < _ZIP64_LIMIT:
+        return struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0)
+    zip64_offset = cd_offset + cd_size
+    return (
+        struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset)
+        + struct.pack("<IIQI", 0x07064B50, 0, zip64_offset, 1)
+        + struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, 0xFFFF, 0xFFFF, _MAX32, _MAX32, 0)
+    )
+
+
+def _iter_zip(entries: List[_ZipEntry], cd_offset: int, cd_size: int) -> Iterator[bytes]:
+    for entry in entries:
+        yield entry.local_header()
+        crc = 0
+        remaining = entry.size
+        with closing(entry.open()) as f:
+            while remaining > 0:
+                chunk = f.read(min(_CHUNK, remaining))
+                if not chunk:
+                    raise OSError(f"{entry.name.decode()} shrank while it was being sent")
+                crc = zlib.crc32(chunk, crc)
+                remaining -= len(chunk)
+                yield chunk
+        entry.crc = crc
+        yield entry.data_descriptor()
+    yield b"".join(e.central_header() for e in entries)
+    yield _end_of_central_directory(len(entries), cd_offset, cd_size)
+
+
+def zip_response(files: List[ZipSource], filename: str) -> Response:
+    """Stream ``(name, size, mtime, opener)`` sources as a stored ZIP; nothing is buffered on disk."""
+    entries = []
+    offset = 0
+    for source in files:
+        entry = _ZipEntry(source, offset)
+        entries.append(entry)
+        offset += entry.local_length()
+    cd_size = sum(e.central_length() for e in entries)
+    total = offset + cd_size + len(_end_of_central_directory(len(entries), offset, cd_size))
+    return StreamingResponse(
+        _iter_zip(entries, offset, cd_size),
+        media_type="application/zip",
+        headers={
+            "Content-Length": str(total),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        },
+    )
@@ -17,6 +17,12 @@ class VideoType(str, Enum):
     EDUCATIONAL = "educational"
 
 
+class BlueprintPlanner(str, Enum):
+    AUTO = "auto"    # local rules, refined by Claude within BLUEPRINT_LLM_BUDGET_S
+    LOCAL = "local"  # local rules only
+    LLM = "llm"      # always ask Claude
+
+
 class StepStatus(str, Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -30,6 +36,7 @@ class JobStatus(str, Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 # ── Request / Response models ────────────────────────────────────────────────
@@ -44,10 +51,17 @@ class GenerateRequest(BaseModel):
     language: str = Field(default="en")
     add_background_music: bool = True
     add_captions: bool = False
+    fused_analysis: bool = Field(default=False, description="Analysis + script in one Claude call")
+    blueprint_planner: BlueprintPlanner = BlueprintPlanner.AUTO
+    speculative_tts: bool = Field(default=False, description="Synthesize voice while the script awaits approval")
+    prefetch_footage: bool = Field(default=False, description="Source footage while the user reviews script and voice")
+    extra_formats: List[VideoFormat] = Field(
+        default=[], description="Also render these formats from the same script, voice and footage")
 
 
 class GenerateResponse(BaseModel):
     job_id: str
+    deduplicated: bool = False  # True when an existing job was returned instead of a new one
 
 
 class PipelineStep(BaseModel):
@@ -60,10 +74,30 @@ class PipelineStep(BaseModel):
     completed_at: Optional[datetime] = None
 
 
+class AudioDeliverable(BaseModel):
+    format: str  # "mp3" | "opus"
+    file: str    # local path, or download URL in a JobResult
+    bitrate_kbps: int
+    size_bytes: int
+
+
+class AudioExport(BaseModel):
+    files: List[AudioDeliverable]  # MP3 first
+
+
+class VideoRendition(BaseModel):
+    video_format: str  # "16:9" | "9:16"
+    resolution: tuple
+    file: str          # local path, or download URL in a JobResult
+
+
 class JobResult(BaseModel):
     final_video: Optional[str] = None
+    renditions: List[VideoRendition] = []  # every rendered format, the requested one first
     script_file: Optional[str] = None
     voiceover_file: Optional[str] = None
+    voiceover_files: List[AudioDeliverable] = []  # every voiceover encode, MP3 first
+    stream_playlist: Optional[str] = None  # HLS playlist of the final video, when packaged
     asset_list_file: Optional[str] = None
     timeline_file: Optional[str] = None
     subtitles_file: Optional[str] = None
@@ -82,6 +116,19 @@ class Job(BaseModel):
     completed_at: Optional[datetime] = None
 
 
+class JobSummary(BaseModel):
+    job_id: str
+    title: str
+    status: JobStatus
+    current_step: int
+    created_at: datetime
+
+
+class JobPage(BaseModel):
+    jobs: List[JobSummary]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next (older) page
+
+
 # ── Internal pipeline data models ────────────────────────────────────────────
 
 class TalkingPoint(BaseModel):
@@ -173,12 +220,16 @@ class EditBlueprint(BaseModel):
 class EditResult(BaseModel):
     video_path: str
     duration_seconds: float
+    renditions: List[VideoRendition] = []  # the primary format first
 
 
 class ExportResult(BaseModel):
     final_video: str
+    renditions: List[VideoRendition] = []
     script_file: str
     voiceover_file: str
+    voiceover_files: List[AudioDeliverable] = []
+    stream_playlist: Optional[str] = None
     asset_list_file: str
     timeline_file: str
     duration_seconds: float
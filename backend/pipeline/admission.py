@@ -0,0 +1,235 @@
+"""Admission control for step 6 renders.
+
+Scenes are encoded one segment at a time, so a render's peak memory is the
+x264 encoder's lookahead buffers plus its most expensive scene: an ffmpeg
+reader for a video scene, or a 1.15x padded RGB array for an image scene.
+It grows with resolution, and a few large jobs rendering at once can still
+exhaust the machine. A job rendering extra formats runs one encoder per format
+and holds a cropped and scaled frame per format next to the shared decode.
+
+Before rendering, ``estimate`` derives a job's peak RAM and CPU from its
+``EditBlueprint``; ``controller.acquire`` queues the render (first come,
+first served) until that much budget is free. While a render runs, ``measure``
+samples the RSS of the process and its ffmpeg children, so estimated and
+observed usage can be compared in ``controller.status()`` and the model
+calibrated through ``RENDER_RAM_SCALE``.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+
+from config import config
+from models import EditBlueprint
+from pipeline.cancellation import raise_if_cancelled
+
+_MB = 1024 * 1024
+
+# Model constants (MB unless noted), fitted on 1080p renders
+_BASE_MB = 250            # MoviePy / numpy / PIL working set of one render
+_READER_PROC_MB = 45      # resident size of one ffmpeg decoder process
+_READER_FRAMES = 3        # frames buffered per reader (pipe + last frame + resized copy)
+_ENCODER_FRAMES = 48      # x264 lookahead + reference frames at the default preset
+
+
+class RenderEstimate:
+    def __init__(self, ram_mb: float, cpus: float):
+        self.ram_mb = ram_mb
+        self.cpus = cpus
+
+    def as_dict(self) -> dict:
+        return {"ram_mb": round(self.ram_mb), "cpus": self.cpus}
+
+
+def _frame_mb(w: int, h: int) -> float:
+    return w * h * 3 / _MB
+
+
+def estimate(blueprint: EditBlueprint, extra_formats: Sequence[str] = ()) -> RenderEstimate:
+    """Peak RAM and CPU of rendering ``blueprint`` (and ``extra_formats``) with ``assemble_video``."""
+    sizes = [tuple(blueprint.resolution)]
+    for fmt in extra_formats:
+        size = config.VIDEO_RESOLUTIONS.get(fmt)
+        if size is not None and fmt != blueprint.video_format and tuple(size) not in sizes:
+            sizes.append(tuple(size))
+    out_frames = [_frame_mb(w, h) for w, h in sizes]
+    largest = max(out_frames)
+
+    scene_mb = [sum(out_frames)]  # ColorClip: a single frame per format
+    for scene in blueprint.scenes:
+        asset = scene.primary_asset
+        if asset is None or not os.path.exists(asset.local_path):
+            continue
+        if asset.asset_type == "image":
+            # Per format: padded array, plus the crop and resize made for every frame
+            scene_mb.append(sum(1.15 * 1.15 * f + 2 * f for f in out_frames))
+        else:
+            # One shared reader; each format holds its crop and scaled frame
+            w, h = sizes[0]
+            src = _frame_mb(asset.width or w, asset.height or h)
+            resized = 0 if len(sizes) == 1 else 2 * sum(out_frames)
+            scene_mb.append(_READER_PROC_MB + _READER_FRAMES * max(src, largest) + resized)
+    ram = _BASE_MB + _ENCODER_FRAMES * sum(out_frames) + max(scene_mb)
+
+    # Frames are produced by one Python thread; each format's encoder gets its own threads
+    cpus = 1 + config.RENDER_ENCODER_THREADS * len(sizes)
+    return RenderEstimate(ram_mb=ram * config.RENDER_RAM_SCALE, cpus=cpus)
+
+
+# ── Observed usage ────────────────────────────────────────────────────────────
+
+def _rss_mb(pid) -> float:
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / _MB
+
+
+def _process_tree_rss_mb() -> Optional[float]:
+    """RSS of this process plus its direct children (ffmpeg), or None off Linux."""
+    try:
+        total = _rss_mb("self")
+    except OSError:
+        return None
+    me = os.getpid()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            if ppid == me:
+                total += _rss_mb(entry)
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+@contextmanager
+def measure(interval: float = 0.5):
+    """Sample process-tree RSS while the block runs.
+
+    Yields a dict whose "observed_mb" is set on exit: the peak above the RSS
+    at entry (None where /proc is unavailable). Renders that overlap share the
+    process, so each one's observation includes the others' growth.
+    """
+    usage = {"observed_mb": None}
+    baseline = _process_tree_rss_mb()
+    if baseline is None:
+        yield usage
+        return
+
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            rss = _process_tree_rss_mb()
+            if rss is not None and rss > peak[0]:
+                peak[0] = rss
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield usage
+    finally:
+        done.set()
+        sampler.join()
+        usage["observed_mb"] = round(peak[0] - baseline)
+
+
+# ── Controller ────────────────────────────────────────────────────────────────
+
+def _default_ram_budget_mb() -> float:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / _MB * 0.75
+    except (ValueError, OSError, AttributeError):
+        return 4096
+
+
+class AdmissionController:
+    def __init__(self, ram_budget_mb: float, cpu_budget: float):
+        self.ram_budget_mb = ram_budget_mb
+        self.cpu_budget = cpu_budget
+        self._cond = threading.Condition()
+        self._running: Dict[str, RenderEstimate] = {}
+        self._queue: List[str] = []
+        self._history: deque = deque(maxlen=50)
+
+    def _fits(self, est: RenderEstimate) -> bool:
+        if not self._running:
+            return True  # a render larger than the whole budget still runs, alone
+        ram = sum(e.ram_mb for e in self._running.values()) + est.ram_mb
+        cpus = sum(e.cpus for e in self._running.values()) + est.cpus
+        return ram <= self.ram_budget_mb and cpus <= self.cpu_budget
+
+    def acquire(
+        self,
+        job_id: str,
+        est: RenderEstimate,
+        cancel: Optional[threading.Event] = None,
+        on_queued: Optional[Callable[[int], None]] = None,
+        abandoned: Optional[threading.Event] = None,
+    ) -> bool:
+        """Block until the render fits the budget. Returns True if it had to queue.
+
+        Raises JobCancelled if ``cancel`` or ``abandoned`` is set while queued.
+        """
+        with self._cond:
+            self._queue.append(job_id)
+            try:
+                queued = False
+                while not (self._queue[0] == job_id and self._fits(est)):
+                    if not queued and on_queued:
+                        on_queued(self._queue.index(job_id) + 1)
+                    queued = True
+                    self._cond.wait(timeout=0.5)
+                    raise_if_cancelled(cancel)
+                    raise_if_cancelled(abandoned)
+                self._running[job_id] = est
+                return queued
+            finally:
+                self._queue.remove(job_id)
+                self._cond.notify_all()
+
+    def release(self, job_id: str, observed_mb: Optional[float] = None, seconds: float = 0.0):
+        with self._cond:
+            est = self._running.pop(job_id, None)
+            if est is not None:
+                self._history.append({
+                    "job_id": job_id,
+                    "estimated_mb": round(est.ram_mb),
+                    "observed_mb": observed_mb,
+                    "seconds": round(seconds, 1),
+                    "overlapped": bool(self._running),
+                    "finished_at": time.time(),
+                })
+            self._cond.notify_all()
+
+    def status(self) -> dict:
+        with self._cond:
+            history = list(self._history)
+            # Only renders that ran alone give a clean estimated/observed ratio
+            ratios = sorted(
+                h["observed_mb"] / h["estimated_mb"] for h in history
+                if h["observed_mb"] and h["estimated_mb"] and not h["overlapped"]
+            )
+            return {
+                "ram_budget_mb": round(self.ram_budget_mb),
+                "cpu_budget": self.cpu_budget,
+                "ram_in_use_mb": round(sum(e.ram_mb for e in self._running.values())),
+                "cpus_in_use": sum(e.cpus for e in self._running.values()),
+                "running": {job_id: e.as_dict() for job_id, e in self._running.items()},
+                "queued": list(self._queue),
+                "recent": history,
+                "suggested_ram_scale": (
+                    round(config.RENDER_RAM_SCALE * ratios[len(ratios) // 2], 2) if ratios else None
+                ),
+            }
+
+
+controller = AdmissionController(
+    ram_budget_mb=config.RENDER_RAM_BUDGET_MB or _default_ram_budget_mb(),
+    cpu_budget=config.RENDER_CPU_BUDGET or float(os.cpu_count() or 2),
+)
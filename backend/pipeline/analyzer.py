@@ -5,6 +5,7 @@ import re
 from anthropic import Anthropic
 from config import config
 from models import PromptAnalysis, TalkingPoint
+from pipeline import llm_cache
 
 client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
 
@@ -62,20 +63,28 @@ def analyze_prompt(
         language=language,
     )
 
-    response = client.messages.create(
+    return llm_cache.complete(
+        client,
+        site="analyze",
         model=config.CLAUDE_MODEL,
         max_tokens=2048,
         system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_msg}],
+        user_msg=user_msg,
+        parse=lambda text: _parse_analysis_json(text, language),
     )
 
-    raw = response.content[0].text.strip()
+
+def _parse_analysis_json(raw: str, language: str) -> PromptAnalysis:
+    raw = raw.strip()
     # Strip markdown code fences if present
     raw = re.sub(r"^```(?:json)?\s*", "", raw)
     raw = re.sub(r"\s*```$", "", raw)
 
     data = json.loads(raw)
+    return _analysis_from_data(data, language)
+
 
+def _analysis_from_data(data: dict, language: str) -> PromptAnalysis:
     talking_points = [TalkingPoint(**tp) for tp in data["talking_points"]]
 
     return PromptAnalysis(
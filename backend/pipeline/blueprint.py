@@ -2,6 +2,8 @@
 
 import json
 import re
+import threading
+from typing import Optional
 from anthropic import Anthropic
 from config import config
 from models import (
@@ -12,6 +14,8 @@ from models import (
     BlueprintScene,
     AssetItem,
 )
+from pipeline import llm_cache
+from pipeline.cancellation import raise_if_cancelled
 
 client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
 
@@ -54,27 +58,98 @@ Return ONLY this JSON (no markdown):
 }}"""
 
 
-def build_blueprint(
-    title: str,
-    script: Script,
-    tts_result: TTSResult,
-    footage_result: FootageResult,
-    video_format: str,
-    tone: str,
-    style: str,
-) -> EditBlueprint:
-    resolution = config.VIDEO_RESOLUTIONS.get(video_format, (1920, 1080))
-    tts_map = {s["scene_id"]: s for s in tts_result.scenes}
-    footage_map = {s.scene_id: s for s in footage_result.scenes}
+def _parse_json(raw: str) -> dict:
+    raw = raw.strip()
+    raw = re.sub(r"^```(?:json)?\s*", "", raw)
+    raw = re.sub(r"\s*```$", "", raw)
+    return json.loads(raw)
+
+
+# ── Local rule-based planner ──────────────────────────────────────────────────
+
+MONTAGE_TYPES = ("b-roll", "zoom-image", "sequence", "map", "text-overlay")
+PACES = ("slow", "medium", "fast")
+TRANSITIONS = ("cut", "dissolve", "fade")
+
+_SLOW_TONES = {"serious", "mysterious"}
+_FAST_TONES = {"urgent", "entertaining"}
+_FAST_STYLES = {"top10", "news"}
+
+
+def _plan_scene(index: int, total: int, name: str, duration: float,
+                scene_assets, tone: str, style: str) -> dict:
+    """Pick montage_type / pace / transition for one scene from simple editorial rules."""
+    lowered = name.lower()
+    is_hook = index == 0 or "hook" in lowered
+    is_conclusion = index == total - 1 or "conclusion" in lowered
+    is_context = "context" in lowered or "background" in lowered
+
+    primary = scene_assets.primary_asset if scene_assets else None
+    secondaries = scene_assets.secondary_assets if scene_assets else []
+
+    # Montage follows what footage we actually have
+    if primary is None:
+        montage_type = "text-overlay"
+    elif primary.asset_type == "image":
+        montage_type = "zoom-image"
+    elif secondaries and duration > 20:
+        montage_type = "sequence"
+    else:
+        montage_type = "b-roll"
+
+    # Pace: hook fast, tone/style for the body, short scenes faster, long ones slower
+    if is_hook:
+        pace = "fast"
+    elif is_conclusion:
+        pace = "slow" if tone in _SLOW_TONES else "medium"
+    elif tone in _FAST_TONES or style in _FAST_STYLES:
+        pace = "fast"
+    elif tone in _SLOW_TONES:
+        pace = "slow"
+    else:
+        pace = "medium"
+    if not is_hook and duration < 8:
+        pace = "fast"
+    elif pace == "fast" and duration > 60:
+        pace = "medium"
+
+    # Transitions: the opening cuts in, the ending fades out, the rest follow the tone
+    if is_hook:
+        transition = "cut"
+    elif is_conclusion:
+        transition = "fade"
+    elif is_context or tone in _SLOW_TONES or montage_type == "zoom-image":
+        transition = "dissolve"
+    else:
+        transition = "cut"
+
+    return {"montage_type": montage_type, "pace": pace, "transition": transition}
+
 
+def plan_scenes_locally(script: Script, tts_map: dict, footage_map: dict,
+                        tone: str, style: str) -> dict:
+    """scene_id → {montage_type, pace, transition}, without any API call."""
+    total = len(script.scenes)
+    return {
+        scene.scene_id: _plan_scene(
+            i, total, scene.name, tts_map.get(scene.scene_id, {}).get("duration", 30.0),
+            footage_map.get(scene.scene_id), tone.lower(), style.lower(),
+        )
+        for i, scene in enumerate(script.scenes)
+    }
+
+
+def _plan_scenes_with_claude(title: str, script: Script, tts_result: TTSResult,
+                             tts_map: dict, footage_map: dict, video_format: str,
+                             tone: str, style: str, timeout: Optional[float]) -> dict:
     scenes_summary_lines = []
     for scene in script.scenes:
         timing = tts_map.get(scene.scene_id, {})
         duration = timing.get("duration", 30.0)
-        has_video = footage_map.get(scene.scene_id, None)
-        has_video_flag = "video" if has_video and has_video.primary_asset else "image-only"
+        fa = footage_map.get(scene.scene_id, None)
+        asset_flag = fa.primary_asset.asset_type if fa and fa.primary_asset else "no-footage"
         scenes_summary_lines.append(
-            f"- {scene.scene_id} ({scene.name}, {duration:.1f}s, {has_video_flag}): {scene.narration[:80]}..."
+            f"- {scene.scene_id} ({scene.name}, {duration:.1f}s, {asset_flag}): {scene.narration[:80]}..."
         )
 
     scenes_summary = "\n".join(scenes_summary_lines)
@@ -88,20 +163,64 @@ def build_blueprint(
         scenes_summary=scenes_summary,
     )
 
-    try:
-        response = client.messages.create(
-            model=config.CLAUDE_MODEL,
-            max_tokens=2048,
-            system=SYSTEM_PROMPT,
-            messages=[{"role": "user", "content": user_msg}],
-        )
-        raw = response.content[0].text.strip()
-        raw = re.sub(r"^```(?:json)?\s*", "", raw)
-        raw = re.sub(r"\s*```$", "", raw)
-        claude_data = json.loads(raw)
-        claude_scenes = {s["scene_id"]: s for s in claude_data.get("scenes", [])}
-    except Exception:
-        claude_scenes = {}
+    # Within a latency budget a slow answer is worth less than the local plan: no retries
+    planner_client = client.with_options(timeout=timeout, max_retries=0) if timeout else client
+    claude_data = llm_cache.complete(
+        planner_client,
+        site="blueprint",
+        model=config.CLAUDE_MODEL,
+        max_tokens=2048,
+        system=SYSTEM_PROMPT,
+        user_msg=user_msg,
+        parse=_parse_json,
+    )
+    return {s["scene_id"]: s for s in claude_data.get("scenes", []) if "scene_id" in s}
+
+
+def _refine(local: dict, claude: dict) -> dict:
+    """Overlay Claude's choices on the local plan, keeping only valid values."""
+    allowed = {"montage_type": MONTAGE_TYPES, "pace": PACES, "transition": TRANSITIONS}
+    return {
+        key: claude.get(key) if claude.get(key) in allowed[key] else value
+        for key, value in local.items()
+    }
+
+
+def build_blueprint(
+    title: str,
+    script: Script,
+    tts_result: TTSResult,
+    footage_result: FootageResult,
+    video_format: str,
+    tone: str,
+    style: str,
+    planner: str = "auto",
+    cancel: Optional[threading.Event] = None,
+) -> EditBlueprint:
+    """Build the edit timeline.
+
+    ``planner`` chooses how montage_type / pace / transition are picked:
+    "local" uses the rule-based planner only, "llm" always asks Claude, and
+    "auto" uses the local plan, refined by Claude only when
+    ``BLUEPRINT_LLM_BUDGET_S`` allows it and Claude answers within that budget.
+    """
+    resolution = config.VIDEO_RESOLUTIONS.get(video_format, (1920, 1080))
+    tts_map = {s["scene_id"]: s for s in tts_result.scenes}
+    footage_map = {s.scene_id: s for s in footage_result.scenes}
+
+    plan = plan_scenes_locally(script, tts_map, footage_map, tone, style)
+
+    budget = config.BLUEPRINT_LLM_BUDGET_S
+    raise_if_cancelled(cancel)
+    if planner == "llm" or (planner == "auto" and budget > 0):
+        try:
+            claude_scenes = _plan_scenes_with_claude(
+                title, script, tts_result, tts_map, footage_map, video_format, tone, style,
+                timeout=budget if planner == "auto" else None,
+            )
+            plan = {sid: _refine(p, claude_scenes.get(sid, {})) for sid, p in plan.items()}
+        except Exception as e:
+            print(f"[blueprint] Claude planner unavailable ({type(e).__name__}: {e}) — using local plan")
 
     # Build blueprint scenes
     blueprint_scenes = []
@@ -111,7 +230,7 @@ def build_blueprint(
         primary = fa.primary_asset if fa else None
         secondaries = fa.secondary_assets if fa else []
 
-        cd = claude_scenes.get(scene.scene_id, {})
+        cd = plan[scene.scene_id]
 
         bp_scene = BlueprintScene(
             scene_id=scene.scene_id,
@@ -122,9 +241,9 @@ def build_blueprint(
             narration_excerpt=scene.narration[:150],
             primary_asset=primary,
             secondary_assets=secondaries,
-            montage_type=cd.get("montage_type", "b-roll"),
-            pace=cd.get("pace", "medium"),
-            transition=cd.get("transition", "cut"),
+            montage_type=cd["montage_type"],
+            pace=cd["pace"],
+            transition=cd["transition"],
         )
         blueprint_scenes.append(bp_scene)
 
@@ -0,0 +1,70 @@
+"""Cooperative job cancellation.
+
+Each job gets a ``CancelToken`` (a ``threading.Event``, so it can be passed
+anywhere a speculative ``stop`` flag is accepted). Pipeline modules call
+``raise_if_cancelled`` between scenes, downloads and API calls; encoder
+subprocesses registered with the token are killed the moment it is cancelled.
+"""
+
+import subprocess
+import threading
+from typing import Dict, Optional
+
+
+class JobCancelled(Exception):
+    """Raised inside pipeline code once the job's token has been cancelled."""
+
+
+class CancelToken(threading.Event):
+    def __init__(self):
+        super().__init__()
+        self._procs: set = set()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.set()
+        with self._lock:
+            procs = list(self._procs)
+        for proc in procs:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+
+    def register(self, proc: subprocess.Popen):
+        """Kill ``proc`` on cancellation (immediately if already cancelled)."""
+        with self._lock:
+            self._procs.add(proc)
+        if self.is_set():
+            proc.kill()
+
+    def unregister(self, proc: subprocess.Popen):
+        with self._lock:
+            self._procs.discard(proc)
+
+
+def raise_if_cancelled(cancel: Optional[threading.Event]):
+    if cancel is not None and cancel.is_set():
+        raise JobCancelled()
+
+
+_tokens: Dict[str, CancelToken] = {}
+_tokens_lock = threading.Lock()
+
+
+def token_for(job_id: str) -> CancelToken:
+    with _tokens_lock:
+        token = _tokens.get(job_id)
+        if token is None:
+            token = _tokens[job_id] = CancelToken()
+        return token
+
+
+def cancel(job_id: str):
+    token_for(job_id).cancel()
+
+
+def reset(job_id: str):
+    """Give a job a fresh token, e.g. when a cancelled job is retried."""
+    with _tokens_lock:
+        _tokens.pop(job_id, None)
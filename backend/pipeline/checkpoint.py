@@ -0,0 +1,88 @@
+"""Step artifact checkpoints.
+
+A checkpointed graph node writes its output model to
+``TEMP_DIR/<job_id>/checkpoints/<node>.json`` together with a content hash of
+the inputs it was computed from. A later run (retry, or resume after a
+restart) reuses the checkpoint instead of recomputing the step, as long as the
+inputs hash still matches and the files the artifact points at still exist.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from models import AudioExport, EditResult, FootageResult
+from storage import storage
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return value
+
+
+def inputs_hash(inputs: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {name: _jsonable(value) for name, value in sorted(inputs.items())},
+        sort_keys=True, default=str, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(checkpoint_dir: Path, name: str) -> Path:
+    return checkpoint_dir / f"{name}.json"
+
+
+def _files_exist(artifact: BaseModel) -> bool:
+    """Artifacts that point at files on disk are only valid while those files exist."""
+    if isinstance(artifact, EditResult):
+        return Path(artifact.video_path).exists() and all(Path(r.file).exists() for r in artifact.renditions)
+    if isinstance(artifact, AudioExport):
+        # Encodes are published to storage, which may have moved them off local disk
+        return all(storage.stat(Path(a.file).parent.name, Path(a.file).name) for a in artifact.files)
+    if isinstance(artifact, FootageResult):
+        return all(
+            Path(asset.local_path).exists()
+            for scene in artifact.scenes
+            for asset in ([scene.primary_asset] if scene.primary_asset else []) + scene.secondary_assets
+        )
+    return True
+
+
+def save(checkpoint_dir: Path, name: str, artifact: BaseModel, digest: str):
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    path = _path(checkpoint_dir, name)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(
+        json.dumps({"inputs_hash": digest, "artifact": artifact.model_dump(mode="json")}),
+        encoding="utf-8",
+    )
+    tmp.replace(path)
+
+
+def load(checkpoint_dir: Path, name: str, model: Type[BaseModel], digest: str) -> Optional[BaseModel]:
+    """The checkpointed artifact, or None if it is missing or stale."""
+    path = _path(checkpoint_dir, name)
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if entry.get("inputs_hash") != digest:
+        return None
+    try:
+        artifact = model(**entry["artifact"])
+    except Exception:
+        return None
+    return artifact if _files_exist(artifact) else None
+
+
+def load_unchecked(checkpoint_dir: Path, name: str, model: Type[BaseModel]) -> Optional[Tuple[BaseModel, str]]:
+    """The checkpointed artifact and its stored inputs hash, without validating either."""
+    try:
+        entry = json.loads(_path(checkpoint_dir, name).read_text(encoding="utf-8"))
+        return model(**entry["artifact"]), entry["inputs_hash"]
+    except Exception:
+        return None
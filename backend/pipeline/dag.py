@@ -0,0 +1,188 @@
+"""Dependency-graph executor for the pipeline.
+
+The pipeline is a list of nodes with declared inputs and outputs (names of
+artifacts such as "script" or "tts"). ``run_graph`` starts every node whose
+inputs are available, concurrently, until nothing more can run. Approval
+gates are ``Barrier`` nodes: they only pass once their gate has been opened
+by the caller, so a run stops cleanly in front of a closed gate and the next
+run (after approval) picks up from there. Nodes whose outputs are already in
+``data`` are treated as done.
+
+Several nodes may report to the same UI step (e.g. two export nodes for
+step 7): the step starts with the first of them and completes with the last.
+
+Nodes declared with ``checkpoint=<model>`` persist their (single) output via
+``pipeline.checkpoint`` and are restored from it on later runs when their
+inputs are unchanged.
+"""
+
+import asyncio
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from job_store import store
+from pipeline import checkpoint, llm_cache
+from pipeline.cancellation import JobCancelled
+
+Summary = Union[str, Dict[int, str]]
+
+
+class StepNode:
+    def __init__(
+        self,
+        name: str,
+        run: Optional[Callable[[dict], Any]],
+        inputs: Tuple[str, ...] = (),
+        outputs: Tuple[str, ...] = (),
+        steps: Tuple[int, ...] = (),
+        start_message: str = "",
+        summary: Optional[Callable[[dict], Summary]] = None,
+        checkpoint: Optional[type] = None,
+    ):
+        self.name = name
+        self.run = run                  # async fn(data) -> {output: value}
+        self.inputs = inputs
+        self.outputs = outputs
+        self.steps = steps              # UI pipeline steps this node reports to
+        self.start_message = start_message
+        self.summary = summary          # fn(data) -> completion message(s)
+        self.checkpoint = checkpoint    # output model to checkpoint, if any
+
+
+class Barrier(StepNode):
+    """Approval gate: passes (emits an artifact named after itself) once opened."""
+
+    def __init__(self, name: str, inputs: Tuple[str, ...]):
+        super().__init__(name, run=None, inputs=inputs, outputs=(name,))
+
+
+def _messages(node: StepNode, data: dict, stats: llm_cache.CacheStats, restored: bool) -> Dict[int, str]:
+    summary = node.summary(data) if node.summary else ""
+    per_step = summary if isinstance(summary, dict) else {s: summary for s in node.steps}
+    extra = "restored from checkpoint" if restored else stats.summary()
+    return {
+        step: " | ".join(m for m in (per_step.get(step, ""), extra) if m)
+        for step in node.steps
+    }
+
+
+async def run_graph(
+    job_id: str,
+    nodes: Iterable[StepNode],
+    data: Dict[str, Any],
+    open_gates: Iterable[str] = (),
+    checkpoint_dir: Optional[Path] = None,
+    cancel=None,
+) -> bool:
+    """Run every reachable node of the graph. Returns False if a node failed
+    or the run was cancelled.
+
+    ``data`` is updated in place with each node's outputs. Per-node wall times
+    are merged into the job's "timings" pipeline data. Checkpointed nodes are
+    saved to / restored from ``checkpoint_dir`` when it is given. Once
+    ``cancel`` is set no new node is started; a node raising ``JobCancelled``
+    stops the run without failing the job (the caller marks it cancelled).
+    """
+    nodes = list(nodes)
+    open_gates = set(open_gates)
+    pending = [n for n in nodes if not all(o in data for o in n.outputs)]
+    steps_left: Dict[int, int] = {}
+    for n in pending:
+        for s in n.steps:
+            steps_left[s] = steps_left.get(s, 0) + 1
+    step_messages: Dict[int, list] = {}
+    started_steps: set = set()
+
+    timings: Dict[str, float] = {}
+    running: Dict[asyncio.Task, Tuple[StepNode, float]] = {}
+    t_start = time.perf_counter()
+
+    async def execute(node: StepNode):
+        stats = llm_cache.track()  # this task's own context: stats stay per node
+        if node.checkpoint is None or checkpoint_dir is None:
+            return await node.run(data), stats, False
+
+        digest = checkpoint.inputs_hash({i: data[i] for i in node.inputs})
+        artifact = checkpoint.load(checkpoint_dir, node.name, node.checkpoint, digest)
+        if artifact is not None:
+            return {node.outputs[0]: artifact}, stats, True
+        outputs = await node.run(data)
+        checkpoint.save(checkpoint_dir, node.name, outputs[node.outputs[0]], digest)
+        return outputs, stats, False
+
+    while True:
+        if cancel is not None and cancel.is_set():
+            for task in running:
+                task.cancel()
+            _record_timings(job_id, timings)
+            print(f"[dag] {job_id[:8]} cancelled")
+            return False
+
+        # Launch everything that became ready
+        for node in list(pending):
+            if not all(i in data for i in node.inputs):
+                continue
+            if isinstance(node, Barrier):
+                if node.name in open_gates:
+                    data[node.name] = True
+                    pending.remove(node)
+                continue
+            pending.remove(node)
+            for s in node.steps:
+                if s not in started_steps:
+                    started_steps.add(s)
+                    store.start_step(job_id, s, node.start_message)
+            print(f"[dag] {job_id[:8]} ▶ {node.name}")
+            running[asyncio.ensure_future(execute(node))] = (node, time.perf_counter())
+
+        if not running:
+            # Barriers may have opened new paths; loop again only if something is ready
+            if any(all(i in data for i in n.inputs) and (not isinstance(n, Barrier) or n.name in open_gates)
+                   for n in pending):
+                continue
+            break
+
+        done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            node, t0 = running.pop(task)
+            elapsed = time.perf_counter() - t0
+            timings[node.name] = round(elapsed, 3)
+            try:
+                outputs, stats, restored = task.result()
+            except (JobCancelled, asyncio.CancelledError):
+                for other in running:
+                    other.cancel()
+                _record_timings(job_id, timings)
+                print(f"[dag] {job_id[:8]} cancelled during {node.name}")
+                return False
+            except Exception as e:
+                traceback.print_exc()
+                for other in running:
+                    other.cancel()
+                _record_timings(job_id, timings)
+                job = store.get(job_id)
+                step = node.steps[0] if node.steps else (job.current_step if job else None)
+                store.fail_job(job_id, f"{type(e).__name__}: {e}", step=step)
+                return False
+
+            data.update(outputs or {})
+            print(f"[dag] {job_id[:8]} ✓ {node.name} ({elapsed:.1f}s){' from checkpoint' if restored else ''}")
+            for step, message in _messages(node, data, stats, restored).items():
+                step_messages.setdefault(step, []).append(message)
+                steps_left[step] -= 1
+                if steps_left[step] == 0:
+                    store.complete_step(job_id, step, " | ".join(m for m in step_messages[step] if m))
+
+    wall = time.perf_counter() - t_start
+    if timings:
+        print(f"[dag] {job_id[:8]} wall {wall:.1f}s vs {sum(timings.values()):.1f}s of node time")
+    _record_timings(job_id, timings)
+    return True
+
+
+def _record_timings(job_id: str, timings: Dict[str, float]):
+    merged = dict(store.get_pipeline_data(job_id, "timings") or {})
+    merged.update(timings)
+    store.set_pipeline_data(job_id, "timings", merged)
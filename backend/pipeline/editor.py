@@ -1,12 +1,34 @@
-"""Step 6 – Video Assembly: combine footage + voice into final video using MoviePy."""
+"""Step 6 – Video Assembly: combine footage + voice into final video using MoviePy.
 
+Every scene is encoded to its own segment file under ``segments/``, named by a
+hash of what it shows (asset, duration, resolution, fps). The final video is
+the segments joined by ffmpeg stream copy with the voiceover muxed in, so a
+re-run after one scene changed re-encodes only that scene's segment.
+``segments/index.json`` lists the segments of the last assembly.
+
+``extra_formats`` renders the same timeline in other formats of
+``VIDEO_RESOLUTIONS`` as well. A scene missing in several formats is encoded
+for all of them in one pass: each source frame is decoded once, centre-cropped
+and scaled per format, and fed to one ffmpeg encoder per format running side
+by side.
+"""
+
+import hashlib
+import json
+import math
 import os
-import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import soundfile as sf
 
 from config import config
-from models import EditBlueprint, BlueprintScene, AssetItem, EditResult
+from models import EditBlueprint, BlueprintScene, AssetItem, EditResult, VideoRendition
+from pipeline.cancellation import raise_if_cancelled
+from pipeline.ffmpeg import run_ffmpeg
 
 # MoviePy imports — handle both 1.x and 2.x gracefully
 try:
@@ -34,6 +56,24 @@ except ImportError:
         MOVIEPY_AVAILABLE = False
 
 
+def _cancel_logger(cancel: threading.Event):
+    """A proglog logger that aborts the render from inside MoviePy's frame loop.
+
+    MoviePy reports progress for every frame it writes; raising there unwinds
+    ``write_videofile``, which closes (and so stops) its ffmpeg subprocess.
+    """
+    import proglog
+
+    class _CancelLogger(proglog.ProgressBarLogger):
+        def callback(self, **changes):
+            raise_if_cancelled(cancel)
+
+        def bars_callback(self, bar, attr, value, old_value=None):
+            raise_if_cancelled(cancel)
+
+    return _CancelLogger()
+
+
 def _resize_clip(clip, target_w: int, target_h: int):
     """Resize clip to fill target resolution, cropping if needed."""
     clip_w, clip_h = clip.w, clip.h
@@ -100,32 +140,184 @@ def _clip_for_scene(
         return _make_image_clip(asset, duration, target_w, target_h)
 
     # Video clip
+    raw = _scene_video(scene)
+    if raw is None:
+        return mpy.ColorClip(size=(target_w, target_h), color=fallback_color, duration=duration)
+    return _resize_clip(raw, target_w, target_h)
+
+
+def _open_video(path: str, duration: float):
+    raw = VideoFileClip(path, audio=False)
+    # Loop if shorter than needed
+    if raw.duration < duration:
+        loops = int(duration / raw.duration) + 1
+        raw = concatenate_videoclips([raw] * loops)
+    return raw.subclip(0, duration)
+
+
+def _scene_video(scene: BlueprintScene):
+    """The scene's video at its source size, else its first secondary asset that opens, else None."""
     try:
-        raw = VideoFileClip(local, audio=False)
-        # Loop if shorter than needed
-        if raw.duration < duration:
-            loops = int(duration / raw.duration) + 1
-            raw = concatenate_videoclips([raw] * loops)
-        raw = raw.subclip(0, duration)
-        raw = _resize_clip(raw, target_w, target_h)
-        return raw
+        return _open_video(scene.primary_asset.local_path, scene.duration)
     except Exception as e:
-        print(f"[editor] Error loading video {local}: {e}")
-        # Try secondary asset
-        for sec in scene.secondary_assets:
-            if not os.path.exists(sec.local_path):
-                continue
-            try:
-                raw2 = VideoFileClip(sec.local_path, audio=False)
-                if raw2.duration < duration:
-                    loops = int(duration / raw2.duration) + 1
-                    raw2 = concatenate_videoclips([raw2] * loops)
-                raw2 = raw2.subclip(0, duration)
-                raw2 = _resize_clip(raw2, target_w, target_h)
-                return raw2
-            except Exception:
-                pass
-        return mpy.ColorClip(size=(target_w, target_h), color=fallback_color, duration=duration)
+        print(f"[editor] Error loading video {scene.primary_asset.local_path}: {e}")
+    for sec in scene.secondary_assets:
+        if not os.path.exists(sec.local_path):
+            continue
+        try:
+            return _open_video(sec.local_path, scene.duration)
+        except Exception:
+            pass
+    return None
+
+
+def _asset_key(asset: AssetItem) -> dict:
+    # The file name, not its directory: a variant job links the same footage into its own folder
+    return {**asset.model_dump(), "local_path": os.path.basename(asset.local_path)}
+
+
+def _segment_key(scene: BlueprintScene, resolution: tuple, fps: int) -> str:
+    """What a segment's pixels depend on — not its position in the timeline."""
+    payload = json.dumps({
+        "duration": round(scene.duration, 3),
+        "primary": _asset_key(scene.primary_asset) if scene.primary_asset else None,
+        "secondary": [_asset_key(a) for a in scene.secondary_assets],
+        "resolution": list(resolution),
+        "fps": fps,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _render_segment(clip, path: Path, fps: int, cancel: Optional[threading.Event], threads: Optional[int]):
+    tmp = path.with_name(path.stem + ".part.mp4")
+    try:
+        clip.write_videofile(
+            str(tmp),
+            fps=fps,
+            codec="libx264",
+            audio=False,
+            threads=threads,
+            logger=_cancel_logger(cancel) if cancel is not None else None,
+        )
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        _close_all([clip])
+    tmp.replace(path)
+
+
+# ── One decode, several formats ───────────────────────────────────────────────
+
+def _fill(frame: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
+    """Centre-crop ``frame`` to the target aspect ratio, then scale it to the target size."""
+    from PIL import Image
+
+    src_h, src_w = frame.shape[:2]
+    scale = max(target_w / src_w, target_h / src_h)
+    crop_w = min(src_w, round(target_w / scale))
+    crop_h = min(src_h, round(target_h / scale))
+    x1 = (src_w - crop_w) // 2
+    y1 = (src_h - crop_h) // 2
+    cropped = Image.fromarray(frame[y1 : y1 + crop_h, x1 : x1 + crop_w])
+    return np.asarray(cropped.resize((target_w, target_h), Image.LANCZOS))
+
+
+def _scene_frames(scene: BlueprintScene, sizes: Sequence[Tuple[int, int]]):
+    """``(frames_at, clips)``: ``frames_at(t)`` gives one callable per size producing that frame.
+
+    A video scene is decoded once per frame and only cropped and scaled per
+    size; image and fallback scenes have no decode to share and get one clip
+    per size.
+    """
+    asset = scene.primary_asset
+    if asset is not None and asset.asset_type != "image" and os.path.exists(asset.local_path):
+        raw = _scene_video(scene)
+        if raw is not None:
+            def frames_at(t: float) -> List[Callable[[], np.ndarray]]:
+                frame = raw.get_frame(t)
+                return [lambda w=w, h=h: _fill(frame, w, h) for w, h in sizes]
+            return frames_at, [raw]
+
+    clips = [_clip_for_scene(scene, w, h) for w, h in sizes]
+    return (lambda t: [lambda c=c: c.get_frame(t) for c in clips]), clips
+
+
+def _render_segments(
+    scene: BlueprintScene,
+    targets: List[Tuple[Tuple[int, int], Path]],
+    fps: int,
+    cancel: Optional[threading.Event],
+    threads: Optional[int],
+):
+    """Encode one scene to a segment per ``(size, path)`` target in a single pass."""
+    from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+    frames_at, clips = _scene_frames(scene, [size for size, _ in targets])
+    tmps = [path.with_name(path.stem + ".part.mp4") for _, path in targets]
+    writers = []
+    try:
+        for (size, _), tmp in zip(targets, tmps):
+            writers.append(FFMPEG_VideoWriter(str(tmp), size, fps, codec="libx264", threads=threads))
+
+        def encode(writer, make_frame):
+            writer.write_frame(np.ascontiguousarray(make_frame(), dtype=np.uint8))
+
+        # Crop, scale and pipe to every encoder at once; the encoders run as separate processes
+        with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            # As many frames as write_videofile gives: a partial last frame still counts
+            for i in range(math.ceil(scene.duration * fps)):
+                raise_if_cancelled(cancel)
+                list(pool.map(encode, writers, frames_at(i / fps)))
+    except BaseException:
+        for tmp in tmps:
+            tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        _close_all(writers + clips)
+    for tmp, (_, path) in zip(tmps, targets):
+        tmp.replace(path)
+
+
+def rendition_formats(blueprint: EditBlueprint, extra_formats: Sequence[str] = ()) -> List[Tuple[str, tuple]]:
+    """``(video_format, resolution)`` to render: the blueprint's own first, then each extra one once."""
+    formats = [(blueprint.video_format, tuple(blueprint.resolution))]
+    for fmt in extra_formats:
+        if fmt in config.VIDEO_RESOLUTIONS and fmt not in (f for f, _ in formats):
+            formats.append((fmt, tuple(config.VIDEO_RESOLUTIONS[fmt])))
+    return formats
+
+
+# ── Assembly ──────────────────────────────────────────────────────────────────
+
+def _join_segments(
+    seg_dir: Path,
+    segments: list,
+    audio_path: str,
+    audio_duration: float,
+    out_path: Path,
+    cancel: Optional[threading.Event],
+):
+    """Join by stream copy, mux the voiceover, trim to the narration."""
+    concat_list = seg_dir / f"concat_{out_path.stem}.txt"
+    concat_list.write_text(
+        "".join(f"file '{(seg_dir / s['file']).resolve()}'\n" for s in segments), encoding="utf-8"
+    )
+    tmp_out = out_path.with_name(out_path.stem + ".part.mp4")
+    try:
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", str(concat_list),
+            "-i", str(audio_path),
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c:v", "copy", "-c:a", "aac", "-b:a", "192k",
+            "-t", f"{audio_duration:.3f}",
+            "-movflags", "+faststart",
+            str(tmp_out),
+        ], cancel)
+    except BaseException:
+        tmp_out.unlink(missing_ok=True)
+        raise
+    tmp_out.replace(out_path)
 
 
 def assemble_video(
@@ -133,93 +325,90 @@ def assemble_video(
     audio_path: str,
     job_dir: Path,
     add_background_music: bool = True,
+    cancel: Optional[threading.Event] = None,
+    threads: Optional[int] = None,
+    extra_formats: Sequence[str] = (),
 ) -> EditResult:
     if not MOVIEPY_AVAILABLE:
         raise RuntimeError(
             "MoviePy is not installed. Run: pip install moviepy"
         )
 
-    target_w, target_h = blueprint.resolution
+    formats = rendition_formats(blueprint, extra_formats)
     fps = blueprint.fps
-    temp_dir = job_dir / "temp_clips"
-    temp_dir.mkdir(parents=True, exist_ok=True)
+    seg_dir = job_dir / "segments"
+    seg_dir.mkdir(parents=True, exist_ok=True)
+
+    if not blueprint.scenes:
+        raise RuntimeError("No scene clips could be created.")
 
-    # Build scene clips
-    scene_clips = []
+    # Encode the segments that are not already on disk
+    segments = {fmt: [] for fmt, _ in formats}
+    encoded = 0
     for scene in blueprint.scenes:
-        print(f"[editor] Building clip for scene: {scene.scene_name}")
-        clip = _clip_for_scene(scene, target_w, target_h)
-        scene_clips.append(clip)
+        raise_if_cancelled(cancel)
+        paths = {fmt: seg_dir / f"{scene.scene_id}_{_segment_key(scene, size, fps)}.mp4" for fmt, size in formats}
+        missing = [(size, paths[fmt]) for fmt, size in formats if not paths[fmt].exists()]
+        if missing:
+            print(f"[editor] Encoding segment for scene: {scene.scene_name} ({len(missing)} format(s))")
+        if len(missing) == 1:
+            (w, h), path = missing[0]
+            _render_segment(_clip_for_scene(scene, w, h), path, fps, cancel, threads)
+        elif missing:
+            _render_segments(scene, missing, fps, cancel, threads)
+        encoded += len(missing)
+        for fmt, _ in formats:
+            segments[fmt].append({"scene_id": scene.scene_id, "file": paths[fmt].name, "duration": scene.duration})
 
-    if not scene_clips:
-        raise RuntimeError("No scene clips could be created.")
+    # Extend with a dark tail when the narration outlasts the scenes
+    audio_duration = sf.info(audio_path).duration
+    video_duration = sum(s.duration for s in blueprint.scenes)
+    if video_duration < audio_duration:
+        tail = round(audio_duration - video_duration, 3)
+        for fmt, (target_w, target_h) in formats:
+            path = seg_dir / f"tail_{target_w}x{target_h}_{fps}_{tail}.mp4"
+            if not path.exists():
+                clip = mpy.ColorClip(size=(target_w, target_h), color=(10, 10, 10), duration=tail)
+                _render_segment(clip, path, fps, cancel, threads)
+            segments[fmt].append({"scene_id": None, "file": path.name, "duration": tail})
 
-    # Concatenate
-    print("[editor] Concatenating clips...")
-    final_video = concatenate_videoclips(scene_clips, method="compose")
-
-    # Load voiceover
-    print("[editor] Loading voiceover...")
-    voiceover = AudioFileClip(audio_path)
-
-    # Trim / extend video to match audio duration
-    audio_duration = voiceover.duration
-    if final_video.duration > audio_duration:
-        final_video = final_video.subclip(0, audio_duration)
-    elif final_video.duration < audio_duration:
-        # Extend last frame
-        last_frame_duration = audio_duration - final_video.duration
-        last_clip = mpy.ColorClip(
-            size=(target_w, target_h),
-            color=(10, 10, 10),
-            duration=last_frame_duration,
-        )
-        final_video = concatenate_videoclips([final_video, last_clip], method="compose")
-
-    # Optionally add background music
-    audio_tracks = [voiceover]
-
-    if add_background_music:
-        # Use a generated low-frequency audio bed (no external music needed)
-        # In production you'd load an actual royalty-free music file
-        pass  # Skip music for now to keep it simple
-
-    if len(audio_tracks) == 1:
-        final_audio = audio_tracks[0]
-    else:
-        final_audio = CompositeAudioClip(audio_tracks)
-
-    final_video = final_video.set_audio(final_audio)
-    final_video = final_video.set_fps(fps)
-
-    out_path = job_dir / "assembled_video.mp4"
-    print(f"[editor] Rendering final video to {out_path} ...")
-    final_video.write_videofile(
-        str(out_path),
-        fps=fps,
-        codec="libx264",
-        audio_codec="aac",
-        temp_audiofile=str(temp_dir / "temp_audio.m4a"),
-        remove_temp=True,
-        logger=None,
+    (seg_dir / "index.json").write_text(json.dumps({
+        "fps": fps,
+        "renditions": [
+            {"video_format": fmt, "resolution": list(size), "segments": segments[fmt]}
+            for fmt, size in formats
+        ],
+    }, indent=2), encoding="utf-8")
+    current = {s["file"] for fmt_segments in segments.values() for s in fmt_segments}
+    for stale in seg_dir.glob("*.mp4"):
+        if stale.name not in current:
+            stale.unlink(missing_ok=True)
+
+    renditions = []
+    for fmt, (w, h) in formats:
+        name = f"assembled_video_{w}x{h}.mp4" if renditions else "assembled_video.mp4"
+        renditions.append(VideoRendition(video_format=fmt, resolution=(w, h), file=str(job_dir / name)))
+    print(f"[editor] Joining {len(blueprint.scenes)} scenes in {len(formats)} format(s) "
+          f"({encoded} segment(s) re-encoded) → {renditions[0].file}")
+    with ThreadPoolExecutor(max_workers=len(renditions)) as pool:
+        joins = [
+            pool.submit(_join_segments, seg_dir, segments[r.video_format], audio_path, audio_duration,
+                        Path(r.file), cancel)
+            for r in renditions
+        ]
+        for join in joins:
+            join.result()
+
+    return EditResult(
+        video_path=renditions[0].file,
+        duration_seconds=audio_duration,
+        renditions=renditions,
     )
 
-    # Cleanup temp clips
-    for clip in scene_clips:
+
+def _close_all(clips: list):
+    for clip in clips:
         try:
             clip.close()
         except Exception:
             pass
-    try:
-        voiceover.close()
-    except Exception:
-        pass
-    try:
-        final_video.close()
-    except Exception:
-        pass
-
-    return EditResult(
-        video_path=str(out_path),
-        duration_seconds=audio_duration,
-    )
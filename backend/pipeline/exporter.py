@@ -1,17 +1,36 @@
-"""Step 7 – Export & Delivery: organise all deliverables into output directory."""
+"""Step 7 – Export & Delivery: organise all deliverables into output directory.
+
+The voiceover is encoded from the WAV by ffmpeg (MP3, plus Opus when
+``VOICEOVER_OPUS_KBPS`` is set) in one pass that streams the file. With
+``HLS_PACKAGING`` the video is also remuxed, without re-encoding, into
+fragmented-MP4 HLS under ``hls/`` so players can start and seek after
+fetching a few segments. Extra formats rendered alongside the requested one
+are published as ``final_video_<format>.mp4`` (e.g. ``final_video_9x16.mp4``);
+only the requested format is packaged as HLS.
+
+Files are written to ``output_base/<job_id>`` and published through
+``storage`` (a no-op for local storage; an upload for S3).
+"""
 
 import json
 import shutil
+import threading
 from pathlib import Path
 from datetime import datetime
+from typing import List, Optional
 
+from config import config
+from pipeline.ffmpeg import run_ffmpeg
+from storage import storage
 from models import (
+    AudioDeliverable,
     Script,
     TTSResult,
     FootageResult,
     EditBlueprint,
     EditResult,
     ExportResult,
+    VideoRendition,
 )
 
 
@@ -25,12 +44,142 @@ def export_deliverables(
     edit_result: EditResult,
     output_base: Path,
 ) -> ExportResult:
+    documents = export_documents(job_id, title, script, tts_result, footage_result, blueprint, output_base)
+    audio = export_audio(job_id, tts_result, output_base)
+    renditions = export_video(job_id, edit_result, output_base)
+    stream = export_stream(job_id, edit_result, output_base) if config.HLS_PACKAGING else None
+    return ExportResult(
+        final_video=renditions[0].file,
+        renditions=renditions,
+        voiceover_file=audio[0].file,
+        voiceover_files=audio,
+        stream_playlist=stream,
+        duration_seconds=edit_result.duration_seconds,
+        **documents,
+    )
+
+
+def video_filename(video_format: Optional[str] = None) -> str:
+    """``final_video.mp4`` for the requested format, ``final_video_9x16.mp4`` for an extra one."""
+    return f"final_video_{video_format.replace(':', 'x')}.mp4" if video_format else "final_video.mp4"
+
+
+def export_video(job_id: str, edit_result: EditResult, output_base: Path) -> List[VideoRendition]:
+    """Publish every rendered format, straight from the render output. The requested one comes first."""
     out_dir = output_base / job_id
     out_dir.mkdir(parents=True, exist_ok=True)
 
     # ── 1. Final video ────────────────────────────────────────────────────────
-    final_video_path = out_dir / "final_video.mp4"
-    shutil.copy2(edit_result.video_path, final_video_path)
+    renditions = edit_result.renditions or [
+        VideoRendition(video_format="", resolution=(), file=edit_result.video_path)]
+    published = []
+    for i, rendition in enumerate(renditions):
+        name = video_filename(rendition.video_format if i else None)
+        storage.put(job_id, name, Path(rendition.file))
+        published.append(rendition.model_copy(update={"file": str(out_dir / name)}))
+    return published
+
+
+def export_stream(
+    job_id: str,
+    edit_result: EditResult,
+    output_base: Path,
+    cancel: Optional[threading.Event] = None,
+) -> str:
+    """Package the rendered video as ``hls/index.m3u8`` + fMP4 segments (stream copy).
+
+    Segments are cut on keyframes, so they last at least ``HLS_SEGMENT_S``.
+    """
+    out_dir = output_base / job_id
+    hls_dir = out_dir / "hls"
+    part_dir = out_dir / "hls.part"
+    shutil.rmtree(part_dir, ignore_errors=True)
+    part_dir.mkdir(parents=True)
+    try:
+        run_ffmpeg([
+            "-i", edit_result.video_path,
+            "-map", "0", "-c", "copy",
+            "-f", "hls",
+            "-hls_time", str(config.HLS_SEGMENT_S),
+            "-hls_playlist_type", "vod",
+            "-hls_segment_type", "fmp4",
+            "-hls_fmp4_init_filename", "init.mp4",
+            "-hls_segment_filename", str(part_dir / "seg_%05d.m4s"),
+            str(part_dir / "index.m3u8"),
+        ], cancel)
+    except BaseException:
+        shutil.rmtree(part_dir, ignore_errors=True)
+        raise
+    shutil.rmtree(hls_dir, ignore_errors=True)
+    part_dir.rename(hls_dir)
+    # Segments first, so the playlist never references one that is not published yet
+    for path in sorted(hls_dir.iterdir(), key=lambda p: p.suffix == ".m3u8"):
+        storage.put(job_id, f"hls/{path.name}", path, move=True)
+    if not storage.is_local:
+        shutil.rmtree(hls_dir, ignore_errors=True)
+    return str(hls_dir / "index.m3u8")
+
+
+_AUDIO_CODECS = {"mp3": ("libmp3lame", "mp3"), "opus": ("libopus", "opus")}
+
+
+def export_audio(
+    job_id: str,
+    tts_result: TTSResult,
+    output_base: Path,
+    cancel: Optional[threading.Event] = None,
+) -> List[AudioDeliverable]:
+    """Encode the voiceover WAV to ``voiceover.mp3`` (and ``voiceover.opus``).
+
+    A single ffmpeg run reads the WAV once and writes every format.
+    """
+    out_dir = output_base / job_id
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    targets = [("mp3", config.VOICEOVER_MP3_KBPS)]
+    if config.VOICEOVER_OPUS_KBPS:
+        targets.append(("opus", config.VOICEOVER_OPUS_KBPS))
+
+    args = ["-i", tts_result.audio_path]
+    for fmt, kbps in targets:
+        codec, muxer = _AUDIO_CODECS[fmt]
+        args += ["-map", "0:a", "-c:a", codec, "-b:a", f"{kbps}k", "-f", muxer,
+                 str(out_dir / f"voiceover.part.{fmt}")]
+    try:
+        run_ffmpeg(args, cancel)
+    except BaseException:
+        for fmt, _ in targets:
+            (out_dir / f"voiceover.part.{fmt}").unlink(missing_ok=True)
+        raise
+
+    deliverables = []
+    for fmt, kbps in targets:
+        path = out_dir / f"voiceover.{fmt}"
+        (out_dir / f"voiceover.part.{fmt}").replace(path)
+        deliverables.append(AudioDeliverable(
+            format=fmt, file=str(path), bitrate_kbps=kbps, size_bytes=path.stat().st_size))
+        storage.put(job_id, path.name, path, move=True)
+    print("[export] Voiceover encoded: " + ", ".join(
+        f"{d.format} {d.bitrate_kbps} kbps {d.size_bytes / 1e6:.1f} MB" for d in deliverables))
+    return deliverables
+
+
+def export_documents(
+    job_id: str,
+    title: str,
+    script: Script,
+    tts_result: TTSResult,
+    footage_result: FootageResult,
+    blueprint: EditBlueprint,
+    output_base: Path,
+) -> dict:
+    """Write every deliverable that does not depend on the render.
+
+    Returns the script/asset list/timeline paths, keyed like ExportResult. The
+    voiceover is encoded separately by ``export_audio``.
+    """
+    out_dir = output_base / job_id
+    out_dir.mkdir(parents=True, exist_ok=True)
 
     # ── 2. Script ─────────────────────────────────────────────────────────────
     script_path = out_dir / "script.txt"
@@ -41,11 +190,7 @@ def export_deliverables(
         script_lines.append("")
     script_path.write_text("\n".join(script_lines), encoding="utf-8")
 
-    # ── 3. Voiceover ─────────────────────────────────────────────────────────
-    voiceover_dest = out_dir / "voiceover.mp3"
-    shutil.copy2(tts_result.audio_path, voiceover_dest)
-
-    # ── 4. Asset list ─────────────────────────────────────────────────────────
+    # ── 3. Asset list ─────────────────────────────────────────────────────────
     asset_data = []
     for sa in footage_result.scenes:
         if sa.primary_asset:
@@ -73,7 +218,7 @@ def export_deliverables(
     asset_list_path = out_dir / "assets.json"
     asset_list_path.write_text(json.dumps(asset_data, indent=2), encoding="utf-8")
 
-    # ── 5. Timeline ───────────────────────────────────────────────────────────
+    # ── 4. Timeline ───────────────────────────────────────────────────────────
     timeline_data = {
         "title": title,
         "total_duration_seconds": blueprint.total_duration,
@@ -99,11 +244,11 @@ def export_deliverables(
     timeline_path = out_dir / "timeline.json"
     timeline_path.write_text(json.dumps(timeline_data, indent=2), encoding="utf-8")
 
-    return ExportResult(
-        final_video=str(final_video_path),
-        script_file=str(script_path),
-        voiceover_file=str(voiceover_dest),
-        asset_list_file=str(asset_list_path),
-        timeline_file=str(timeline_path),
-        duration_seconds=edit_result.duration_seconds,
-    )
+    for path in (script_path, asset_list_path, timeline_path):
+        storage.put(job_id, path.name, path, move=True)
+
+    return {
+        "script_file": str(script_path),
+        "asset_list_file": str(asset_list_path),
+        "timeline_file": str(timeline_path),
+    }
@@ -0,0 +1,32 @@
+"""The ffmpeg binary bundled with imageio-ffmpeg, run as a cancellable subprocess."""
+
+import subprocess
+import threading
+from typing import List, Optional
+
+from pipeline.cancellation import raise_if_cancelled
+
+
+def ffmpeg_exe() -> str:
+    import imageio_ffmpeg
+
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def run_ffmpeg(args: List[str], cancel: Optional[threading.Event] = None):
+    """Run ffmpeg; the process is killed as soon as the job is cancelled."""
+    proc = subprocess.Popen(
+        [ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error", *args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    register = getattr(cancel, "register", None)
+    if register:
+        register(proc)
+    try:
+        _, stderr = proc.communicate()
+    finally:
+        if register:
+            cancel.unregister(proc)
+    raise_if_cancelled(cancel)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()[-500:]}")
@@ -1,12 +1,16 @@
 """Step 4 – Footage Sourcing: search and download visual assets from Pexels."""
 
+import json
 import os
 import re
+import threading
 import requests
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from config import config
-from models import Script, TTSResult, AssetItem, SceneAssets, FootageResult
+from models import Scene, Script, TTSResult, AssetItem, SceneAssets, FootageResult
+from pipeline.cancellation import raise_if_cancelled
+from pipeline.keyed_locks import KeyedLocks
 
 HEADERS = {"Authorization": config.PEXELS_API_KEY}
 
@@ -51,142 +55,268 @@ def _best_video_file(video: dict, target_w: int = 1920) -> Optional[dict]:
     return mp4_files[0]
 
 
-def _download_file(url: str, dest: Path) -> bool:
-    """Download a URL to dest path. Returns True on success."""
+def _download_file(url: str, dest: Path, stop: Optional[threading.Event] = None) -> bool:
+    """Download a URL to dest path. Returns True on success.
+
+    Writes to a temporary file first so an interrupted download never leaves
+    a truncated file at ``dest`` that later runs would mistake for footage.
+    Gives up between chunks once ``stop`` is set.
+    """
+    tmp = dest.with_name(dest.name + ".part")
     try:
-        # Remove query params that might cause issues
-        clean_url = url.split("?")[0] if "player.vimeo" not in url else url
         r = requests.get(url, stream=True, timeout=30)
         r.raise_for_status()
         dest.parent.mkdir(parents=True, exist_ok=True)
-        with open(dest, "wb") as f:
+        with open(tmp, "wb") as f:
             for chunk in r.iter_content(chunk_size=65536):
+                if stop is not None and stop.is_set():
+                    raise InterruptedError("cancelled")
                 f.write(chunk)
+        tmp.replace(dest)
         return True
     except Exception as e:
         print(f"[footage] Download failed {url}: {e}")
+        tmp.unlink(missing_ok=True)
         return False
 
 
+def _probe_video(path: Path) -> Optional[Tuple[float, int, int]]:
+    """(duration, width, height) read from the file itself, or None if unreadable."""
+    try:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+        infos = ffmpeg_parse_infos(str(path))
+        w, h = infos.get("video_size") or (0, 0)
+        return float(infos.get("duration") or 0.0), int(w), int(h)
+    except Exception as e:
+        print(f"[footage] Probe failed {path.name}: {type(e).__name__}")
+        return None
+
+
 def _safe_filename(text: str, max_len: int = 40) -> str:
     return re.sub(r"[^\w\-]", "_", text)[:max_len]
 
 
-def source_footage(
-    script: Script,
-    tts_result: TTSResult,
-    job_dir: Path,
-    video_format: str = "16:9",
-) -> FootageResult:
-    footage_dir = job_dir / "footage"
-    footage_dir.mkdir(parents=True, exist_ok=True)
+# ── Per-scene sourcing ────────────────────────────────────────────────────────
 
-    tts_map = {s["scene_id"]: s for s in tts_result.scenes}
-    scene_assets_list: List[SceneAssets] = []
+# One lock per (footage dir, scene) so a prefetch pass and step 4 never
+# download the same scene concurrently — the second one reuses the result.
+_scene_locks = KeyedLocks()
 
-    for scene in script.scenes:
-        timing = tts_map.get(scene.scene_id, {})
-        duration = timing.get("duration", 30.0)
-        keywords = scene.visual_keywords or [scene.name]
 
-        primary: Optional[AssetItem] = None
-        secondaries: List[AssetItem] = []
+def _scene_lock(footage_dir: Path, scene_id: str):
+    return _scene_locks.hold(f"{footage_dir}/{scene_id}")
 
-        for kw_idx, keyword in enumerate(keywords[:3]):  # Try up to 3 keywords
-            if primary is not None:
-                break
 
-            videos = _search_pexels_videos(keyword, per_page=3)
-            for vid in videos:
-                vf = _best_video_file(vid)
-                if vf is None:
+def _video_asset(vid: dict, vf: dict, dl_url: str, dest: Path, keyword: str) -> AssetItem:
+    probed = _probe_video(dest)
+    duration, width, height = probed or (
+        float(vid.get("duration", 0)), vf.get("width", 1920), vf.get("height", 1080)
+    )
+    return AssetItem(
+        asset_type="video",
+        url=dl_url,
+        local_path=str(dest),
+        duration=duration,
+        width=width or vf.get("width", 1920),
+        height=height or vf.get("height", 1080),
+        source="pexels",
+        license="Pexels License",
+        pexels_id=vid.get("id"),
+        keywords_matched=[keyword],
+    )
+
+
+def _source_scene(
+    scene: Scene,
+    footage_dir: Path,
+    stop: Optional[threading.Event] = None,
+) -> Tuple[Optional[AssetItem], List[AssetItem]]:
+    """Search, download and probe the primary and secondary assets of one scene."""
+    keywords = scene.visual_keywords or [scene.name]
+
+    primary: Optional[AssetItem] = None
+    secondaries: List[AssetItem] = []
+
+    for kw_idx, keyword in enumerate(keywords[:3]):  # Try up to 3 keywords
+        if primary is not None:
+            break
+        if stop is not None and stop.is_set():
+            return primary, secondaries
+
+        videos = _search_pexels_videos(keyword, per_page=3)
+        for vid in videos:
+            vf = _best_video_file(vid)
+            if vf is None:
+                continue
+            dl_url = vf.get("link", "")
+            if not dl_url:
+                continue
+            ext = ".mp4"
+            fname = f"{scene.scene_id}_{_safe_filename(keyword)}_0{ext}"
+            dest = footage_dir / fname
+            if not dest.exists():
+                ok = _download_file(dl_url, dest, stop)
+                if not ok:
                     continue
-                dl_url = vf.get("link", "")
-                if not dl_url:
+            if dest.exists():
+                primary = _video_asset(vid, vf, dl_url, dest, keyword)
+                break
+
+        # Fallback to image if no video found
+        if stop is not None and stop.is_set():
+            return primary, secondaries
+        if primary is None:
+            photos = _search_pexels_photos(keyword, per_page=3)
+            for photo in photos:
+                img_url = photo.get("src", {}).get("large2x") or photo.get("src", {}).get("original")
+                if not img_url:
                     continue
-                ext = ".mp4"
-                fname = f"{scene.scene_id}_{_safe_filename(keyword)}_0{ext}"
+                ext = ".jpg"
+                fname = f"{scene.scene_id}_{_safe_filename(keyword)}_img{ext}"
                 dest = footage_dir / fname
                 if not dest.exists():
-                    ok = _download_file(dl_url, dest)
+                    ok = _download_file(img_url, dest, stop)
                     if not ok:
                         continue
                 if dest.exists():
                     primary = AssetItem(
-                        asset_type="video",
-                        url=dl_url,
+                        asset_type="image",
+                        url=img_url,
                         local_path=str(dest),
-                        duration=float(vid.get("duration", 0)),
-                        width=vf.get("width", 1920),
-                        height=vf.get("height", 1080),
+                        width=photo.get("width", 1920),
+                        height=photo.get("height", 1080),
                         source="pexels",
                         license="Pexels License",
-                        pexels_id=vid.get("id"),
+                        pexels_id=photo.get("id"),
                         keywords_matched=[keyword],
                     )
                     break
 
-            # Fallback to image if no video found
-            if primary is None:
-                photos = _search_pexels_photos(keyword, per_page=3)
-                for photo in photos:
-                    img_url = photo.get("src", {}).get("large2x") or photo.get("src", {}).get("original")
-                    if not img_url:
-                        continue
-                    ext = ".jpg"
-                    fname = f"{scene.scene_id}_{_safe_filename(keyword)}_img{ext}"
-                    dest = footage_dir / fname
-                    if not dest.exists():
-                        ok = _download_file(img_url, dest)
-                        if not ok:
-                            continue
-                    if dest.exists():
-                        primary = AssetItem(
-                            asset_type="image",
-                            url=img_url,
-                            local_path=str(dest),
-                            width=photo.get("width", 1920),
-                            height=photo.get("height", 1080),
-                            source="pexels",
-                            license="Pexels License",
-                            pexels_id=photo.get("id"),
-                            keywords_matched=[keyword],
-                        )
-                        break
-
-        # Grab one secondary clip for variety
-        if len(keywords) > 1:
-            alt_kw = keywords[1] if len(keywords) > 1 else keywords[0]
-            videos2 = _search_pexels_videos(f"{alt_kw} detail", per_page=2)
-            for vid2 in videos2:
-                vf2 = _best_video_file(vid2)
-                if vf2 is None:
+    # Grab one secondary clip for variety
+    if len(keywords) > 1 and not (stop is not None and stop.is_set()):
+        alt_kw = keywords[1] if len(keywords) > 1 else keywords[0]
+        videos2 = _search_pexels_videos(f"{alt_kw} detail", per_page=2)
+        for vid2 in videos2:
+            vf2 = _best_video_file(vid2)
+            if vf2 is None:
+                continue
+            dl_url2 = vf2.get("link", "")
+            if not dl_url2:
+                continue
+            fname2 = f"{scene.scene_id}_{_safe_filename(alt_kw)}_1.mp4"
+            dest2 = footage_dir / fname2
+            if not dest2.exists():
+                ok2 = _download_file(dl_url2, dest2, stop)
+                if not ok2:
                     continue
-                dl_url2 = vf2.get("link", "")
-                if not dl_url2:
-                    continue
-                fname2 = f"{scene.scene_id}_{_safe_filename(alt_kw)}_1.mp4"
-                dest2 = footage_dir / fname2
-                if not dest2.exists():
-                    ok2 = _download_file(dl_url2, dest2)
-                    if not ok2:
-                        continue
-                if dest2.exists():
-                    secondaries.append(
-                        AssetItem(
-                            asset_type="video",
-                            url=dl_url2,
-                            local_path=str(dest2),
-                            duration=float(vid2.get("duration", 0)),
-                            width=vf2.get("width", 1920),
-                            height=vf2.get("height", 1080),
-                            source="pexels",
-                            license="Pexels License",
-                            pexels_id=vid2.get("id"),
-                            keywords_matched=[alt_kw],
-                        )
-                    )
-                    break
+            if dest2.exists():
+                secondaries.append(_video_asset(vid2, vf2, dl_url2, dest2, alt_kw))
+                break
+
+    return primary, secondaries
+
+
+# ── Prefetch manifest ─────────────────────────────────────────────────────────
+# footage/prefetch.json: scene_id → {keywords, primary, secondaries}. An entry
+# is only reused while the scene's visual keywords are unchanged and its files
+# still exist.
+
+_manifest_lock = threading.Lock()
+
+
+def _manifest_path(footage_dir: Path) -> Path:
+    return footage_dir / "prefetch.json"
+
+
+def _load_manifest(footage_dir: Path) -> dict:
+    try:
+        return json.loads(_manifest_path(footage_dir).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _record_prefetch(footage_dir: Path, scene: Scene, primary: Optional[AssetItem], secondaries: List[AssetItem]):
+    with _manifest_lock:
+        manifest = _load_manifest(footage_dir)
+        manifest[scene.scene_id] = {
+            "keywords": scene.visual_keywords,
+            "primary": primary.model_dump() if primary else None,
+            "secondaries": [a.model_dump() for a in secondaries],
+        }
+        tmp = _manifest_path(footage_dir).with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest), encoding="utf-8")
+        tmp.replace(_manifest_path(footage_dir))
+
+
+def _prefetched(manifest: dict, scene: Scene) -> Optional[Tuple[Optional[AssetItem], List[AssetItem]]]:
+    entry = manifest.get(scene.scene_id)
+    if not entry or entry.get("keywords") != scene.visual_keywords:
+        return None
+    primary = AssetItem(**entry["primary"]) if entry.get("primary") else None
+    secondaries = [AssetItem(**a) for a in entry.get("secondaries", [])]
+    if primary is None or not os.path.exists(primary.local_path):
+        return None
+    return primary, [a for a in secondaries if os.path.exists(a.local_path)]
+
+
+def prefetch_footage(script: Script, job_dir: Path, stop: Optional[threading.Event] = None) -> int:
+    """Speculatively source every scene while the user reviews script and voice.
+
+    Checks ``stop`` between scenes, searches and downloads. Returns the number
+    of scenes prefetched by this pass.
+    """
+    footage_dir = job_dir / "footage"
+    footage_dir.mkdir(parents=True, exist_ok=True)
+    done = 0
+    for scene in script.scenes:
+        if stop is not None and stop.is_set():
+            break
+        with _scene_lock(footage_dir, scene.scene_id):
+            if _prefetched(_load_manifest(footage_dir), scene):
+                continue
+            primary, secondaries = _source_scene(scene, footage_dir, stop)
+            if stop is not None and stop.is_set():
+                break
+            _record_prefetch(footage_dir, scene, primary, secondaries)
+            done += 1
+    print(f"[footage] Prefetched {done}/{len(script.scenes)} scenes")
+    return done
+
+
+def source_footage(
+    script: Script,
+    tts_result: Optional[TTSResult],
+    job_dir: Path,
+    video_format: str = "16:9",
+    cancel: Optional[threading.Event] = None,
+) -> FootageResult:
+    """Step 4: assets for every scene, reusing prefetched ones where still valid.
+
+    Footage does not depend on the audio; without ``tts_result`` scene
+    durations are the script's estimates (the blueprint uses real timings).
+    """
+    footage_dir = job_dir / "footage"
+    footage_dir.mkdir(parents=True, exist_ok=True)
+
+    tts_map = {s["scene_id"]: s for s in tts_result.scenes} if tts_result else {}
+    scene_assets_list: List[SceneAssets] = []
+    reused = 0
+
+    for scene in script.scenes:
+        timing = tts_map.get(scene.scene_id, {})
+        duration = timing.get("duration", scene.estimated_duration_seconds)
+
+        raise_if_cancelled(cancel)
+        with _scene_lock(footage_dir, scene.scene_id):
+            cached = _prefetched(_load_manifest(footage_dir), scene)
+            if cached is not None:
+                primary, secondaries = cached
+                reused += 1
+            else:
+                primary, secondaries = _source_scene(scene, footage_dir, cancel)
+                raise_if_cancelled(cancel)  # a cancelled scene is incomplete: never record it
+                _record_prefetch(footage_dir, scene, primary, secondaries)
 
         scene_assets_list.append(
             SceneAssets(
@@ -198,4 +328,38 @@ def source_footage(
             )
         )
 
+    if reused:
+        print(f"[footage] Reused prefetched assets for {reused}/{len(script.scenes)} scenes")
     return FootageResult(scenes=scene_assets_list)
+
+
+def replace_scene_footage(
+    scene: Scene,
+    current: SceneAssets,
+    job_dir: Path,
+    keywords: Optional[List[str]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> SceneAssets:
+    """New assets for one scene of a finished job.
+
+    With ``keywords`` the scene is sourced again from a fresh search; without,
+    its first secondary clip is promoted to primary (the old primary moves to
+    the end of the secondaries). Raises ValueError when there is nothing to
+    swap in.
+    """
+    if keywords:
+        footage_dir = job_dir / "footage"
+        footage_dir.mkdir(parents=True, exist_ok=True)
+        searched = scene.model_copy(update={"visual_keywords": keywords})
+        with _scene_lock(footage_dir, scene.scene_id):
+            primary, secondaries = _source_scene(searched, footage_dir, cancel)
+        raise_if_cancelled(cancel)
+        if primary is None:
+            raise ValueError(f"No footage found for {', '.join(keywords)}")
+    else:
+        if not current.secondary_assets:
+            raise ValueError(f"Scene {scene.scene_id} has no alternative footage")
+        primary = current.secondary_assets[0]
+        secondaries = current.secondary_assets[1:] + ([current.primary_asset] if current.primary_asset else [])
+
+    return current.model_copy(update={"primary_asset": primary, "secondary_assets": secondaries})
@@ -0,0 +1,234 @@
+"""Retention of job data and temp files.
+
+* After export, a job's working files under ``TEMP_DIR/<job_id>`` are
+  deleted — every deliverable has already been published to ``storage``.
+  Only ``job.json`` is kept, unless ``KEEP_EDIT_FILES_HOURS`` is set: then
+  what scene footage replacement and language variants re-render from
+  (checkpoints, footage, encoded segments, the WAV and its peaks) stays that
+  long after completion and a later sweep reclaims it.
+* Finished jobs (completed, failed, cancelled) older than
+  ``JOB_RETENTION_HOURS`` are forgotten and their directories (and stored
+  deliverables) removed.
+* Unfinished jobs with no step running (typically waiting at an approval
+  gate) and no change for ``IDLE_JOB_TTL_HOURS`` are cancelled and removed
+  the same way.
+* With ``DISK_QUOTA_MB`` set, finished jobs are evicted least recently used
+  first (by last download, else completion time) until TEMP_DIR + OUTPUT_DIR
+  fit the quota.
+
+``run_janitor`` repeats the sweep every ``JANITOR_INTERVAL_S`` and logs the
+reclaimed bytes; ``status`` reports the last sweep and running totals.
+"""
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+from config import config
+from job_store import store
+from storage import storage
+from models import JobStatus, StepStatus
+from pipeline import cancellation
+
+_FINISHED = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+_UNFINISHED = (JobStatus.PENDING, JobStatus.RUNNING)
+
+_lock = threading.Lock()
+_last_access: Dict[str, float] = {}
+_last_report: dict = {}
+_totals = {"sweeps": 0, "reclaimed_bytes": 0, "jobs_deleted": 0}
+
+
+def touch(job_id: str):
+    """Record a download, so quota eviction keeps recently used jobs."""
+    _last_access[job_id] = time.time()
+
+
+def _size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _remove(path: Path) -> int:
+    """Delete a file or directory tree. Returns the bytes freed."""
+    if not path.exists():
+        return 0
+    size = _size(path)
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+    return size
+
+
+def _add_to_totals(reclaimed: int, deleted: int = 0):
+    with _lock:
+        _totals["reclaimed_bytes"] += reclaimed
+        _totals["jobs_deleted"] += deleted
+
+
+_EDIT_FILES = {"checkpoints", "footage", "segments", "voiceover.wav", "voiceover.peaks.npz"}
+
+
+def _keeps_edit_files(job_id: str) -> bool:
+    if config.KEEP_EDIT_FILES_HOURS <= 0:
+        return False
+    job = store.get(job_id)
+    completed_at = (job.completed_at if job else None) or time.time()
+    return time.time() - completed_at < config.KEEP_EDIT_FILES_HOURS * 3600
+
+
+def clean_after_export(job_id: str) -> int:
+    """Drop a completed job's working files. Returns the bytes freed.
+
+    ``job.json`` stays, and the edit files too while ``KEEP_EDIT_FILES_HOURS``
+    has not run out.
+    """
+    job_dir = config.TEMP_DIR / job_id
+    if not job_dir.is_dir():
+        return 0
+    keep = {"job.json"} | (_EDIT_FILES if _keeps_edit_files(job_id) else set())
+    reclaimed = sum(_remove(p) for p in job_dir.iterdir() if p.name not in keep)
+    _add_to_totals(reclaimed)
+    if reclaimed:
+        print(f"[janitor] {job_id[:8]}: reclaimed {reclaimed / 1e6:.1f} MB of temp files after export")
+    return reclaimed
+
+
+def _delete_job(job_id: str) -> int:
+    store.delete(job_id)
+    cancellation.reset(job_id)
+    _last_access.pop(job_id, None)
+    # OUTPUT_DIR holds the deliverables themselves with local storage, staged leftovers otherwise
+    freed = _remove(config.TEMP_DIR / job_id) + _remove(config.OUTPUT_DIR / job_id)
+    if not storage.is_local:
+        freed += storage.delete_job(job_id)
+    return freed
+
+
+def _last_used(job) -> float:
+    return max(_last_access.get(job.job_id, 0.0), job.completed_at or job.created_at)
+
+
+def _abandon(job_id: str):
+    cancellation.cancel(job_id)
+    store.cancel_job(job_id)
+
+
+def sweep() -> dict:
+    """One janitor pass. Returns what it did."""
+    now = time.time()
+    reclaimed = 0
+    expired = []
+    abandoned = []
+    temp_cleaned = 0
+    temp_bytes = 0
+
+    # 0. Jobs left idle mid-pipeline, e.g. never approved
+    if config.IDLE_JOB_TTL_HOURS > 0:
+        cutoff = now - config.IDLE_JOB_TTL_HOURS * 3600
+        for job in store.all():
+            if (job.status in _UNFINISHED and job.updated_at < cutoff
+                    and not job.steps_with_status(StepStatus.RUNNING)):
+                _abandon(job.job_id)
+                reclaimed += _delete_job(job.job_id)
+                abandoned.append(job.job_id)
+        if abandoned:
+            print(f"[janitor] Cancelled {len(abandoned)} job(s) idle for over {config.IDLE_JOB_TTL_HOURS:g}h")
+
+    finished = [j for j in store.all() if j.status in _FINISHED]
+
+    # 1. Retention TTL
+    if config.JOB_RETENTION_HOURS > 0:
+        cutoff = now - config.JOB_RETENTION_HOURS * 3600
+        for job in finished:
+            if _last_used(job) < cutoff:
+                reclaimed += _delete_job(job.job_id)
+                expired.append(job.job_id)
+        finished = [j for j in finished if j.job_id not in expired]
+
+    # 2. Temp files of completed jobs exported before cleanup was enabled, and
+    #    edit files past KEEP_EDIT_FILES_HOURS
+    if config.CLEAN_TEMP_AFTER_EXPORT:
+        for job in finished:
+            if job.status == JobStatus.COMPLETED:
+                freed = clean_after_export(job.job_id)
+                temp_bytes += freed
+                temp_cleaned += bool(freed)
+        reclaimed += temp_bytes
+
+    # 3. Disk quota, least recently used first
+    evicted = []
+    if config.DISK_QUOTA_MB > 0:
+        quota = config.DISK_QUOTA_MB * 1024 * 1024
+        usage = _size(config.TEMP_DIR) + _size(config.OUTPUT_DIR)
+        for job in sorted(finished, key=_last_used):
+            if usage <= quota:
+                break
+            freed = _delete_job(job.job_id)
+            usage -= freed
+            reclaimed += freed
+            evicted.append(job.job_id)
+        if usage > quota:
+            print(f"[janitor] Still {usage / 1e6:.0f} MB used (quota {config.DISK_QUOTA_MB:.0f} MB): "
+                  "the rest belongs to active jobs and the LLM cache")
+
+    # clean_after_export already added its own bytes to the totals
+    _add_to_totals(reclaimed - temp_bytes, len(abandoned) + len(expired) + len(evicted))
+    report = {
+        "ran_at": now,
+        "reclaimed_bytes": reclaimed,
+        "abandoned_jobs": abandoned,
+        "expired_jobs": expired,
+        "evicted_jobs": evicted,
+        "temp_cleaned_jobs": temp_cleaned,
+    }
+    with _lock:
+        _last_report.clear()
+        _last_report.update(report)
+        _totals["sweeps"] += 1
+    if reclaimed:
+        print(f"[janitor] Reclaimed {reclaimed / 1e6:.1f} MB | {len(abandoned)} abandoned, "
+              f"{len(expired)} expired, {len(evicted)} evicted, {temp_cleaned} temp dirs cleaned")
+    return report
+
+
+async def run_janitor():
+    """Background task: sweep every JANITOR_INTERVAL_S until cancelled."""
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, sweep)
+        except Exception as e:
+            print(f"[janitor] Sweep failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(config.JANITOR_INTERVAL_S)
+
+
+def status() -> dict:
+    usage = _size(config.TEMP_DIR) + _size(config.OUTPUT_DIR)
+    with _lock:
+        return {
+            "last_sweep": dict(_last_report) or None,
+            "totals": dict(_totals),
+            "disk_usage_bytes": usage,
+            "policy": {
+                "job_retention_hours": config.JOB_RETENTION_HOURS,
+                "idle_job_ttl_hours": config.IDLE_JOB_TTL_HOURS,
+                "clean_temp_after_export": config.CLEAN_TEMP_AFTER_EXPORT,
+                "keep_edit_files_hours": config.KEEP_EDIT_FILES_HOURS,
+                "disk_quota_mb": config.DISK_QUOTA_MB,
+                "interval_s": config.JANITOR_INTERVAL_S,
+            },
+        }
@@ -0,0 +1,35 @@
+"""Per-key locks that do not outlive their users.
+
+Footage scenes and TTS segments are locked by file path so a speculative
+pass and the real step never produce the same file twice. Keys are unbounded
+(every job, scene and text edit makes new ones), so a lock is dropped as soon
+as nobody holds or waits for it.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+class KeyedLocks:
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: Dict[str, List] = {}  # key → [lock, holders + waiters]
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        with self._guard:
+            return len(self._locks)
@@ -0,0 +1,202 @@
+"""Persistent cache for Claude responses.
+
+Identical requests — retries after a failure, duplicate submissions, repeated
+``/script/edit`` round trips — are answered from disk instead of calling Claude
+again. Entries are keyed by a hash of (model, system prompt, user message,
+max_tokens), expire after ``LLM_CACHE_TTL_HOURS`` and the least recently used
+ones are evicted once the cache grows past ``LLM_CACHE_MAX_MB``.
+
+Hit/miss counts for the running pipeline step are collected in a context
+variable (see ``track``) so the orchestrator can report them per job.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from config import config
+
+_lock = threading.Lock()
+_total_bytes: Optional[int] = None  # lazily computed size of the cache directory
+
+
+class Truncated(Exception):
+    """A completion stopped at ``max_tokens`` (raised only when the caller asks)."""
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        if not total:
+            return ""
+        return f"LLM cache {self.hits}/{total} hits"
+
+
+_current_stats: contextvars.ContextVar[Optional[CacheStats]] = contextvars.ContextVar(
+    "llm_cache_stats", default=None
+)
+
+
+def track() -> CacheStats:
+    """Start collecting hit/miss counts for calls made from the current context."""
+    stats = CacheStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def _cache_dir() -> Path:
+    return Path(config.LLM_CACHE_DIR)
+
+
+def _cache_key(model: str, system: str, user_msg: str, max_tokens: int) -> str:
+    payload = json.dumps([model, system, user_msg, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _enabled_for(site: str) -> bool:
+    return config.LLM_CACHE_ENABLED and site not in config.LLM_CACHE_DISABLED_SITES
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("created", 0) > config.LLM_CACHE_TTL_HOURS * 3600:
+        _remove(path)
+        return None
+    os.utime(path)  # bump mtime: eviction is least-recently-used
+    return entry.get("text")
+
+
+def _remove(path: Path):
+    global _total_bytes
+    try:
+        size = path.stat().st_size
+        path.unlink()
+    except OSError:
+        return
+    with _lock:
+        if _total_bytes is not None:
+            _total_bytes -= size
+
+
+def _write(path: Path, site: str, text: str):
+    global _total_bytes
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps({"site": site, "created": time.time(), "text": text}), encoding="utf-8")
+    tmp.replace(path)
+    with _lock:
+        if _total_bytes is None:
+            _total_bytes = sum(p.stat().st_size for p in path.parent.glob("*.json"))
+        else:
+            _total_bytes += path.stat().st_size
+        over = _total_bytes > config.LLM_CACHE_MAX_MB * 1024 * 1024
+    if over:
+        _evict()
+
+
+def _evict():
+    """Drop least recently used entries until the cache is at 90% of its budget."""
+    global _total_bytes
+    with _lock:
+        entries = []
+        for p in _cache_dir().glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = config.LLM_CACHE_MAX_MB * 1024 * 1024 * 0.9
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= size
+        _total_bytes = total
+
+
+def complete(
+    client,
+    *,
+    site: str,
+    model: str,
+    system: str,
+    user_msg: str,
+    max_tokens: int,
+    parse: Callable[[str], Any] = lambda text: text,
+    use_cache: bool = True,
+    allow_truncated: bool = True,
+    **kwargs,
+) -> Any:
+    """Return ``parse(text)`` of a Claude completion, served from the cache when possible.
+
+    ``site`` names the call site (e.g. "analyze", "blueprint") so it can be
+    opted out through ``LLM_CACHE_DISABLED_SITES``. Only responses that
+    ``parse`` accepts are stored, so a malformed answer is never replayed.
+    Extra ``kwargs`` are passed to ``messages.create`` but are not part of
+    the cache key. With ``allow_truncated=False`` a completion cut off at
+    ``max_tokens`` raises ``Truncated`` instead of being parsed.
+    """
+    stats = _current_stats.get()
+    cacheable = use_cache and _enabled_for(site)
+    path = _cache_dir() / f"{_cache_key(model, system, user_msg, max_tokens)}.json"
+
+    if cacheable and path.exists():
+        text = _read(path)
+        if text is not None:
+            try:
+                result = parse(text)
+            except Exception:
+                _remove(path)
+            else:
+                if stats:
+                    stats.record(hit=True)
+                print(f"[llm-cache] hit ({site})")
+                return result
+
+    response = client.messages.create(
+        model=model,
+        max_tokens=max_tokens,
+        system=system,
+        messages=[{"role": "user", "content": user_msg}],
+        **kwargs,
+    )
+    text = response.content[0].text
+    if stats:
+        stats.record(hit=False)
+
+    truncated = getattr(response, "stop_reason", None) == "max_tokens"
+    if truncated and not allow_truncated:
+        raise Truncated(f"{site} completion hit max_tokens={max_tokens}")
+    result = parse(text)
+    # Truncated completions are never worth replaying
+    if cacheable and not truncated:
+        try:
+            _write(path, site, text)
+        except OSError as e:
+            print(f"[llm-cache] Could not store entry: {e}")
+    return result
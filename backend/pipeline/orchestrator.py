@@ -1,79 +1,413 @@
-"""Pipeline Orchestrator — phased execution with approval gates.
+"""Pipeline Orchestrator — dependency-graph execution with approval gates.
 
-Phase 1: Steps 1-2  (Analysis + Script)      → pauses, waits for script approval
-Phase 2: Step 3     (Voice Generation)        → pauses, waits for voice approval
-Phase 3: Steps 4-7  (Footage → Export)        → runs to completion
+The whole pipeline is one graph of step nodes (see ``_pipeline_graph``) run by
+``pipeline.dag.run_graph``; independent nodes run concurrently. Each phase
+entrypoint runs the graph up to the next closed approval gate:
+
+Phase 1: Steps 1-2  (Analysis + Script)      → stops at the script gate
+Phase 2: Step 3     (Voice Generation)        → stops at the voice gate
+Phase 3: Steps 4-7  (Footage → Export)        → runs to completion; the documents
+                                                 and voiceover exports run alongside the render
+
+``run_pipeline_variant`` derives a finished job in another language: the
+script is translated and re-voiced, the source's footage and timeline are
+re-timed to the new voiceover, and phase 3 re-encodes only the scenes whose
+duration changed.
 """
 
 import asyncio
+import contextvars
+import functools
+import os
+import shutil
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Tuple
 
 from config import config
-from models import GenerateRequest, JobResult, Script
+from models import GenerateRequest, JobResult, Script, PromptAnalysis, TTSResult, FootageResult, EditBlueprint, EditResult, AudioExport
 from job_store import store
 
+from pipeline import admission, cancellation, checkpoint, janitor, llm_cache
+from pipeline.dag import StepNode, Barrier, run_graph
 from pipeline.analyzer import analyze_prompt
-from pipeline.script_gen import generate_script, modify_script
-from pipeline.tts_gen import generate_tts
-from pipeline.footage import source_footage
+from pipeline.script_gen import generate_script, modify_script, analyze_and_generate_script, translate_script
+from pipeline.tts_gen import generate_tts, presynthesize, discard_stale_segments, cached_scene_count, regenerate_scene
+from pipeline.footage import source_footage, prefetch_footage, replace_scene_footage
 from pipeline.blueprint import build_blueprint
 from pipeline.editor import assemble_video
-from pipeline.exporter import export_deliverables
-
-_executor = ThreadPoolExecutor(max_workers=2)
+from pipeline.exporter import export_audio, export_documents, export_stream, export_video
 
+_executor = ThreadPoolExecutor(max_workers=config.PIPELINE_WORKERS)
 
 async def _run_in_thread(fn, *args, **kwargs):
     loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(_executor, lambda: fn(*args, **kwargs))
+    # Carry context vars (LLM cache stats) into the worker thread
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, lambda: ctx.run(fn, *args, **kwargs))
 
 
-# ── Phase 1: Analysis + Script ────────────────────────────────────────────────
+# Speculative work runs on its own threads so it never delays a foreground step
+_speculative_executor = ThreadPoolExecutor(max_workers=2)
+_speculative: Dict[Tuple[str, str], threading.Event] = {}  # (job_id, kind) → stop flag of the running pass
 
-async def run_pipeline_phase1(job_id: str, req: GenerateRequest):
-    """Steps 1-2. Stops after script is ready and waits for user approval."""
+
+def _speculate(job_id: str, kind: str, fn, *args):
+    """Run ``fn(*args, stop)`` in the background, superseding any previous pass of ``kind``."""
+    key = (job_id, kind)
+    previous = _speculative.get(key)
+    if previous is not None:
+        previous.set()
+    stop = threading.Event()
+    _speculative[key] = stop
+
+    def run():
+        try:
+            fn(*args, stop)
+        except Exception as e:
+            print(f"[speculative] {kind} for {job_id} aborted: {e}")
+        finally:
+            if _speculative.get(key) is stop:
+                del _speculative[key]
+
+    _speculative_executor.submit(run)
+
+
+def cancel_speculative_work(job_id: str):
+    """Stop every background pass (TTS, footage) running for a job."""
+    for (jid, _kind), stop in list(_speculative.items()):
+        if jid == job_id:
+            stop.set()
+
+
+def _start_speculative_work(job_id: str, script: Script, req: GenerateRequest):
+    """Pre-synthesize voice and prefetch footage while the script awaits approval."""
     job_dir = config.TEMP_DIR / job_id
-    job_dir.mkdir(parents=True, exist_ok=True)
-    config.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    if req.speculative_tts:
+        _speculate(job_id, "tts", presynthesize, script, req.voice_id, job_dir)
+    if req.prefetch_footage:
+        _speculate(job_id, "footage", prefetch_footage, script, job_dir)
+
+
+def _with_cache_stats(message: str, stats: llm_cache.CacheStats) -> str:
+    summary = stats.summary()
+    return f"{message} | {summary}" if summary else message
+
+
+# ── Graph nodes ───────────────────────────────────────────────────────────────
+# Each node takes the artifact dict and returns its outputs. Artifacts:
+# req, analysis, script, tts, footage, blueprint, edit, documents, audio, videos, stream.
+
+def _target_duration(req: GenerateRequest) -> int:
+    return req.target_duration or 10
+
 
-    target_duration = req.target_duration or 10
+async def _analyze(job_id: str, d: dict) -> dict:
+    req: GenerateRequest = d["req"]
+    analysis = await _run_in_thread(
+        analyze_prompt,
+        req.title, req.prompt, req.video_type.value, _target_duration(req), req.language,
+    )
+    store.set_pipeline_data(job_id, "analysis", analysis.model_dump())
+    return {"analysis": analysis}
+
+
+async def _write_script(job_id: str, d: dict) -> dict:
+    req: GenerateRequest = d["req"]
+    script = await _run_in_thread(generate_script, req.title, d["analysis"], _target_duration(req),
+                                  cancel=cancellation.token_for(job_id))
+    store.set_pipeline_data(job_id, "script", script.model_dump())
+    _start_speculative_work(job_id, script, req)
+    return {"script": script}
+
+
+async def _analyze_and_write_script(job_id: str, d: dict) -> dict:
+    req: GenerateRequest = d["req"]
+    analysis, script = await _run_in_thread(
+        analyze_and_generate_script,
+        req.title, req.prompt, req.video_type.value, _target_duration(req), req.language,
+    )
+    store.set_pipeline_data(job_id, "analysis", analysis.model_dump())
+    store.set_pipeline_data(job_id, "script", script.model_dump())
+    _start_speculative_work(job_id, script, req)
+    return {"analysis": analysis, "script": script}
 
+
+async def _synthesize(job_id: str, d: dict) -> dict:
+    req: GenerateRequest = d["req"]
+    script: Script = d["script"]
+    job_dir = config.TEMP_DIR / job_id
+    fresh = d.get("tts_fresh", False)
+    d["tts_reused"] = 0 if fresh else cached_scene_count(script, req.voice_id, job_dir)
+    tts_result = await _run_in_thread(generate_tts, script, req.voice_id, job_dir, not fresh,
+                                      cancel=cancellation.token_for(job_id))
+    store.set_pipeline_data(job_id, "tts", tts_result.model_dump())
+    return {"tts": tts_result}
+
+
+async def _source(job_id: str, d: dict) -> dict:
+    req: GenerateRequest = d["req"]
+    footage_result = await _run_in_thread(
+        source_footage, d["script"], None, config.TEMP_DIR / job_id, req.video_format.value,
+        cancel=cancellation.token_for(job_id))
+    return {"footage": footage_result}
+
+
+async def _plan(job_id: str, d: dict) -> dict:
+    req: GenerateRequest = d["req"]
+    analysis: PromptAnalysis = d["analysis"]
+    blueprint = await _run_in_thread(
+        build_blueprint, req.title, d["script"], d["tts"], d["footage"],
+        req.video_format.value, analysis.tone, analysis.style, req.blueprint_planner.value,
+        cancel=cancellation.token_for(job_id))
+    return {"blueprint": blueprint}
+
+
+def _render_admitted(job_id: str, estimate: admission.RenderEstimate, abandoned: threading.Event,
+                     *args, **kwargs) -> EditResult:
+    """Wait for an admission slot, then run ``assemble_video`` in it, recording its observed peak RAM.
+
+    The slot is taken and released in this one thread, so it cannot leak when
+    the awaiting task is cancelled; ``abandoned`` makes a queued render give up.
+    """
+    def queued(position: int):
+        store.start_step(job_id, 6, f"Queued for render (#{position}, needs ~{estimate.ram_mb:.0f} MB)…")
+
+    was_queued = admission.controller.acquire(job_id, estimate, kwargs.get("cancel"), queued, abandoned)
+    t0 = time.perf_counter()
+    usage = {"observed_mb": None}
     try:
-        store.start_step(job_id, 1, "Analysing prompt with Claude…")
-        analysis = await _run_in_thread(
-            analyze_prompt,
-            req.title, req.prompt, req.video_type.value, target_duration, req.language,
-        )
-        store.set_pipeline_data(job_id, "analysis", analysis.model_dump())
-        store.set_pipeline_data(job_id, "req", req.model_dump())
-        store.complete_step(job_id, 1,
-            f"Extracted {len(analysis.talking_points)} talking points | tone: {analysis.tone}")
+        if was_queued:
+            store.start_step(job_id, 6, "Assembling video with MoviePy…")
+        with admission.measure() as usage:
+            return assemble_video(*args, **kwargs)
+    finally:
+        admission.controller.release(job_id, usage["observed_mb"], time.perf_counter() - t0)
+        store.set_pipeline_data(job_id, "render_usage", {
+            "estimate": estimate.as_dict(), "observed_mb": usage["observed_mb"]})
+
+
+async def _assemble(job_id: str, d: dict) -> dict:
+    req: GenerateRequest = d["req"]
+    tts_result: TTSResult = d["tts"]
+    extra_formats = [f.value for f in req.extra_formats]
+    estimate = admission.estimate(d["blueprint"], extra_formats)
+    abandoned = threading.Event()
+
+    # On the default executor so a queued render does not hold a pipeline worker
+    render = functools.partial(
+        _render_admitted, job_id, estimate, abandoned, d["blueprint"], tts_result.audio_path,
+        config.TEMP_DIR / job_id, req.add_background_music, cancel=cancellation.token_for(job_id),
+        threads=config.RENDER_ENCODER_THREADS, extra_formats=extra_formats)
+    try:
+        edit_result = await asyncio.get_event_loop().run_in_executor(None, render)
+    except asyncio.CancelledError:
+        abandoned.set()  # e.g. a sibling node failed: stop waiting for a slot
+        raise
+    return {"edit": edit_result}
+
+
+async def _export_documents(job_id: str, d: dict) -> dict:
+    req: GenerateRequest = d["req"]
+    documents = await _run_in_thread(
+        export_documents, job_id, req.title, d["script"], d["tts"], d["footage"], d["blueprint"],
+        config.OUTPUT_DIR)
+    return {"documents": documents}
+
+
+async def _export_audio(job_id: str, d: dict) -> dict:
+    audio = await _run_in_thread(export_audio, job_id, d["tts"], config.OUTPUT_DIR,
+                                 cancel=cancellation.token_for(job_id))
+    return {"audio": AudioExport(files=audio)}
+
+
+async def _export_video(job_id: str, d: dict) -> dict:
+    renditions = await _run_in_thread(export_video, job_id, d["edit"], config.OUTPUT_DIR)
+    return {"videos": renditions}
+
+
+async def _export_stream(job_id: str, d: dict) -> dict:
+    if not config.HLS_PACKAGING:
+        return {"stream": None}
+    playlist = await _run_in_thread(export_stream, job_id, d["edit"], config.OUTPUT_DIR,
+                                    cancel=cancellation.token_for(job_id))
+    return {"stream": playlist}
+
+
+async def _finish(job_id: str, d: dict) -> dict:
+    edit_result: EditResult = d["edit"]
+    audio = [a.model_copy(update={"file": f"/api/download/{job_id}/{os.path.basename(a.file)}"})
+             for a in d["audio"].files]
+    videos = [v.model_copy(update={"file": f"/api/download/{job_id}/{os.path.basename(v.file)}"})
+              for v in d["videos"]]
+    store.complete_job(job_id, JobResult(
+        final_video=videos[0].file,
+        renditions=videos,
+        script_file=f"/api/download/{job_id}/script.txt",
+        voiceover_file=audio[0].file,
+        voiceover_files=audio,
+        stream_playlist=f"/api/stream/{job_id}/index.m3u8" if d["stream"] else None,
+        asset_list_file=f"/api/download/{job_id}/assets.json",
+        timeline_file=f"/api/download/{job_id}/timeline.json",
+        duration_seconds=edit_result.duration_seconds,
+    ))
+    if config.CLEAN_TEMP_AFTER_EXPORT:
+        await _run_in_thread(janitor.clean_after_export, job_id)
+    return {"result": True}
+
+
+def _analysis_summary(d: dict) -> str:
+    analysis: PromptAnalysis = d["analysis"]
+    return f"Extracted {len(analysis.talking_points)} talking points | tone: {analysis.tone}"
+
+
+def _script_summary(d: dict) -> str:
+    script: Script = d["script"]
+    return f"{len(script.scenes)} scenes | ~{script.total_word_count} words"
+
+
+def _tts_summary(d: dict) -> str:
+    tts_result: TTSResult = d["tts"]
+    message = f"Audio ready: ~{tts_result.total_duration_seconds:.0f}s"
+    if d.get("tts_reused"):
+        message += f" | {d['tts_reused']}/{len(d['script'].scenes)} scenes pre-synthesized"
+    return message
+
+
+def _footage_summary(d: dict) -> str:
+    footage_result: FootageResult = d["footage"]
+    found = sum(1 for s in footage_result.scenes if s.primary_asset)
+    return f"Assets found for {found}/{len(footage_result.scenes)} scenes"
+
+
+def _videos_summary(d: dict) -> str:
+    if len(d["videos"]) == 1:
+        return "All deliverables ready!"
+    return "All deliverables ready! Formats: " + ", ".join(v.video_format for v in d["videos"])
+
+
+def _pipeline_graph(job_id: str, req: GenerateRequest) -> list:
+    """The full pipeline as a DAG; approval gates are Barrier nodes."""
+    def node(fn):
+        return lambda d: fn(job_id, d)
+
+    # Long targets go through the scene fan-out, which needs the analysis first
+    if req.fused_analysis and _target_duration(req) < config.SCRIPT_FANOUT_MIN_MINUTES:
+        front = [
+            StepNode("analyze_and_script", node(_analyze_and_write_script),
+                     inputs=("req",), outputs=("analysis", "script"), steps=(1, 2),
+                     start_message="Analysing prompt and writing script with Claude…",
+                     summary=lambda d: {1: _analysis_summary(d), 2: _script_summary(d)}),
+        ]
+    else:
+        front = [
+            StepNode("analyze", node(_analyze),
+                     inputs=("req",), outputs=("analysis",), steps=(1,),
+                     start_message="Analysing prompt with Claude…", summary=_analysis_summary),
+            StepNode("script", node(_write_script),
+                     inputs=("req", "analysis"), outputs=("script",), steps=(2,),
+                     start_message="Writing narration script…", summary=_script_summary),
+        ]
+
+    return front + [
+        Barrier("script_approved", inputs=("script",)),
+        StepNode("tts", node(_synthesize),
+                 inputs=("req", "script", "script_approved"), outputs=("tts",), steps=(3,),
+                 start_message="Generating voiceover…", summary=_tts_summary),
+        Barrier("voice_approved", inputs=("tts",)),
+        StepNode("footage", node(_source),
+                 inputs=("req", "script", "voice_approved"), outputs=("footage",), steps=(4,),
+                 start_message="Searching and downloading footage from Pexels…",
+                 summary=_footage_summary, checkpoint=FootageResult),
+        StepNode("blueprint", node(_plan),
+                 inputs=("req", "analysis", "script", "tts", "footage"), outputs=("blueprint",), steps=(5,),
+                 start_message="Planning edit timeline…",
+                 summary=lambda d: f"Blueprint ready for {len(d['blueprint'].scenes)} scenes",
+                 checkpoint=EditBlueprint),
+        StepNode("assemble", node(_assemble),
+                 inputs=("req", "blueprint", "tts"), outputs=("edit",), steps=(6,),
+                 start_message="Assembling video with MoviePy…",
+                 summary=lambda d: f"Video assembled: {d['edit'].duration_seconds:.0f}s"
+                 + (f" in {len(d['edit'].renditions)} formats" if len(d["edit"].renditions) > 1 else ""),
+                 checkpoint=EditResult),
+        StepNode("export_documents", node(_export_documents),
+                 inputs=("req", "script", "tts", "footage", "blueprint"), outputs=("documents",), steps=(7,),
+                 start_message="Exporting deliverables…", summary=lambda d: "Script, voiceover, assets & timeline exported"),
+        # Only the voiceover feeds the encode: a visual change neither waits for nor redoes it
+        StepNode("export_audio", node(_export_audio),
+                 inputs=("tts", "voice_approved"), outputs=("audio",), steps=(7,),
+                 start_message="Exporting deliverables…",
+                 summary=lambda d: f"Voiceover {d['audio'].files[0].size_bytes / 1e6:.1f} MB MP3",
+                 checkpoint=AudioExport),
+        StepNode("export_video", node(_export_video),
+                 inputs=("edit",), outputs=("videos",), steps=(7,),
+                 start_message="Exporting deliverables…",
+                 summary=_videos_summary),
+        StepNode("export_stream", node(_export_stream),
+                 inputs=("edit",), outputs=("stream",), steps=(7,),
+                 start_message="Exporting deliverables…",
+                 summary=lambda d: "HLS stream packaged" if d["stream"] else ""),
+        StepNode("finish", node(_finish),
+                 inputs=("documents", "audio", "videos", "stream", "edit"), outputs=("result",)),
+    ]
+
+
+def _load_artifacts(job_id: str) -> dict:
+    """Artifacts of the approved phases, rebuilt from pipeline data."""
+    data = {}
+    req_data      = store.get_pipeline_data(job_id, "req")
+    analysis_data = store.get_pipeline_data(job_id, "analysis")
+    script_data   = store.get_pipeline_data(job_id, "script")
+    tts_data      = store.get_pipeline_data(job_id, "tts")
+    if req_data:
+        data["req"] = GenerateRequest(**req_data)
+    if analysis_data:
+        data["analysis"] = PromptAnalysis(**analysis_data)
+    if script_data:
+        data["script"] = Script(**script_data)
+    if tts_data:
+        data["tts"] = TTSResult(**tts_data)
+    return data
 
-        store.start_step(job_id, 2, "Writing narration script…")
-        script = await _run_in_thread(generate_script, req.title, analysis, target_duration)
-        store.set_pipeline_data(job_id, "script", script.model_dump())
-        store.complete_step(job_id, 2,
-            f"{len(script.scenes)} scenes | ~{script.total_word_count} words")
 
-        # ← PAUSE: pipeline waits here for /approve-script
+# ── Phase 1: Analysis + Script ────────────────────────────────────────────────
 
-    except Exception as e:
-        import traceback; traceback.print_exc()
-        job = store.get(job_id)
-        store.fail_job(job_id, f"{type(e).__name__}: {e}", step=job.current_step if job else 1)
+async def run_pipeline_phase1(job_id: str, req: GenerateRequest):
+    """Steps 1-2. Stops after script is ready and waits for user approval."""
+    job_dir = config.TEMP_DIR / job_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+    config.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    store.set_pipeline_data(job_id, "req", req.model_dump())
+    await run_graph(job_id, _pipeline_graph(job_id, req), {"req": req},
+                    cancel=cancellation.token_for(job_id))
+    # ← PAUSE: graph stops at the script_approved barrier until /approve-script
 
 
-async def run_pipeline_script_edit(job_id: str, current_script: Script, instruction: str, _req: GenerateRequest):
+async def run_pipeline_script_edit(job_id: str, current_script: Script, instruction: str, req: GenerateRequest,
+                                   targeted: bool = True):
     """Re-run step 2 with a modification, then pause again for re-approval."""
     try:
         store.start_step(job_id, 2, "Regenerating script with modifications…")
-        new_script = await _run_in_thread(modify_script, current_script, instruction)
+        stats = llm_cache.track()
+        new_script = await _run_in_thread(modify_script, current_script, instruction, targeted,
+                                          cancel=cancellation.token_for(job_id))
         store.set_pipeline_data(job_id, "script", new_script.model_dump())
-        store.complete_step(job_id, 2,
-            f"{len(new_script.scenes)} scenes | ~{new_script.total_word_count} words")
+        old_text = {s.scene_id: s.narration for s in current_script.scenes}
+        changed = sum(1 for s in new_script.scenes if old_text.get(s.scene_id) != s.narration)
+        store.complete_step(job_id, 2, _with_cache_stats(
+            f"{len(new_script.scenes)} scenes ({changed} changed) | ~{new_script.total_word_count} words", stats))
+        if req.speculative_tts:
+            # Only scenes whose text changed lose their pre-synthesized audio
+            discard_stale_segments(new_script, req.voice_id, config.TEMP_DIR / job_id)
+        _start_speculative_work(job_id, new_script, req)
 
         # ← PAUSE again for re-approval
 
+    except cancellation.JobCancelled:
+        print(f"[orchestrator] Script edit for {job_id} cancelled")
     except Exception as e:
         import traceback; traceback.print_exc()
         store.fail_job(job_id, f"{type(e).__name__}: {e}", step=2)
@@ -81,27 +415,45 @@ async def run_pipeline_script_edit(job_id: str, current_script: Script, instruct
 
 # ── Phase 2: Voice Generation ─────────────────────────────────────────────────
 
-async def run_pipeline_phase2(job_id: str):
-    """Step 3 only. Stops after voice is ready and waits for user approval."""
+async def run_pipeline_phase2(job_id: str, fresh: bool = False):
+    """Step 3 only. Stops after voice is ready and waits for user approval.
+
+    Scenes pre-synthesized while the script awaited approval are reused
+    unless ``fresh`` asks for a new take of every scene.
+    """
     job_dir = config.TEMP_DIR / job_id
     job_dir.mkdir(parents=True, exist_ok=True)
 
-    script_data = store.get_pipeline_data(job_id, "script")
-    req_data    = store.get_pipeline_data(job_id, "req")
-    if not script_data or not req_data:
+    data = _load_artifacts(job_id)
+    if "script" not in data or "req" not in data:
         store.fail_job(job_id, "Missing pipeline data for phase 2", step=3)
         return
+    data.pop("tts", None)  # step 3 is being (re-)run
+    data["tts_fresh"] = fresh
+
+    await run_graph(job_id, _pipeline_graph(job_id, data["req"]), data, open_gates={"script_approved"},
+                    cancel=cancellation.token_for(job_id))
+    # ← PAUSE: graph stops at the voice_approved barrier until /approve-voice
 
-    script  = Script(**script_data)
-    gen_req = GenerateRequest(**req_data)
 
+async def run_pipeline_scene_voice(job_id: str, scene_id: str):
+    """Re-voice one scene (step 3) in the existing voiceover, then pause again for approval."""
+    data = _load_artifacts(job_id)
+    if "script" not in data or "req" not in data or "tts" not in data:
+        store.fail_job(job_id, "Missing pipeline data for scene voice regeneration", step=3)
+        return
     try:
-        store.start_step(job_id, 3, f"Generating voiceover…")
-        tts_result = await _run_in_thread(generate_tts, script, gen_req.voice_id, job_dir)
-        store.complete_step(job_id, 3, f"Audio ready: ~{tts_result.total_duration_seconds:.0f}s")
+        store.start_step(job_id, 3, f"Regenerating voice for {scene_id}…")
+        tts_result = await _run_in_thread(
+            regenerate_scene, data["script"], data["tts"], scene_id, data["req"].voice_id,
+            config.TEMP_DIR / job_id, cancel=cancellation.token_for(job_id))
+        store.set_pipeline_data(job_id, "tts", tts_result.model_dump())
+        store.complete_step(job_id, 3, f"Re-voiced {scene_id} | audio ~{tts_result.total_duration_seconds:.0f}s")
 
-        # ← PAUSE: pipeline waits here for /approve-voice
+        # ← PAUSE again for voice approval
 
+    except cancellation.JobCancelled:
+        print(f"[orchestrator] Scene voice regeneration for {job_id} cancelled")
     except Exception as e:
         import traceback; traceback.print_exc()
         store.fail_job(job_id, f"{type(e).__name__}: {e}", step=3)
@@ -110,79 +462,242 @@ async def run_pipeline_phase2(job_id: str):
 # ── Phase 3: Footage → Export ─────────────────────────────────────────────────
 
 async def run_pipeline_phase3(job_id: str):
-    """Steps 4-7. Runs to completion after voice is approved."""
-    job_dir     = config.TEMP_DIR / job_id
-    output_base = config.OUTPUT_DIR
-
-    script_data   = store.get_pipeline_data(job_id, "script")
-    req_data      = store.get_pipeline_data(job_id, "req")
-    analysis_data = store.get_pipeline_data(job_id, "analysis")
-    if not script_data or not req_data:
+    """Steps 4-7. Runs to completion after voice is approved.
+
+    Footage, blueprint and render are checkpointed, so re-running this phase
+    (retry, or resume after a restart) only redoes steps whose inputs changed
+    or whose checkpoint is missing.
+    """
+    data = _phase3_artifacts(job_id)
+    if data is None:
         store.fail_job(job_id, "Missing pipeline data for phase 3", step=4)
         return
 
-    script  = Script(**script_data)
-    gen_req = GenerateRequest(**req_data)
-    tone  = analysis_data.get("tone",  "neutral")  if analysis_data else "neutral"
-    style = analysis_data.get("style", "standard") if analysis_data else "standard"
+    await run_graph(job_id, _pipeline_graph(job_id, data["req"]), data,
+                    open_gates={"script_approved", "voice_approved"},
+                    checkpoint_dir=config.TEMP_DIR / job_id / "checkpoints",
+                    cancel=cancellation.token_for(job_id))
+
+
+def _phase3_artifacts(job_id: str):
+    """Inputs of steps 4-7, or None when the approved phases left too little behind."""
+    data = _load_artifacts(job_id)
+    if "script" not in data or "req" not in data:
+        return None
+    if "analysis" not in data:
+        data["analysis"] = PromptAnalysis(
+            topic=data["req"].title, talking_points=[], tone="neutral", style="standard",
+            estimated_duration_minutes=data["script"].estimated_duration_minutes, visual_elements=[],
+        )
+    if "tts" not in data:
+        data["tts"] = _tts_from_wav(job_id, data["script"])
+    return data
+
+
+def _save_checkpoint(job_id: str, data: dict, name: str, artifact):
+    """Checkpoint ``artifact`` as node ``name``'s output for ``data``, so the next run restores it."""
+    node = next(n for n in _pipeline_graph(job_id, data["req"]) if n.name == name)
+    checkpoint.save(config.TEMP_DIR / job_id / "checkpoints", name, artifact,
+                    checkpoint.inputs_hash({i: data[i] for i in node.inputs}))
+
+
+def _swap_scene_footage(job_id: str, data: dict, scene_id: str, keywords) -> str:
+    """Replace one scene's assets in the footage and blueprint checkpoints.
+
+    The footage checkpoint keeps its inputs hash, so step 4 restores the edited
+    result; the blueprint checkpoint is re-keyed to the new footage, so step 5
+    restores it too instead of re-planning every scene. Only the render and
+    export then run again, and the render re-encodes just this scene's segment.
+    """
+    checkpoint_dir = config.TEMP_DIR / job_id / "checkpoints"
+    footage_entry = checkpoint.load_unchecked(checkpoint_dir, "footage", FootageResult)
+    blueprint_entry = checkpoint.load_unchecked(checkpoint_dir, "blueprint", EditBlueprint)
+    if footage_entry is None or blueprint_entry is None:
+        raise ValueError("No footage or blueprint checkpoint to edit")
+    footage, footage_digest = footage_entry
+    blueprint, _ = blueprint_entry
+
+    scene = next((s for s in data["script"].scenes if s.scene_id == scene_id), None)
+    current = next((s for s in footage.scenes if s.scene_id == scene_id), None)
+    planned = next((s for s in blueprint.scenes if s.scene_id == scene_id), None)
+    if scene is None or current is None or planned is None:
+        raise KeyError(f"Unknown scene {scene_id}")
+
+    replaced = replace_scene_footage(scene, current, config.TEMP_DIR / job_id, keywords,
+                                     cancel=cancellation.token_for(job_id))
+    current.primary_asset = replaced.primary_asset
+    current.secondary_assets = replaced.secondary_assets
+    planned.primary_asset = replaced.primary_asset
+    planned.secondary_assets = replaced.secondary_assets
+
+    data["footage"] = footage
+    checkpoint.save(checkpoint_dir, "footage", footage, footage_digest)
+    _save_checkpoint(job_id, data, "blueprint", blueprint)
+    asset = replaced.primary_asset
+    return f"{asset.asset_type} {os.path.basename(asset.local_path)}"
+
+
+async def run_pipeline_replace_scene(job_id: str, scene_id: str, keywords=None):
+    """Swap one scene's footage in a finished job and re-render (steps 4-7).
+
+    Without ``keywords`` the scene's alternative clip is promoted; with them
+    the scene is searched again.
+    """
+    data = _phase3_artifacts(job_id)
+    if data is None:
+        store.fail_job(job_id, "Missing pipeline data for footage replacement", step=4)
+        return
+    try:
+        store.start_step(job_id, 4, f"Replacing footage for {scene_id}…")
+        swapped = await _run_in_thread(_swap_scene_footage, job_id, data, scene_id, keywords)
+        print(f"[orchestrator] {job_id[:8]} {scene_id} now uses {swapped}")
+    except cancellation.JobCancelled:
+        print(f"[orchestrator] Footage replacement for {job_id} cancelled")
+        return
+    except Exception as e:
+        import traceback; traceback.print_exc()
+        store.fail_job(job_id, f"{type(e).__name__}: {e}", step=4)
+        return
 
-    # Rebuild tts_result from the saved audio file
-    from models import TTSResult
-    wav_path = str(job_dir / "voiceover.wav")
-    import soundfile as sf
-    from pathlib import Path as P
-    wav = P(wav_path)
-    if wav.exists():
-        data, sr = sf.read(wav_path)
-        duration = len(data) / sr
-    else:
-        duration = 0.0
+    await run_pipeline_phase3(job_id)
 
-    tts_result = TTSResult(
-        audio_path=wav_path,
-        total_duration_seconds=duration,
-        scenes=[{"scene_id": s.scene_id, "start_time": 0, "end_time": duration / max(len(script.scenes),1) * (i+1),
-                 "duration": duration / max(len(script.scenes),1)}
-                for i, s in enumerate(script.scenes)],
-    )
 
+# ── Language variants ─────────────────────────────────────────────────────────
+
+def _link_file(src: Path, dest: Path):
+    """Hard-link ``src`` as ``dest`` (copy across filesystems). An existing ``dest`` is kept."""
+    if dest.exists() or not src.exists():
+        return
+    dest.parent.mkdir(parents=True, exist_ok=True)
     try:
-        store.start_step(job_id, 4, "Searching and downloading footage from Pexels…")
-        footage_result = await _run_in_thread(
-            source_footage, script, tts_result, job_dir, gen_req.video_format.value)
-        found = sum(1 for s in footage_result.scenes if s.primary_asset)
-        store.complete_step(job_id, 4, f"Assets found for {found}/{len(footage_result.scenes)} scenes")
-
-        store.start_step(job_id, 5, "Planning edit timeline…")
-        blueprint = await _run_in_thread(
-            build_blueprint, gen_req.title, script, tts_result, footage_result,
-            gen_req.video_format.value, tone, style)
-        store.complete_step(job_id, 5, f"Blueprint ready for {len(blueprint.scenes)} scenes")
-
-        store.start_step(job_id, 6, "Assembling video with MoviePy…")
-        edit_result = await _run_in_thread(
-            assemble_video, blueprint, tts_result.audio_path, job_dir, gen_req.add_background_music)
-        store.complete_step(job_id, 6, f"Video assembled: {edit_result.duration_seconds:.0f}s")
-
-        store.start_step(job_id, 7, "Exporting deliverables…")
-        export_result = await _run_in_thread(
-            export_deliverables, job_id, gen_req.title, script, tts_result,
-            footage_result, blueprint, edit_result, output_base)
-        store.complete_step(job_id, 7, "All deliverables ready!")
-
-        store.complete_job(job_id, JobResult(
-            final_video=f"/api/download/{job_id}/final_video.mp4",
-            script_file=f"/api/download/{job_id}/script.txt",
-            voiceover_file=f"/api/download/{job_id}/voiceover.mp3",
-            asset_list_file=f"/api/download/{job_id}/assets.json",
-            timeline_file=f"/api/download/{job_id}/timeline.json",
-            duration_seconds=export_result.duration_seconds,
-        ))
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def _share_source_render(job_id: str, source_id: str, data: dict) -> int:
+    """Give a variant the source job's footage and timeline, re-timed to its own voiceover.
+
+    Footage files and rendered segments are hard-linked into the variant's
+    directory, so they outlive the source job. The re-timed footage and
+    blueprint become the variant's checkpoints: phase 3 restores steps 4-5 and
+    the render finds every segment whose scene kept its duration. Returns the
+    number of scenes whose timing changed. Scene names and narration excerpts
+    come from the variant's translated script.
+    """
+    source_dir = config.TEMP_DIR / source_id
+    job_dir = config.TEMP_DIR / job_id
+    footage_entry = checkpoint.load_unchecked(source_dir / "checkpoints", "footage", FootageResult)
+    blueprint_entry = checkpoint.load_unchecked(source_dir / "checkpoints", "blueprint", EditBlueprint)
+    if footage_entry is None or blueprint_entry is None:
+        raise ValueError("The source job's footage has been cleaned up")
+    footage, blueprint = footage_entry[0], blueprint_entry[0]
+
+    def relink(asset):
+        if asset is None:
+            return None
+        dest = job_dir / "footage" / os.path.basename(asset.local_path)
+        _link_file(Path(asset.local_path), dest)
+        return asset.model_copy(update={"local_path": str(dest)})
+
+    timings = {s["scene_id"]: s for s in data["tts"].scenes}
+    translated = {s.scene_id: s for s in data["script"].scenes}
+    for scene in footage.scenes:
+        if scene.scene_id in translated:
+            scene.scene_name = translated[scene.scene_id].name
+        scene.primary_asset = relink(scene.primary_asset)
+        scene.secondary_assets = [relink(a) for a in scene.secondary_assets]
+        scene.duration = timings.get(scene.scene_id, {}).get("duration", scene.duration)
+    changed = 0
+    for scene in blueprint.scenes:
+        scene.primary_asset = relink(scene.primary_asset)
+        scene.secondary_assets = [relink(a) for a in scene.secondary_assets]
+        if scene.scene_id in translated:
+            scene.scene_name = translated[scene.scene_id].name
+            scene.narration_excerpt = translated[scene.scene_id].narration[:150]
+        timing = timings.get(scene.scene_id)
+        if timing is None:
+            continue
+        if round(timing["duration"], 3) != round(scene.duration, 3):
+            changed += 1
+        scene.start_time = timing["start_time"]
+        scene.end_time = timing["end_time"]
+        scene.duration = timing["duration"]
+    blueprint.total_duration = data["tts"].total_duration_seconds
+
+    for segment in (source_dir / "segments").glob("*.mp4"):
+        if not segment.name.endswith(".part.mp4"):
+            _link_file(segment, job_dir / "segments" / segment.name)
+
+    data.update(footage=footage, script_approved=True, voice_approved=True)
+    _save_checkpoint(job_id, data, "footage", footage)
+    _save_checkpoint(job_id, data, "blueprint", blueprint)
+    return changed
+
+
+async def run_pipeline_variant(job_id: str, source_id: str):
+    """Localize the finished job ``source_id`` as ``job_id`` (whose req carries the language).
+
+    Step 1 reuses the source analysis, step 2 translates the script scene by
+    scene, step 3 voices it; steps 4-7 then run as phase 3 on the source's
+    footage and timeline. There are no approval gates.
+    """
+    req = GenerateRequest(**store.get_pipeline_data(job_id, "req"))
+    source = _load_artifacts(source_id)
+    cancel = cancellation.token_for(job_id)
+    job_dir = config.TEMP_DIR / job_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+    step = 1
+    try:
+        store.start_step(job_id, 1, "Reusing the source analysis…")
+        if "analysis" in source:
+            analysis = source["analysis"].model_copy(update={"language": req.language})
+            store.set_pipeline_data(job_id, "analysis", analysis.model_dump())
+        store.complete_step(job_id, 1, f"Reused from job {source_id[:8]}")
+
+        step = 2
+        store.start_step(job_id, 2, f"Translating script to {req.language}…")
+        stats = llm_cache.track()
+        script = await _run_in_thread(translate_script, source["script"], req.language, cancel=cancel)
+        store.set_pipeline_data(job_id, "script", script.model_dump())
+        store.complete_step(job_id, 2, _with_cache_stats(
+            f"{len(script.scenes)} scenes translated | ~{script.total_word_count} words", stats))
+
+        step = 3
+        store.start_step(job_id, 3, "Generating voiceover…")
+        tts_result = await _run_in_thread(generate_tts, script, req.voice_id, job_dir, cancel=cancel)
+        store.set_pipeline_data(job_id, "tts", tts_result.model_dump())
+        store.complete_step(job_id, 3, f"Audio ready: ~{tts_result.total_duration_seconds:.0f}s")
 
+        step = 4
+        changed = await _run_in_thread(_share_source_render, job_id, source_id, _phase3_artifacts(job_id))
+        print(f"[orchestrator] {job_id[:8]} variant of {source_id[:8]}: "
+              f"{changed}/{len(script.scenes)} scenes re-timed")
+    except cancellation.JobCancelled:
+        print(f"[orchestrator] Variant {job_id} cancelled")
+        return
     except Exception as e:
         import traceback; traceback.print_exc()
-        job = store.get(job_id)
-        store.fail_job(job_id, f"{type(e).__name__}: {e}", step=job.current_step if job else 4)
+        store.fail_job(job_id, f"{type(e).__name__}: {e}", step=step)
+        return
+
+    await run_pipeline_phase3(job_id)
+
+
+def _tts_from_wav(job_id: str, script: Script) -> TTSResult:
+    """Rebuild a TTSResult from the saved audio file (jobs voiced before timings were stored)."""
+    import soundfile as sf
+
+    wav = config.TEMP_DIR / job_id / "voiceover.wav"
+    duration = sf.info(str(wav)).duration if wav.exists() else 0.0
+    per_scene = duration / max(len(script.scenes), 1)
+    return TTSResult(
+        audio_path=str(wav),
+        total_duration_seconds=duration,
+        scenes=[{"scene_id": s.scene_id, "start_time": per_scene * i, "end_time": per_scene * (i + 1),
+                 "duration": per_scene}
+                for i, s in enumerate(script.scenes)],
+    )
 
 
 # ── Legacy aliases used by edit/regenerate endpoints ─────────────────────────
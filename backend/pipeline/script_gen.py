@@ -1,10 +1,17 @@
 """Step 2 – Script Generation: create a narration script segmented by scenes."""
 
+import contextvars
 import json
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from anthropic import Anthropic
 from config import config
-from models import Script, Scene, PromptAnalysis
+from models import Script, Scene, PromptAnalysis, TalkingPoint
+from pipeline import llm_cache
+from pipeline.cancellation import raise_if_cancelled
+from pipeline.analyzer import _analysis_from_data
 
 client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
 
@@ -58,6 +65,107 @@ Scene naming guide:
 Word count per scene should be proportional to talking point importance.
 At {wpm} words per minute average narration speed."""
 
+FUSED_SYSTEM_PROMPT = """You are a professional video script analyst and an expert video scriptwriter.
+Given a video title and a user prompt, first extract structured editorial information,
+then write a compelling narration script from it, natural-sounding for text-to-speech
+and precisely structured by scenes.
+Always respond with valid JSON matching the schema exactly — no extra keys, no markdown."""
+
+FUSED_TEMPLATE = """Analyze the following video request, then write its complete narration script.
+
+Title: {title}
+Type: {video_type}
+Target duration: {duration} minutes
+Language: {language}
+
+User Prompt:
+{prompt}
+
+Return ONLY this JSON structure (no markdown, no explanation):
+{{
+  "analysis": {{
+    "topic": "concise description of the main subject",
+    "talking_points": [
+      {{
+        "index": 1,
+        "title": "point title",
+        "content": "what this point covers",
+        "visual_keywords": ["keyword1", "keyword2", "keyword3"]
+      }}
+    ],
+    "tone": "one of: serious | mysterious | urgent | educational | entertaining | neutral",
+    "style": "one of: documentary | top10 | mystery | news | educational",
+    "estimated_duration_minutes": {duration},
+    "visual_elements": ["specific visual element 1", "specific visual element 2"],
+    "language": "{language}"
+  }},
+  "script": {{
+    "full_text": "Complete narration as a single string (all scenes joined)",
+    "scenes": [
+      {{
+        "scene_id": "scene_1",
+        "name": "Hook",
+        "narration": "The narration text for this scene only",
+        "word_count": 75,
+        "estimated_duration_seconds": 30,
+        "visual_keywords": ["keyword1", "keyword2"]
+      }}
+    ],
+    "total_word_count": 1500,
+    "estimated_duration_minutes": {duration}
+  }}
+}}
+
+Analysis rules:
+- Extract 4–10 talking points based on the prompt and target duration
+- visual_keywords must be concrete, searchable terms (e.g. "NASA spacecraft", not "space stuff")
+- visual_elements should list key visuals needed across the whole video
+- Do NOT invent facts not present in the prompt
+
+Script requirements:
+- Structure: Hook → Context → [One scene per talking point from your analysis] → Conclusion
+- Natural TTS flow: no stage directions, no [PAUSE], no NARRATOR:, no timestamps
+- Match the tone and style you chose in the analysis
+- Smooth transitions between scenes
+- Engaging hook and strong conclusion
+- Word count per scene proportional to talking point importance,
+  at {wpm} words per minute average narration speed"""
+
+SCENE_SYSTEM_PROMPT = """You are an expert video scriptwriter.
+You write one scene of a longer narration script at a time, natural-sounding for
+text-to-speech, flowing seamlessly from the previous scene into the next one.
+Always respond with valid JSON matching the schema exactly."""
+
+SCENE_TEMPLATE = """Write the narration for ONE scene of the following video.
+
+Title: {title}
+Topic: {topic}
+Tone: {tone}
+Style: {style}
+Language: {language}
+
+Full outline (for context only):
+{outline}
+
+Previous scene: {previous}
+Next scene: {next}
+
+Write scene {position} of {total}: "{name}"
+What it covers: {brief}
+Length: about {words} words.
+
+Requirements:
+- Natural TTS flow: no stage directions, no [PAUSE], no NARRATOR:, no timestamps
+- Match the tone ({tone}) and style ({style})
+- Pick up naturally from the previous scene and lead into the next one
+- Cover only this scene's material; do not repeat neighbouring scenes
+
+Return ONLY this JSON (no markdown):
+{{
+  "narration": "The narration text for this scene only",
+  "visual_keywords": ["keyword1", "keyword2", "keyword3"]
+}}"""
+
 MODIFY_SYSTEM_PROMPT = """You are an expert video scriptwriter.
 You will receive an existing narration script and a modification instruction.
 Apply the modification while preserving the overall structure, tone, and style.
@@ -88,12 +196,89 @@ Return ONLY the same JSON schema (no markdown):
 }}"""
 
 
-def _parse_script_json(raw: str) -> Script:
+RESOLVE_SYSTEM_PROMPT = """You route script edit instructions to the scenes they affect.
+Always respond with valid JSON matching the schema exactly."""
+
+RESOLVE_TEMPLATE = """A video narration script has these scenes:
+
+{scene_list}
+
+Edit instruction: {instruction}
+
+Which scenes must be rewritten to apply this instruction? Pick only the scenes
+the instruction actually targets. If it applies to the whole script (overall
+length, tone everywhere, restructuring, adding or removing scenes), set "all" to true.
+
+Return ONLY this JSON (no markdown):
+{{
+  "scene_ids": ["scene_1"],
+  "all": false
+}}"""
+
+REWRITE_SCENES_TEMPLATE = """Here are some scenes from an existing video narration script, in JSON format:
+
+{scenes}
+
+Neighbouring scenes, for continuity only (do NOT rewrite these):
+{neighbours}
+
+Modification instruction: {instruction}
+
+Rewrite ONLY the scenes given above, applying the modification instruction exactly.
+Keep each scene_id and name unchanged.
+Return ONLY this JSON (no markdown):
+{{
+  "scenes": [
+    {{
+      "scene_id": "scene_1",
+      "narration": "...",
+      "visual_keywords": ["keyword1"]
+    }}
+  ]
+}}"""
+
+TRANSLATE_SYSTEM_PROMPT = """You are an expert translator of video narration.
+You translate one scene of a narration script at a time, natural-sounding for
+text-to-speech in the target language, keeping the meaning, tone and pacing.
+Always respond with valid JSON matching the schema exactly."""
+
+TRANSLATE_TEMPLATE = """Translate ONE scene of a video narration script into {language}.
+
+Previous scene (context only): {previous}
+Next scene (context only): {next}
+
+Scene name: {name}
+Narration:
+{narration}
+
+Requirements:
+- Natural TTS flow in {language}: no stage directions, no notes, no brackets
+- Keep the length close to the original so the narration fits the same footage
+- Translate the scene name as well
+
+Return ONLY this JSON (no markdown):
+{{
+  "name": "Translated scene name",
+  "narration": "Translated narration"
+}}"""
+
+
+def _strip_fences(raw: str) -> str:
     raw = raw.strip()
     raw = re.sub(r"^```(?:json)?\s*", "", raw)
     raw = re.sub(r"\s*```$", "", raw)
+    return raw
+
+
+def _parse_json(raw: str) -> dict:
+    return json.loads(_strip_fences(raw))
 
-    data = json.loads(raw)
+
+def _parse_script_json(raw: str) -> Script:
+    return _script_from_data(_parse_json(raw))
+
+
+def _script_from_data(data: dict) -> Script:
     scenes = []
     for sd in data["scenes"]:
         scenes.append(
@@ -119,7 +304,11 @@ def generate_script(
     title: str,
     analysis: PromptAnalysis,
     target_duration: int,
+    cancel: Optional[threading.Event] = None,
 ) -> Script:
+    if target_duration >= config.SCRIPT_FANOUT_MIN_MINUTES:
+        return _generate_script_fanout(title, analysis, target_duration, cancel)
+
     talking_points_text = "\n".join(
         f"{tp.index}. {tp.title}: {tp.content}"
         for tp in analysis.talking_points
@@ -136,28 +325,340 @@ def generate_script(
         wpm=config.NARRATION_WPM,
     )
 
-    response = client.messages.create(
+    return llm_cache.complete(
+        client,
+        site="script",
         model=config.CLAUDE_MODEL,
         max_tokens=8192,
         system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_msg}],
+        user_msg=user_msg,
+        parse=_parse_script_json,
+    )
+
+
+# ── Long scripts: outline → parallel scene expansion ─────────────────────────
+
+_MAX_SCENE_WORDS = 1200     # per scene; longer talking points are split
+_MAX_SCENE_TOKENS = 16384   # ceiling for the retry of a truncated scene
+
+
+def _build_outline(analysis: PromptAnalysis, target_duration: int) -> list[dict]:
+    """Hook → Context → scene(s) per talking point → Conclusion, with word budgets."""
+    total_words = target_duration * config.NARRATION_WPM
+    hook_words = max(60, int(total_words * 0.05))
+    context_words = max(100, int(total_words * 0.10))
+    conclusion_words = max(80, int(total_words * 0.07))
+    points = analysis.talking_points or [
+        TalkingPoint(index=1, title=analysis.topic, content=analysis.topic)
+    ]
+    point_words = max(100, (total_words - hook_words - context_words - conclusion_words) // len(points))
+
+    outline = [{
+        "name": "Hook",
+        "brief": f"An attention-grabbing opening about {analysis.topic}",
+        "words": hook_words,
+        "visual_keywords": analysis.visual_elements[:3],
+    }, {
+        "name": "Context",
+        "brief": f"Background the viewer needs before the main points about {analysis.topic}",
+        "words": context_words,
+        "visual_keywords": analysis.visual_elements[3:6],
+    }]
+    # A point too long for one completion becomes several consecutive scenes
+    parts = -(-point_words // _MAX_SCENE_WORDS)
+    for tp in points:
+        for part in range(1, parts + 1):
+            outline.append({
+                "name": tp.title if parts == 1 else f"{tp.title} ({part}/{parts})",
+                "brief": tp.content if parts == 1 else f"{tp.content} — part {part} of {parts}",
+                "words": point_words // parts,
+                "visual_keywords": tp.visual_keywords,
+            })
+    outline.append({
+        "name": "Conclusion",
+        "brief": f"A strong closing that ties together the story of {analysis.topic}",
+        "words": conclusion_words,
+        "visual_keywords": analysis.visual_elements[-3:],
+    })
+    for i, entry in enumerate(outline):
+        entry["scene_id"] = f"scene_{i + 1}"
+    return outline
+
+
+def _complete_scene(user_msg: str, max_tokens: int) -> dict:
+    return llm_cache.complete(
+        client,
+        site="script_scene",
+        model=config.CLAUDE_MODEL,
+        max_tokens=max_tokens,
+        system=SCENE_SYSTEM_PROMPT,
+        user_msg=user_msg,
+        parse=_parse_json,
+        allow_truncated=False,
+    )
+
+
+def _expand_scene(title: str, analysis: PromptAnalysis, outline: list[dict], i: int,
+                  cancel: Optional[threading.Event] = None) -> Scene:
+    raise_if_cancelled(cancel)
+    entry = outline[i]
+    prev_entry = outline[i - 1] if i > 0 else None
+    next_entry = outline[i + 1] if i + 1 < len(outline) else None
+
+    user_msg = SCENE_TEMPLATE.format(
+        title=title,
+        topic=analysis.topic,
+        tone=analysis.tone,
+        style=analysis.style,
+        language=analysis.language,
+        outline="\n".join(f"{n + 1}. {e['name']}: {e['brief']}" for n, e in enumerate(outline)),
+        previous=f"{prev_entry['name']} — {prev_entry['brief']}" if prev_entry else "none (this is the opening)",
+        next=f"{next_entry['name']} — {next_entry['brief']}" if next_entry else "none (this is the ending)",
+        position=i + 1,
+        total=len(outline),
+        name=entry["name"],
+        brief=entry["brief"],
+        words=entry["words"],
     )
 
-    return _parse_script_json(response.content[0].text)
+    # A scene cut off at max_tokens is retried once with a larger budget, never accepted
+    max_tokens = min(8192, entry["words"] * 2 + 512)
+    try:
+        data = _complete_scene(user_msg, max_tokens)
+    except llm_cache.Truncated:
+        print(f"[script] {entry['scene_id']} hit max_tokens={max_tokens} — retrying with a larger budget")
+        raise_if_cancelled(cancel)
+        data = _complete_scene(user_msg, min(_MAX_SCENE_TOKENS, max_tokens * 2))
+    narration = data["narration"].strip()
+    word_count = len(narration.split())
+    return Scene(
+        scene_id=entry["scene_id"],
+        name=entry["name"],
+        narration=narration,
+        word_count=word_count,
+        estimated_duration_seconds=round(word_count / config.NARRATION_WPM * 60, 1),
+        visual_keywords=data.get("visual_keywords") or entry["visual_keywords"] or [entry["name"]],
+    )
+
+
+def _generate_script_fanout(title: str, analysis: PromptAnalysis, target_duration: int,
+                            cancel: Optional[threading.Event] = None) -> Script:
+    """Expand each outline scene in its own Claude call, all in parallel, then merge."""
+    outline = _build_outline(analysis, target_duration)
+    print(f"[script] Fan-out: {len(outline)} scenes for a {target_duration}-minute target")
+
+    workers = max(1, min(config.SCRIPT_FANOUT_WORKERS, len(outline)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Each worker runs in a copy of this context so LLM cache stats reach the job
+        futures = [
+            pool.submit(contextvars.copy_context().run, _expand_scene, title, analysis, outline, i, cancel)
+            for i in range(len(outline))
+        ]
+        scenes = [f.result() for f in futures]
+
+    return _merge_scenes(scenes)
 
 
-def modify_script(current_script: Script, instruction: str) -> Script:
-    """Modify an existing script based on a user instruction using Claude."""
+def _merge_scenes(scenes: list[Scene]) -> Script:
+    full_text = "\n\n".join(s.narration for s in scenes)
+    total_words = sum(s.word_count for s in scenes)
+    return Script(
+        full_text=full_text,
+        scenes=scenes,
+        total_word_count=total_words,
+        estimated_duration_minutes=round(total_words / config.NARRATION_WPM, 1),
+    )
+
+
+def analyze_and_generate_script(
+    title: str,
+    prompt: str,
+    video_type: str,
+    target_duration: int,
+    language: str,
+) -> tuple[PromptAnalysis, Script]:
+    """Fused steps 1+2: produce the analysis and the script in a single Claude call."""
+    user_msg = FUSED_TEMPLATE.format(
+        title=title,
+        prompt=prompt,
+        video_type=video_type,
+        duration=target_duration,
+        language=language,
+        wpm=config.NARRATION_WPM,
+    )
+
+    def parse(raw: str) -> tuple[PromptAnalysis, Script]:
+        data = _parse_json(raw)
+        return _analysis_from_data(data["analysis"], language), _script_from_data(data["script"])
+
+    return llm_cache.complete(
+        client,
+        site="script_fused",
+        model=config.CLAUDE_MODEL,
+        max_tokens=10240,
+        system=FUSED_SYSTEM_PROMPT,
+        user_msg=user_msg,
+        parse=parse,
+    )
+
+
+def modify_script(current_script: Script, instruction: str, targeted: bool = True,
+                  cancel: Optional[threading.Event] = None) -> Script:
+    """Modify an existing script based on a user instruction using Claude.
+
+    With ``targeted`` the instruction is first resolved to the scenes it affects
+    and only those are rewritten; every other scene keeps its exact text.
+    Falls back to a full rewrite when the instruction spans the whole script.
+    """
+    if targeted:
+        scene_ids = _resolve_edit_scenes(current_script, instruction)
+        raise_if_cancelled(cancel)
+        if scene_ids:
+            return _rewrite_scenes(current_script, scene_ids, instruction)
+
     user_msg = MODIFY_TEMPLATE.format(
         current_script=json.dumps(current_script.model_dump(), indent=2),
         instruction=instruction,
     )
 
-    response = client.messages.create(
+    return llm_cache.complete(
+        client,
+        site="script_edit",
         model=config.CLAUDE_MODEL,
         max_tokens=8192,
         system=MODIFY_SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_msg}],
+        user_msg=user_msg,
+        parse=_parse_script_json,
     )
 
-    return _parse_script_json(response.content[0].text)
+
+def _resolve_edit_scenes(script: Script, instruction: str) -> list[str]:
+    """Scene ids the instruction targets, or [] when it needs a full rewrite."""
+    scene_list = "\n".join(
+        f"- {s.scene_id} ({s.name}): {s.narration[:120]}…" for s in script.scenes
+    )
+    user_msg = RESOLVE_TEMPLATE.format(scene_list=scene_list, instruction=instruction)
+
+    try:
+        data = llm_cache.complete(
+            client,
+            site="script_edit_resolve",
+            model=config.CLAUDE_MODEL,
+            max_tokens=256,
+            system=RESOLVE_SYSTEM_PROMPT,
+            user_msg=user_msg,
+            parse=_parse_json,
+        )
+    except Exception as e:
+        print(f"[script] Could not resolve edit scenes ({e}) — full rewrite")
+        return []
+
+    known = {s.scene_id for s in script.scenes}
+    scene_ids = [sid for sid in data.get("scene_ids", []) if sid in known]
+    if data.get("all") or not scene_ids or len(scene_ids) == len(known):
+        return []
+    return scene_ids
+
+
+def _rewrite_scenes(script: Script, scene_ids: list[str], instruction: str) -> Script:
+    """Rewrite only ``scene_ids`` and splice them back into the script."""
+    index = {s.scene_id: i for i, s in enumerate(script.scenes)}
+    targets = [script.scenes[index[sid]] for sid in scene_ids]
+    neighbour_idx = sorted({
+        j for sid in scene_ids for j in (index[sid] - 1, index[sid] + 1)
+        if 0 <= j < len(script.scenes) and script.scenes[j].scene_id not in scene_ids
+    })
+    neighbours = "\n".join(
+        f"- {script.scenes[j].scene_id} ({script.scenes[j].name}): {script.scenes[j].narration}"
+        for j in neighbour_idx
+    ) or "none"
+
+    user_msg = REWRITE_SCENES_TEMPLATE.format(
+        scenes=json.dumps(
+            [{"scene_id": s.scene_id, "name": s.name, "narration": s.narration,
+              "visual_keywords": s.visual_keywords} for s in targets],
+            ensure_ascii=False,
+        ),
+        neighbours=neighbours,
+        instruction=instruction,
+    )
+    target_words = sum(s.word_count for s in targets)
+
+    data = llm_cache.complete(
+        client,
+        site="script_edit",
+        model=config.CLAUDE_MODEL,
+        max_tokens=min(8192, target_words * 3 + 512),
+        system=MODIFY_SYSTEM_PROMPT,
+        user_msg=user_msg,
+        parse=_parse_json,
+    )
+    # Neighbours are context only: a rewrite Claude returns for one is dropped
+    rewritten = {sd["scene_id"]: sd for sd in data.get("scenes", []) if sd.get("scene_id") in scene_ids}
+    print(f"[script] Targeted edit rewrote {len(rewritten)}/{len(script.scenes)} scenes")
+
+    scenes = []
+    for scene in script.scenes:
+        sd = rewritten.get(scene.scene_id)
+        if sd is None or not sd.get("narration"):
+            scenes.append(scene)
+            continue
+        narration = sd["narration"].strip()
+        word_count = len(narration.split())
+        scenes.append(scene.model_copy(update={
+            "narration": narration,
+            "word_count": word_count,
+            "estimated_duration_seconds": round(word_count / config.NARRATION_WPM * 60, 1),
+            "visual_keywords": sd.get("visual_keywords") or scene.visual_keywords,
+        }))
+    return _merge_scenes(scenes)
+
+
+# ── Translation ───────────────────────────────────────────────────────────────
+
+def _translate_scene(script: Script, i: int, language: str, cancel: Optional[threading.Event] = None) -> Scene:
+    raise_if_cancelled(cancel)
+    scene = script.scenes[i]
+    prev_scene = script.scenes[i - 1] if i > 0 else None
+    next_scene = script.scenes[i + 1] if i + 1 < len(script.scenes) else None
+
+    user_msg = TRANSLATE_TEMPLATE.format(
+        language=language,
+        previous=prev_scene.narration if prev_scene else "none (this is the opening)",
+        next=next_scene.narration if next_scene else "none (this is the ending)",
+        name=scene.name,
+        narration=scene.narration,
+    )
+    data = llm_cache.complete(
+        client,
+        site="script_translate",
+        model=config.CLAUDE_MODEL,
+        max_tokens=min(8192, scene.word_count * 3 + 512),
+        system=TRANSLATE_SYSTEM_PROMPT,
+        user_msg=user_msg,
+        parse=_parse_json,
+    )
+    narration = data["narration"].strip()
+    word_count = len(narration.split())
+    return scene.model_copy(update={
+        "name": data.get("name") or scene.name,
+        "narration": narration,
+        "word_count": word_count,
+        "estimated_duration_seconds": round(word_count / config.NARRATION_WPM * 60, 1),
+    })
+
+
+def translate_script(script: Script, language: str, cancel: Optional[threading.Event] = None) -> Script:
+    """Translate every scene in its own Claude call, all in parallel.
+
+    Scene ids and visual keywords are kept, so the translation can reuse the
+    original footage and edit timeline.
+    """
+    workers = max(1, min(config.SCRIPT_FANOUT_WORKERS, len(script.scenes)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, _translate_scene, script, i, language, cancel)
+            for i in range(len(script.scenes))
+        ]
+        scenes = [f.result() for f in futures]
+    return _merge_scenes(scenes)
@@ -2,64 +2,181 @@
 
 Uses PCM output format (pcm_44100) to avoid ffmpeg/pydub dependencies.
 Audio is concatenated as numpy arrays and saved as WAV via soundfile.
+Each scene's samples are also kept in a per-scene segment cache keyed by its
+text, so unchanged scenes are never re-synthesized.
+
+Scene timings record exact sample offsets, so ``regenerate_scene`` can
+re-voice a single scene and splice it into ``voiceover.wav`` in place.
+
+Next to the WAV, ``voiceover.peaks.npz`` holds min/max waveform peaks at a
+few resolutions, so the voiceover panel can draw the waveform without
+downloading the audio.
 """
 
+import hashlib
+import struct
+import threading
+from pathlib import Path
+from typing import Optional
+
 import numpy as np
 import soundfile as sf
-from pathlib import Path
 
 from config import config
-from models import Script, TTSResult
+from models import Scene, Script, TTSResult
+from pipeline.cancellation import raise_if_cancelled
+from pipeline.keyed_locks import KeyedLocks
 
 SAMPLE_RATE = 44100
 SILENCE_SAMPLES = int(SAMPLE_RATE * 0.45)  # 450 ms gap between scenes
 
+# One lock per segment file so a speculative run and the real step 3 never
+# synthesize the same scene twice — the second caller waits and reuses it.
+_segment_locks = KeyedLocks()
 
-def generate_tts(script: Script, voice_id: str, job_dir: Path) -> TTSResult:
-    """Generate voiceover for the full script scene-by-scene via ElevenLabs."""
+
+def _client():
     from elevenlabs.client import ElevenLabs
 
-    client = ElevenLabs(api_key=config.ELEVENLABS_API_KEY)
+    return ElevenLabs(api_key=config.ELEVENLABS_API_KEY)
+
+
+def _segments_dir(job_dir: Path) -> Path:
+    return job_dir / "tts_segments"
+
+
+def _segment_path(job_dir: Path, scene: Scene, voice_id: str) -> Path:
+    """Segment files are keyed by scene id + hash of (model, voice, text)."""
+    key = hashlib.sha256(
+        f"{config.ELEVENLABS_MODEL}|{voice_id}|{scene.narration}".encode("utf-8")
+    ).hexdigest()[:16]
+    return _segments_dir(job_dir) / f"{scene.scene_id}_{key}.npy"
+
+
+def _segment_lock(path: Path):
+    return _segment_locks.hold(str(path))
+
+
+def _timing(scene_id: str, start_sample: int, num_samples: int) -> dict:
+    start = start_sample / SAMPLE_RATE
+    duration = num_samples / SAMPLE_RATE
+    return {
+        "scene_id": scene_id,
+        "start_time": round(start, 2),
+        "end_time": round(start + duration, 2),
+        "duration": round(duration, 2),
+        "start_sample": start_sample,
+        "num_samples": num_samples,
+    }
+
+
+def synthesize_scene(client, scene: Scene, voice_id: str, job_dir: Path, use_cache: bool = True) -> np.ndarray:
+    """Float32 samples for one scene, from the segment cache when its text is unchanged.
+
+    Raises on API failure; nothing is cached in that case.
+    """
+    path = _segment_path(job_dir, scene, voice_id)
+    with _segment_lock(path):
+        if use_cache and path.exists():
+            try:
+                return np.load(path)
+            except (OSError, ValueError):
+                path.unlink(missing_ok=True)
+
+        audio_bytes = b"".join(
+            client.text_to_speech.convert(
+                text=scene.narration,
+                voice_id=voice_id,
+                model_id=config.ELEVENLABS_MODEL,
+                output_format="pcm_44100",
+            )
+        )
+        # PCM 16-bit → float32 [-1, 1]
+        samples = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, samples)
+        tmp.replace(path)
+        return samples
+
+
+def cached_scene_count(script: Script, voice_id: str, job_dir: Path) -> int:
+    return sum(1 for scene in script.scenes if _segment_path(job_dir, scene, voice_id).exists())
+
+
+def discard_stale_segments(script: Script, voice_id: str, job_dir: Path) -> int:
+    """Delete segments whose scene text (or voice) no longer matches the script."""
+    seg_dir = _segments_dir(job_dir)
+    if not seg_dir.exists():
+        return 0
+    current = {_segment_path(job_dir, scene, voice_id).name for scene in script.scenes}
+    removed = 0
+    for path in seg_dir.glob("*.npy"):
+        if path.name not in current:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def presynthesize(script: Script, voice_id: str, job_dir: Path, stop: Optional[threading.Event] = None) -> int:
+    """Speculatively fill the segment cache while the script awaits approval.
+
+    Stops early when ``stop`` is set (script edited or approved with changes).
+    Returns the number of scenes synthesized by this run.
+    """
+    client = _client()
+    done = 0
+    for scene in script.scenes:
+        if stop is not None and stop.is_set():
+            break
+        if _segment_path(job_dir, scene, voice_id).exists():
+            continue
+        try:
+            synthesize_scene(client, scene, voice_id, job_dir)
+            done += 1
+        except Exception as e:
+            print(f"[tts] Speculative synthesis of {scene.scene_id} failed: {e}")
+    print(f"[tts] Speculatively synthesized {done}/{len(script.scenes)} scenes")
+    return done
+
+
+def generate_tts(script: Script, voice_id: str, job_dir: Path, use_cache: bool = True,
+                 cancel: Optional[threading.Event] = None) -> TTSResult:
+    """Generate voiceover for the full script scene-by-scene via ElevenLabs.
+
+    Scenes already in the segment cache (e.g. from ``presynthesize``) are not
+    sent to the API again unless ``use_cache`` is False.
+    """
+    client = _client()
 
     all_parts: list[np.ndarray] = []
     scene_timings: list[dict] = []
-    elapsed = 0.0
+    offset = 0  # in samples
 
     for i, scene in enumerate(script.scenes):
+        raise_if_cancelled(cancel)
         print(f"[tts] Scene {i + 1}/{len(script.scenes)}: {len(scene.narration.split())} words")
         try:
-            audio_bytes = b"".join(
-                client.text_to_speech.convert(
-                    text=scene.narration,
-                    voice_id=voice_id,
-                    model_id=config.ELEVENLABS_MODEL,
-                    output_format="pcm_44100",
-                )
-            )
-            # PCM 16-bit → float32 [-1, 1]
-            samples = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+            samples = synthesize_scene(client, scene, voice_id, job_dir, use_cache=use_cache)
         except Exception as e:
             print(f"[tts] Scene {i + 1} failed: {e}")
             samples = np.zeros(SAMPLE_RATE * 2, dtype=np.float32)
 
-        duration = len(samples) / SAMPLE_RATE
-        scene_timings.append({
-            "scene_id": scene.scene_id,
-            "start_time": round(elapsed, 2),
-            "end_time": round(elapsed + duration, 2),
-            "duration": round(duration, 2),
-        })
-        elapsed += duration
+        scene_timings.append(_timing(scene.scene_id, offset, len(samples)))
+        offset += len(samples)
 
         all_parts.append(samples)
         if i < len(script.scenes) - 1:
             all_parts.append(np.zeros(SILENCE_SAMPLES, dtype=np.float32))
-            elapsed += SILENCE_SAMPLES / SAMPLE_RATE
+            offset += SILENCE_SAMPLES
 
     final_audio = np.concatenate(all_parts) if all_parts else np.zeros(SAMPLE_RATE, dtype=np.float32)
 
     audio_path = job_dir / "voiceover.wav"
     sf.write(str(audio_path), final_audio, SAMPLE_RATE)
+    write_peaks(audio_path)
     print(f"[tts] Saved {len(final_audio) / SAMPLE_RATE:.1f}s voiceover → {audio_path}")
 
     return TTSResult(
@@ -67,3 +184,239 @@ def generate_tts(script: Script, voice_id: str, job_dir: Path) -> TTSResult:
         total_duration_seconds=round(len(final_audio) / SAMPLE_RATE, 2),
         scenes=scene_timings,
     )
+
+
+# ── Waveform peaks ────────────────────────────────────────────────────────────
+
+PEAK_LEVELS = (256, 1024, 4096, 16384)  # samples per peak, finest first
+_PEAK_CHUNK = PEAK_LEVELS[-1] * 64      # frames read per step; a multiple of every level
+
+
+def _peaks_path(audio_path: Path) -> Path:
+    return audio_path.with_suffix(".peaks.npz")
+
+
+def _min_max(lows: np.ndarray, highs: np.ndarray, size: int) -> np.ndarray:
+    """(n, 2) min of ``lows`` / max of ``highs`` over consecutive groups of ``size``; the last may be short."""
+    n = -(-len(lows) // size)
+    pad = n * size - len(lows)
+    if pad:  # repeat the last value so padding cannot change a min or max
+        lows = np.concatenate([lows, np.repeat(lows[-1:], pad)])
+        highs = np.concatenate([highs, np.repeat(highs[-1:], pad)])
+    return np.stack([lows.reshape(n, size).min(axis=1), highs.reshape(n, size).max(axis=1)], axis=1)
+
+
+def _pcm_chunks(audio_path: Path):
+    """The WAV's int16 frames, ``_PEAK_CHUNK`` at a time, through a memory map when the layout allows."""
+    layout = _wav_layout(audio_path)
+    if layout is None:
+        for block in sf.blocks(str(audio_path), blocksize=_PEAK_CHUNK, dtype="int16", always_2d=True):
+            yield block[:, 0]
+        return
+    data_offset, data_bytes = layout
+    frames = data_bytes // 2
+    if not frames:
+        return
+    mm = np.memmap(audio_path, dtype="<i2", mode="r", offset=data_offset, shape=(frames,))
+    try:
+        for i in range(0, frames, _PEAK_CHUNK):
+            yield np.asarray(mm[i:i + _PEAK_CHUNK])
+    finally:
+        del mm
+
+
+def write_peaks(audio_path: Path) -> Path:
+    """Compute min/max peaks of ``audio_path`` at every ``PEAK_LEVELS`` resolution.
+
+    One pass over the file, a chunk at a time: the finest level is computed
+    from the samples and the coarser ones from it.
+    """
+    finest = PEAK_LEVELS[0]
+    parts = [_min_max(chunk, chunk, finest) for chunk in _pcm_chunks(audio_path)]
+    base = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.int16)
+
+    levels = {str(finest): base}
+    for level in PEAK_LEVELS[1:]:
+        levels[str(level)] = (
+            _min_max(base[:, 0], base[:, 1], level // finest) if len(base) else base
+        )
+
+    path = _peaks_path(audio_path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **levels)
+    tmp.replace(path)
+    return path
+
+
+def load_peaks(audio_path: Path, samples_per_peak: int) -> tuple:
+    """(level, peaks) at the finest stored level of at least ``samples_per_peak``.
+
+    Peaks missing or older than the audio are recomputed first.
+    """
+    path = _peaks_path(audio_path)
+    if not path.exists() or path.stat().st_mtime < audio_path.stat().st_mtime:
+        write_peaks(audio_path)
+    level = next((l for l in PEAK_LEVELS if l >= samples_per_peak), PEAK_LEVELS[-1])
+    with np.load(path) as peaks:
+        return level, peaks[str(level)]
+
+
+# ── Single-scene regeneration ─────────────────────────────────────────────────
+
+_CHUNK_FRAMES = 1 << 20  # frames moved per step when shifting the tail
+
+
+def _wav_layout(path: Path) -> Optional[tuple]:
+    """(data_offset, data_bytes) of a mono 16-bit PCM WAV whose last chunk is "data".
+
+    None for any other layout, which the splice does not handle.
+    """
+    with open(path, "rb") as f:
+        riff, _size, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            return None
+        pcm16_mono = False
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                audio_format, channels, _rate, _byte_rate, _align, bits = struct.unpack("<HHIIHH", fmt[:16])
+                pcm16_mono = audio_format == 1 and channels == 1 and bits == 16
+                if chunk_size % 2:
+                    f.seek(1, 1)
+            elif chunk_id == b"data":
+                data_offset = f.tell()
+                file_size = path.stat().st_size
+                if not pcm16_mono or data_offset + chunk_size != file_size:
+                    return None
+                return data_offset, chunk_size
+            else:
+                f.seek(chunk_size + chunk_size % 2, 1)
+
+
+def wav_slice(audio_path: Path, start_sample: int, num_samples: int) -> Optional[tuple]:
+    """(header, data_offset, data_bytes) of a standalone WAV holding only the given frames.
+
+    ``header`` is a fresh 44-byte PCM header; the samples are
+    ``data_bytes`` bytes of ``audio_path`` from ``data_offset``, so the slice
+    can be served without decoding. None if the file's layout is unexpected.
+    """
+    layout = _wav_layout(audio_path)
+    if layout is None:
+        return None
+    data_offset, total_bytes = layout
+    start = min(max(start_sample, 0) * 2, total_bytes)
+    length = min(max(num_samples, 0) * 2, total_bytes - start)
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + length, b"WAVE",
+        b"fmt ", 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16,
+        b"data", length,
+    )
+    return header, data_offset + start, length
+
+
+def _shift_tail(path: Path, data_offset: int, src: int, dst: int, frames: int):
+    """Move ``frames`` int16 frames from index ``src`` to ``dst`` through a memory map, chunk by chunk."""
+    if frames <= 0 or src == dst:
+        return
+    mm = np.memmap(path, dtype="<i2", mode="r+", offset=data_offset)
+    try:
+        # Copy from the far end when moving right so no frame is overwritten before it is read
+        starts = range(0, frames, _CHUNK_FRAMES)
+        if dst > src:
+            starts = reversed(starts)
+        for i in starts:
+            n = min(_CHUNK_FRAMES, frames - i)
+            mm[dst + i:dst + i + n] = mm[src + i:src + i + n]
+        mm.flush()
+    finally:
+        del mm
+
+
+def _splice(path: Path, start: int, old_frames: int, new_samples: np.ndarray) -> bool:
+    """Replace ``old_frames`` frames at ``start`` with ``new_samples``, in place.
+
+    Only the bytes from the scene onwards are touched: the tail is shifted
+    when the length changes and the RIFF/data sizes are patched. Returns False
+    if the file's layout does not allow an in-place splice.
+    """
+    layout = _wav_layout(path)
+    if layout is None:
+        return False
+    data_offset, data_bytes = layout
+    total = data_bytes // 2
+    if start + old_frames > total:
+        return False
+
+    pcm = np.clip(np.round(new_samples * 32767.0), -32768, 32767).astype("<i2")
+    new_frames = len(pcm)
+    tail_src = start + old_frames
+    tail_dst = start + new_frames
+    tail_frames = total - tail_src
+    new_total = total - old_frames + new_frames
+
+    if new_frames > old_frames:
+        with open(path, "r+b") as f:
+            f.truncate(data_offset + new_total * 2)
+    _shift_tail(path, data_offset, tail_src, tail_dst, tail_frames)
+    if new_frames:
+        mm = np.memmap(path, dtype="<i2", mode="r+", offset=data_offset + start * 2, shape=(new_frames,))
+        mm[:] = pcm
+        mm.flush()
+        del mm
+    with open(path, "r+b") as f:
+        if new_frames < old_frames:
+            f.truncate(data_offset + new_total * 2)
+        f.seek(4)
+        f.write(struct.pack("<I", data_offset + new_total * 2 - 8))
+        f.seek(data_offset - 4)
+        f.write(struct.pack("<I", new_total * 2))
+    return True
+
+
+def regenerate_scene(script: Script, tts_result: TTSResult, scene_id: str, voice_id: str, job_dir: Path,
+                     cancel: Optional[threading.Event] = None) -> TTSResult:
+    """Re-voice one scene and splice it into the existing voiceover.
+
+    One TTS call; ``voiceover.wav`` is patched from the scene onwards and the
+    timings of the following scenes are shifted. Falls back to re-assembling
+    the file from the segment cache (no further TTS calls) when the voiceover
+    predates sample-exact timings or has an unexpected layout.
+    """
+    scene = next((s for s in script.scenes if s.scene_id == scene_id), None)
+    if scene is None:
+        raise KeyError(f"Unknown scene {scene_id}")
+    raise_if_cancelled(cancel)
+
+    samples = synthesize_scene(_client(), scene, voice_id, job_dir, use_cache=False)
+    raise_if_cancelled(cancel)
+
+    audio_path = Path(tts_result.audio_path)
+    timings = [dict(t) for t in tts_result.scenes]
+    index = next((i for i, t in enumerate(timings) if t["scene_id"] == scene_id), None)
+    exact = index is not None and all("start_sample" in t for t in timings)
+
+    with _segment_lock(audio_path):
+        if exact and audio_path.exists():
+            old = timings[index]
+            if _splice(audio_path, old["start_sample"], old["num_samples"], samples):
+                delta = len(samples) - old["num_samples"]
+                timings[index] = _timing(scene_id, old["start_sample"], len(samples))
+                for t in timings[index + 1:]:
+                    t.update(_timing(t["scene_id"], t["start_sample"] + delta, t["num_samples"]))
+                write_peaks(audio_path)
+                total = sf.info(str(audio_path)).frames
+                print(f"[tts] Spliced {scene_id} into {audio_path} ({delta / SAMPLE_RATE:+.2f}s)")
+                return TTSResult(
+                    audio_path=str(audio_path),
+                    total_duration_seconds=round(total / SAMPLE_RATE, 2),
+                    scenes=timings,
+                )
+
+    print(f"[tts] Cannot splice {scene_id} in place — re-assembling from cached segments")
+    return generate_tts(script, voice_id, job_dir, cancel=cancel)
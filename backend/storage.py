@@ -0,0 +1,156 @@
+"""Where deliverables are published: local disk or an S3-compatible bucket.
+
+Exporters write into a staging directory (``OUTPUT_DIR/<job_id>``) and hand
+each finished file to ``storage.put``. With ``STORAGE_BACKEND=local`` the
+staging directory *is* the store; with ``s3`` files are uploaded (large ones
+in parallel multipart chunks) under ``<S3_PREFIX><job_id>/<name>``, the staged
+copy is dropped, and downloads redirect to presigned URLs. ``S3_ENDPOINT_URL``
+points the client at MinIO or another S3-compatible server; credentials come
+from the usual AWS environment variables.
+"""
+
+import mimetypes
+import shutil
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from config import config
+
+_CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".m4s": "video/iso.segment",
+    ".opus": "audio/ogg",
+    ".srt": "text/plain",
+}
+
+
+def content_type(name: str) -> str:
+    suffix = Path(name).suffix.lower()
+    return _CONTENT_TYPES.get(suffix) or mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+class LocalStorage:
+    is_local = True
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, job_id: str, name: str) -> Path:
+        return self.root / job_id / name
+
+    def put(self, job_id: str, name: str, src: Path, move: bool = False):
+        dest = self._path(job_id, name)
+        if Path(src).resolve() == dest.resolve():
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            Path(src).replace(dest)
+        else:
+            shutil.copy2(src, dest)
+
+    def stat(self, job_id: str, name: str) -> Optional[Tuple[int, float]]:
+        """(size, mtime), or None if there is no such file."""
+        path = self._path(job_id, name)
+        if not path.is_file():
+            return None
+        st = path.stat()
+        return st.st_size, st.st_mtime
+
+    def open(self, job_id: str, name: str) -> BinaryIO:
+        return open(self._path(job_id, name), "rb")
+
+    def local_path(self, job_id: str, name: str) -> Optional[Path]:
+        path = self._path(job_id, name)
+        return path if path.is_file() else None
+
+    def presigned_url(self, job_id: str, name: str, filename: Optional[str] = None) -> Optional[str]:
+        return None
+
+    def delete_job(self, job_id: str) -> int:
+        """Delete every file of the job. Returns the bytes freed."""
+        job_dir = self.root / job_id
+        if not job_dir.exists():
+            return 0
+        size = sum(p.stat().st_size for p in job_dir.rglob("*") if p.is_file())
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return size
+
+
+class S3Storage:
+    is_local = False
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+        chunk = config.S3_MULTIPART_CHUNK_MB * 1024 * 1024
+        self.transfer = TransferConfig(
+            multipart_threshold=chunk,
+            multipart_chunksize=chunk,
+            max_concurrency=config.S3_UPLOAD_CONCURRENCY,
+            use_threads=True,
+        )
+
+    def _key(self, job_id: str, name: str) -> str:
+        return f"{self.prefix}{job_id}/{name}"
+
+    def put(self, job_id: str, name: str, src: Path, move: bool = False):
+        """Upload ``src``; files above one chunk go up as a parallel multipart upload."""
+        self.client.upload_file(
+            str(src), self.bucket, self._key(job_id, name),
+            ExtraArgs={"ContentType": content_type(name)}, Config=self.transfer,
+        )
+        if move:
+            Path(src).unlink(missing_ok=True)
+
+    def stat(self, job_id: str, name: str) -> Optional[Tuple[int, float]]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(job_id, name))
+        except ClientError:
+            return None
+        return head["ContentLength"], head["LastModified"].timestamp()
+
+    def open(self, job_id: str, name: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(job_id, name))["Body"]
+
+    def local_path(self, job_id: str, name: str) -> Optional[Path]:
+        return None
+
+    def presigned_url(self, job_id: str, name: str, filename: Optional[str] = None) -> Optional[str]:
+        """A time-limited GET URL, or None if the object does not exist."""
+        if self.stat(job_id, name) is None:
+            return None
+        params = {"Bucket": self.bucket, "Key": self._key(job_id, name)}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=config.S3_PRESIGN_EXPIRES_S)
+
+    def delete_job(self, job_id: str) -> int:
+        freed = 0
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(job_id, "")):
+            objects = page.get("Contents", [])
+            if not objects:
+                continue
+            freed += sum(o["Size"] for o in objects)
+            self.client.delete_objects(
+                Bucket=self.bucket, Delete={"Objects": [{"Key": o["Key"]} for o in objects], "Quiet": True})
+        return freed
+
+
+def _from_config():
+    if config.STORAGE_BACKEND == "s3":
+        if not config.S3_BUCKET:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        return S3Storage(config.S3_BUCKET, config.S3_PREFIX, config.S3_ENDPOINT_URL, config.S3_REGION)
+    return LocalStorage(config.OUTPUT_DIR)
+
+
+storage = _from_config()
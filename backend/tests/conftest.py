@@ -0,0 +1,57 @@
+"""Shared test setup.
+
+Backend modules are imported the way ``main.py`` imports them (from
+``backend/``), with job files, outputs and the Claude cache under a throwaway
+directory. Claude is never called: tests hand ``FakeClaude`` to the code under
+test.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_TMP = Path(tempfile.mkdtemp(prefix="autovideo-tests-"))
+os.environ["TEMP_DIR"] = str(_TMP / "temp")
+os.environ["OUTPUT_DIR"] = str(_TMP / "outputs")
+os.environ["LLM_CACHE_ENABLED"] = "0"
+os.environ["RESUME_ON_STARTUP"] = "0"
+os.environ["STORAGE_BACKEND"] = "local"
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+class FakeClaude:
+    """Stands in for an ``anthropic.Anthropic`` client.
+
+    Each ``messages.create`` call pops the next reply: a text, or a
+    ``(text, stop_reason)`` pair. Calls and ``with_options`` options are recorded.
+    """
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+        self.options = []
+        self.messages = self
+
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        reply = self.replies.pop(0)
+        text, stop_reason = reply if isinstance(reply, tuple) else (reply, "end_turn")
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=text)],
+            stop_reason=stop_reason,
+            usage=SimpleNamespace(input_tokens=0, output_tokens=0),
+        )
+
+
+@pytest.fixture
+def fake_claude():
+    return FakeClaude
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from job_store import store
+from models import EditBlueprint, EditResult, GenerateRequest, TTSResult
+from pipeline import admission, orchestrator
+
+BLUEPRINT = EditBlueprint(total_duration=10, video_format="16:9", resolution=(1920, 1080), fps=30, scenes=[])
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    # Room for exactly one render at a time
+    controller = admission.AdmissionController(ram_budget_mb=1e9, cpu_budget=1)
+    monkeypatch.setattr(admission, "controller", controller)
+    return controller
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    rendered = []
+
+    def assemble_video(blueprint, audio_path, job_dir, *args, **kwargs):
+        rendered.append(job_dir.name)
+        return EditResult(video_path=str(job_dir / "final.mp4"), duration_seconds=10)
+
+    monkeypatch.setattr(orchestrator, "assemble_video", assemble_video)
+    return rendered
+
+
+def _inputs():
+    job_id = store.create_job({"title": "test"}).job_id
+    return job_id, {
+        "req": GenerateRequest(title="Petra", prompt="A documentary about Petra"),
+        "tts": TTSResult(audio_path="voiceover.wav", total_duration_seconds=10, scenes=[]),
+        "blueprint": BLUEPRINT,
+    }
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_cancelled_queued_render_releases_nothing_and_never_renders(controller, renders):
+    holder = "other-job"
+    controller.acquire(holder, admission.RenderEstimate(ram_mb=100, cpus=1))
+    job_id, d = _inputs()
+
+    async def main():
+        task = asyncio.ensure_future(orchestrator._assemble(job_id, d))
+        await asyncio.get_event_loop().run_in_executor(None, _wait_for, lambda: controller.status()["queued"])
+        task.cancel()  # e.g. a sibling node failed
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    _wait_for(lambda: not controller.status()["queued"])
+    controller.release(holder)
+
+    status = controller.status()
+    assert status["running"] == {} and status["queued"] == []
+    assert renders == []
+
+
+def test_render_cancelled_while_running_still_releases_its_slot(controller, monkeypatch):
+    started, finish = threading.Event(), threading.Event()
+
+    def slow_render(blueprint, audio_path, job_dir, *args, **kwargs):
+        started.set()
+        finish.wait(5)
+        return EditResult(video_path=str(job_dir / "final.mp4"), duration_seconds=10)
+
+    monkeypatch.setattr(orchestrator, "assemble_video", slow_render)
+    job_id, d = _inputs()
+
+    async def main():
+        task = asyncio.ensure_future(orchestrator._assemble(job_id, d))
+        await asyncio.get_event_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert job_id in controller.status()["running"]  # the render itself cannot be interrupted
+        finish.set()
+
+    asyncio.run(main())
+    _wait_for(lambda: not controller.status()["running"])
+
+
+def test_queued_render_runs_once_admitted(controller, renders):
+    holder = "other-job"
+    controller.acquire(holder, admission.RenderEstimate(ram_mb=100, cpus=1))
+    job_id, d = _inputs()
+
+    async def main():
+        task = asyncio.ensure_future(orchestrator._assemble(job_id, d))
+        await asyncio.get_event_loop().run_in_executor(None, _wait_for, lambda: controller.status()["queued"])
+        controller.release(holder)
+        return await task
+
+    assert asyncio.run(main())["edit"].duration_seconds == 10
+    assert renders == [job_id]
+    assert controller.status()["running"] == {}
+    assert store.get(job_id).step_message[5] == "Assembling video with MoviePy…"
@@ -0,0 +1,68 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from config import config
+
+REQUEST = {"title": "Petra", "prompt": "A documentary about Petra"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config, "ANTHROPIC_API_KEY", "test")
+    monkeypatch.setattr(config, "PEXELS_API_KEY", "test")
+    started = []
+
+    async def run_pipeline_phase1(job_id, req):
+        started.append(job_id)
+
+    monkeypatch.setattr(main, "run_pipeline_phase1", run_pipeline_phase1)
+    client = TestClient(main.app)
+    client.started = started
+    return client
+
+
+def test_repeated_idempotency_key_returns_the_same_job(client):
+    headers = {"Idempotency-Key": "form-submit-1"}
+    first = client.post("/api/generate", json=REQUEST, headers=headers).json()
+    retry = client.post("/api/generate", json=REQUEST, headers=headers).json()
+
+    assert retry == {"job_id": first["job_id"], "deduplicated": True}
+    assert first["deduplicated"] is False
+    assert client.started == [first["job_id"]]
+
+    other = client.post("/api/generate", json=REQUEST, headers={"Idempotency-Key": "form-submit-2"}).json()
+    assert other["job_id"] != first["job_id"]
+
+
+def test_idempotency_key_reused_for_another_request_is_rejected(client):
+    headers = {"Idempotency-Key": "form-submit-3"}
+    client.post("/api/generate", json=REQUEST, headers=headers)
+    r = client.post("/api/generate", json={**REQUEST, "title": "Jerash"}, headers=headers)
+    assert r.status_code == 422
+
+
+@pytest.mark.parametrize("filename, media_type", [
+    ("index.m3u8", "application/vnd.apple.mpegurl"),
+    ("init.mp4", "video/mp4"),
+    ("seg_00000.m4s", "video/iso.segment"),
+])
+def test_stream_route_serves_hls_with_its_content_types(client, tmp_path, monkeypatch, filename, media_type):
+    monkeypatch.setattr(main.storage, "root", tmp_path)
+    (tmp_path / "job" / "hls").mkdir(parents=True)
+    (tmp_path / "job" / "hls" / filename).write_bytes(b"hls")
+
+    r = client.get(f"/api/stream/job/{filename}")
+
+    assert r.status_code == 200
+    assert r.headers["content-type"] == media_type
+    assert r.content == b"hls"
+
+
+def test_stream_route_serves_nothing_but_hls(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(main.storage, "root", tmp_path)
+    (tmp_path / "job").mkdir()
+    (tmp_path / "job" / "script.txt").write_text("narration")
+    (tmp_path / "job" / "index.m3u8").write_text("#EXTM3U")
+    assert client.get("/api/stream/job/script.txt").status_code == 404
+    assert client.get("/api/stream/job/..%2Findex.m3u8").status_code == 404  # only hls/ is served
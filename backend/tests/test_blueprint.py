@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from models import FootageResult, Scene, Script, TTSResult
+from pipeline import blueprint
+
+SCRIPT = Script(
+    full_text="Hook.\n\nEnd.",
+    scenes=[
+        Scene(scene_id="scene_1", name="Hook", narration="Hook.", word_count=1,
+              estimated_duration_seconds=10, visual_keywords=["Petra"]),
+        Scene(scene_id="scene_2", name="Conclusion", narration="End.", word_count=1,
+              estimated_duration_seconds=10, visual_keywords=["desert"]),
+    ],
+    total_word_count=2,
+    estimated_duration_minutes=0.3,
+)
+TTS = TTSResult(audio_path="voice.mp3", total_duration_seconds=20, scenes=[
+    {"scene_id": "scene_1", "start_time": 0, "end_time": 10, "duration": 10},
+    {"scene_id": "scene_2", "start_time": 10, "end_time": 20, "duration": 10},
+])
+FOOTAGE = FootageResult(scenes=[])
+CLAUDE_PLAN = {"scenes": [
+    {"scene_id": "scene_1", "montage_type": "map", "pace": "slow", "transition": "dissolve"},
+    {"scene_id": "scene_2", "montage_type": "text-overlay", "pace": "fast", "transition": "cut"},
+]}
+
+
+def _build(planner):
+    return blueprint.build_blueprint("Petra", SCRIPT, TTS, FOOTAGE, "16:9", "educational",
+                                     "documentary", planner=planner)
+
+
+@pytest.mark.parametrize("planner", ["auto", "llm"])
+def test_claude_plan_is_applied(monkeypatch, fake_claude, planner):
+    fake = fake_claude(json.dumps(CLAUDE_PLAN))
+    monkeypatch.setattr(blueprint, "client", fake)
+    monkeypatch.setattr(blueprint.config, "BLUEPRINT_LLM_BUDGET_S", 2.5)
+    bp = _build(planner)
+
+    assert len(fake.calls) == 1
+    assert "max_retries" not in fake.calls[0] and "timeout" not in fake.calls[0]
+    assert fake.options == ([{"timeout": 2.5, "max_retries": 0}] if planner == "auto" else [])
+    assert [(s.montage_type, s.pace, s.transition) for s in bp.scenes] == [
+        ("map", "slow", "dissolve"), ("text-overlay", "fast", "cut")]
+
+
+def test_claude_failure_falls_back_to_local_plan(monkeypatch, fake_claude, capsys):
+    monkeypatch.setattr(blueprint, "client", fake_claude("not json"))
+    monkeypatch.setattr(blueprint.config, "BLUEPRINT_LLM_BUDGET_S", 2.5)
+    bp = _build("auto")
+
+    local = blueprint.plan_scenes_locally(SCRIPT, {s["scene_id"]: s for s in TTS.scenes}, {},
+                                          "educational", "documentary")
+    assert [s.montage_type for s in bp.scenes] == [local[s]["montage_type"] for s in ("scene_1", "scene_2")]
+    assert "using local plan" in capsys.readouterr().out
+
+
+def test_local_planner_never_calls_claude(monkeypatch, fake_claude):
+    fake = fake_claude()
+    monkeypatch.setattr(blueprint, "client", fake)
+    _build("local")
+    assert fake.calls == []
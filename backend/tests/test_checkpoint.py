@@ -0,0 +1,49 @@
+from pydantic import BaseModel
+
+from models import AudioDeliverable, AudioExport, EditResult
+from pipeline import checkpoint
+
+
+class Text(BaseModel):
+    value: str
+
+
+def test_inputs_hash_is_stable_and_content_based():
+    a = checkpoint.inputs_hash({"script": Text(value="x"), "voice": "v1"})
+    assert a == checkpoint.inputs_hash({"voice": "v1", "script": Text(value="x")})
+    assert a != checkpoint.inputs_hash({"script": Text(value="y"), "voice": "v1"})
+    assert a != checkpoint.inputs_hash({"script": Text(value="x"), "voice": "v2"})
+
+
+def test_load_rejects_a_different_inputs_hash(tmp_path):
+    checkpoint.save(tmp_path, "node", Text(value="x"), "hash-1")
+    assert checkpoint.load(tmp_path, "node", Text, "hash-1") == Text(value="x")
+    assert checkpoint.load(tmp_path, "node", Text, "hash-2") is None
+
+
+def test_load_rejects_missing_or_unreadable_checkpoints(tmp_path):
+    assert checkpoint.load(tmp_path, "node", Text, "hash") is None
+    (tmp_path / "node.json").write_text("{not json", encoding="utf-8")
+    assert checkpoint.load(tmp_path, "node", Text, "hash") is None
+
+
+def test_load_rejects_artifacts_whose_files_are_gone(tmp_path):
+    video = tmp_path / "final.mp4"
+    video.write_bytes(b"mp4")
+    result = EditResult(video_path=str(video), duration_seconds=1.0)
+    checkpoint.save(tmp_path, "assemble", result, "hash")
+    assert checkpoint.load(tmp_path, "assemble", EditResult, "hash") is not None
+    video.unlink()
+    assert checkpoint.load(tmp_path, "assemble", EditResult, "hash") is None
+
+
+def test_audio_export_is_valid_while_its_encodes_are_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint.storage, "root", tmp_path)
+    mp3 = tmp_path / "job-1" / "voiceover.mp3"
+    mp3.parent.mkdir()
+    mp3.write_bytes(b"mp3")
+    export = AudioExport(files=[AudioDeliverable(format="mp3", file=str(mp3), bitrate_kbps=128, size_bytes=3)])
+    checkpoint.save(tmp_path / "checkpoints", "export_audio", export, "hash")
+    assert checkpoint.load(tmp_path / "checkpoints", "export_audio", AudioExport, "hash") == export
+    mp3.unlink()
+    assert checkpoint.load(tmp_path / "checkpoints", "export_audio", AudioExport, "hash") is None
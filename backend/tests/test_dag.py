@@ -0,0 +1,132 @@
+import asyncio
+import threading
+
+from pydantic import BaseModel
+
+from job_store import store
+from models import JobStatus, StepStatus
+from pipeline import checkpoint
+from pipeline.cancellation import JobCancelled
+from pipeline.dag import Barrier, StepNode, run_graph
+
+
+class Text(BaseModel):
+    value: str
+
+
+def _node(name, inputs, outputs, fn, steps=(), **kwargs):
+    async def run(data):
+        return fn(data)
+    return StepNode(name, run, inputs=inputs, outputs=outputs, steps=steps, **kwargs)
+
+
+def _job():
+    return store.create_job({"title": "test"}).job_id
+
+
+def test_runs_nodes_in_dependency_order():
+    job_id = _job()
+    data = {"prompt": "p"}
+    nodes = [
+        _node("b", ("a",), ("b",), lambda d: {"b": d["a"] + "b"}, steps=(2,)),
+        _node("a", ("prompt",), ("a",), lambda d: {"a": d["prompt"] + "a"}, steps=(1,)),
+    ]
+    assert asyncio.run(run_graph(job_id, nodes, data)) is True
+    assert data["b"] == "pab"
+    job = store.get(job_id)
+    assert job.get_step_status(1) == job.get_step_status(2) == StepStatus.COMPLETED
+
+
+def test_closed_barrier_stops_the_run():
+    job_id = _job()
+    data = {"script": "s"}
+    nodes = [
+        Barrier("script_approved", ("script",)),
+        _node("tts", ("script_approved",), ("tts",), lambda d: {"tts": "voice"}),
+    ]
+    assert asyncio.run(run_graph(job_id, nodes, data)) is True
+    assert "tts" not in data
+    assert asyncio.run(run_graph(job_id, nodes, data, open_gates={"script_approved"})) is True
+    assert data["tts"] == "voice"
+
+
+def test_failure_fails_the_job_and_cancels_siblings():
+    job_id = _job()
+    sibling_cancelled = threading.Event()
+
+    async def slow(data):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            sibling_cancelled.set()
+            raise
+
+    def broken(data):
+        raise ValueError("no footage")
+
+    nodes = [
+        StepNode("slow", slow, inputs=("x",), outputs=("slow",), steps=(3,)),
+        _node("broken", ("x",), ("broken",), broken, steps=(4,)),
+    ]
+
+    async def main():
+        ok = await run_graph(job_id, nodes, {"x": 1})
+        await asyncio.sleep(0)  # let the cancelled sibling unwind
+        return ok
+
+    assert asyncio.run(main()) is False
+    job = store.get(job_id)
+    assert job.status == JobStatus.FAILED
+    assert job.error == "ValueError: no footage"
+    assert job.get_step_status(4) == StepStatus.FAILED
+    assert sibling_cancelled.is_set()
+
+
+def test_job_cancelled_in_a_node_does_not_fail_the_job():
+    job_id = _job()
+
+    def cancelled(data):
+        raise JobCancelled()
+
+    nodes = [_node("a", ("x",), ("a",), cancelled, steps=(1,))]
+    assert asyncio.run(run_graph(job_id, nodes, {"x": 1})) is False
+    assert store.get(job_id).status != JobStatus.FAILED
+
+
+def test_no_node_starts_after_cancel():
+    job_id = _job()
+    cancel = threading.Event()
+    ran = []
+
+    def first(data):
+        cancel.set()
+        return {"a": 1}
+
+    nodes = [
+        _node("a", ("x",), ("a",), first),
+        _node("b", ("a",), ("b",), lambda d: ran.append("b") or {"b": 1}),
+    ]
+    assert asyncio.run(run_graph(job_id, nodes, {"x": 1}, cancel=cancel)) is False
+    assert ran == []
+
+
+def test_checkpoint_is_reused_until_inputs_change(tmp_path):
+    job_id = _job()
+    calls = []
+
+    def upper(data):
+        calls.append(data["script"])
+        return {"text": Text(value=data["script"].upper())}
+
+    nodes = [_node("upper", ("script",), ("text",), upper, checkpoint=Text)]
+
+    def run(script):
+        data = {"script": script}
+        assert asyncio.run(run_graph(job_id, nodes, data, checkpoint_dir=tmp_path)) is True
+        return data["text"].value
+
+    assert run("one") == "ONE"
+    assert run("one") == "ONE"      # restored, not recomputed
+    assert run("two") == "TWO"      # inputs changed: the checkpoint is stale
+    assert calls == ["one", "two"]
+    assert checkpoint.load_unchecked(tmp_path, "upper", Text)[1] == checkpoint.inputs_hash({"script": "two"})
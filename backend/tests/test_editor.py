@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from moviepy.video.io import ffmpeg_writer
+
+from models import BlueprintScene
+from pipeline import editor
+
+written = []
+
+
+class _Writer:
+    def __init__(self, filename, size, fps, **kwargs):
+        self.filename = filename
+        self.frames = 0
+        written.append(self)
+
+    def write_frame(self, frame):
+        self.frames += 1
+
+    def close(self):
+        open(self.filename, "wb").close()
+
+
+@pytest.mark.parametrize("duration,frames", [(2.0, 60), (2.01, 61), (3.3, 99)])
+def test_every_target_gets_as_many_frames_as_write_videofile(tmp_path, monkeypatch, duration, frames):
+    written.clear()
+    monkeypatch.setattr(ffmpeg_writer, "FFMPEG_VideoWriter", _Writer)
+    sizes = [(64, 36), (36, 64)]
+    monkeypatch.setattr(editor, "_scene_frames", lambda scene, sizes: (
+        lambda t: [lambda w=w, h=h: np.zeros((h, w, 3)) for w, h in sizes], []))
+    scene = BlueprintScene(scene_id="scene_1", scene_name="Hook", start_time=0, end_time=duration,
+                           duration=duration, narration_excerpt="Hook.")
+
+    editor._render_segments(scene, [(size, tmp_path / f"{size[0]}x{size[1]}.mp4") for size in sizes], 30, None, None)
+
+    assert [w.frames for w in written] == [frames, frames]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["36x64.mp4", "64x36.mp4"]
@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+from config import config
+from models import EditResult
+from pipeline import exporter
+from pipeline.ffmpeg import run_ffmpeg
+
+
+@pytest.fixture
+def rendered(tmp_path):
+    """A 3 s render with a keyframe every second."""
+    video = tmp_path / "final.mp4"
+    run_ffmpeg(["-f", "lavfi", "-i", "testsrc=size=64x36:rate=10:duration=3",
+                "-c:v", "libx264", "-g", "10", "-pix_fmt", "yuv420p", str(video)])
+    return EditResult(video_path=str(video), duration_seconds=3.0)
+
+
+def test_stream_is_packaged_as_a_vod_fmp4_playlist(rendered, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "HLS_SEGMENT_S", 1)
+    monkeypatch.setattr(exporter.storage, "root", tmp_path / "outputs")
+
+    playlist = exporter.export_stream("job", rendered, tmp_path / "outputs")
+
+    text = open(playlist, encoding="utf-8").read()
+    lines = text.splitlines()
+    assert lines[0] == "#EXTM3U"
+    assert "#EXT-X-PLAYLIST-TYPE:VOD" in lines
+    assert '#EXT-X-MAP:URI="init.mp4"' in lines
+    assert lines[-1] == "#EXT-X-ENDLIST"
+    # Segment URIs are relative, so players fetch them back through the stream route
+    segments = [line for line in lines if line and not line.startswith("#")]
+    assert segments == [f"seg_{i:05d}.m4s" for i in range(3)]
+    durations = [float(d) for d in re.findall(r"#EXTINF:([\d.]+),", text)]
+    assert sum(durations) == pytest.approx(3.0, abs=0.1)
+
+    hls_dir = tmp_path / "outputs" / "job" / "hls"
+    assert sorted(p.name for p in hls_dir.iterdir()) == ["index.m3u8", "init.mp4", *segments]
+    assert not (tmp_path / "outputs" / "job" / "hls.part").exists()
@@ -0,0 +1,59 @@
+import threading
+
+from models import GenerateRequest, Scene
+from pipeline import footage
+from pipeline.keyed_locks import KeyedLocks
+
+SCENE = Scene(scene_id="scene_1", name="Hook", narration="Hook.", word_count=1,
+              estimated_duration_seconds=1, visual_keywords=["Petra", "desert"])
+
+
+def test_prefetch_is_opt_in():
+    assert GenerateRequest(title="Petra", prompt="A documentary about Petra").prefetch_footage is False
+
+
+def test_stopped_scene_skips_photo_search(monkeypatch, tmp_path):
+    stop = threading.Event()
+    searched = []
+
+    def no_videos(keyword, per_page):
+        searched.append(("video", keyword))
+        stop.set()  # cancelled while the video search was in flight
+        return []
+
+    monkeypatch.setattr(footage, "_search_pexels_videos", no_videos)
+    monkeypatch.setattr(footage, "_search_pexels_photos", lambda kw, per_page: searched.append(("photo", kw)) or [])
+    assert footage._source_scene(SCENE, tmp_path, stop) == (None, [])
+    assert searched == [("video", "Petra")]
+
+
+def test_keyed_locks_are_shared_then_dropped():
+    locks = KeyedLocks()
+    order = []
+    entered, release = threading.Event(), threading.Event()
+
+    def worker(name):
+        with locks.hold("a"):
+            order.append(name)
+            entered.set()
+            release.wait()
+
+    first = threading.Thread(target=worker, args=("first",))
+    first.start()
+    entered.wait()
+    second = threading.Thread(target=worker, args=("second",))
+    second.start()
+    assert len(locks) == 1 and order == ["first"]  # second waits on the same lock
+    release.set()
+    first.join()
+    second.join()
+    assert order == ["first", "second"]
+    assert len(locks) == 0
+
+
+def test_prefetch_leaves_no_scene_locks(monkeypatch, tmp_path):
+    monkeypatch.setattr(footage, "_search_pexels_videos", lambda kw, per_page: [])
+    monkeypatch.setattr(footage, "_search_pexels_photos", lambda kw, per_page: [])
+    script = footage.Script(full_text="Hook.", scenes=[SCENE], total_word_count=1, estimated_duration_minutes=0.1)
+    footage.prefetch_footage(script, tmp_path)
+    assert len(footage._scene_locks) == 0
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from config import config
+from job_store import store
+from models import JobStatus
+from pipeline import janitor
+
+
+@pytest.fixture(autouse=True)
+def policy(monkeypatch):
+    monkeypatch.setattr(config, "JOB_RETENTION_HOURS", 24)
+    monkeypatch.setattr(config, "CLEAN_TEMP_AFTER_EXPORT", True)
+    monkeypatch.setattr(config, "DISK_QUOTA_MB", 0)
+
+
+def _job(status, age_hours=0.0, files=()):
+    job = store.create_job({"title": "test"})
+    job.status = status
+    if status in janitor._FINISHED:
+        job.completed_at = time.time() - age_hours * 3600
+    job_dir = config.TEMP_DIR / job.job_id
+    for name, size in files:
+        (job_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        (job_dir / name).write_bytes(b"x" * size)
+    store.flush()
+    return job.job_id
+
+
+def test_expired_finished_jobs_are_deleted():
+    old_done = _job(JobStatus.COMPLETED, age_hours=48)
+    old_failed = _job(JobStatus.FAILED, age_hours=30)
+    fresh = _job(JobStatus.COMPLETED, age_hours=1)
+    running = _job(JobStatus.RUNNING)
+
+    report = janitor.sweep()
+
+    assert {old_done, old_failed} <= set(report["expired_jobs"])
+    assert store.get(old_done) is None and store.get(old_failed) is None
+    assert not (config.TEMP_DIR / old_done).exists()
+    assert store.get(fresh) is not None and store.get(running) is not None
+
+
+def test_recent_download_extends_retention():
+    job_id = _job(JobStatus.COMPLETED, age_hours=48)
+    janitor.touch(job_id)
+    assert job_id not in janitor.sweep()["expired_jobs"]
+    assert store.get(job_id) is not None
+
+
+WORKING_FILES = [("assembled.mp4", 1000), ("footage/scene_1.mp4", 10), ("voiceover.wav", 10)]
+
+
+def test_working_files_of_completed_jobs_are_cleaned():
+    job_id = _job(JobStatus.COMPLETED, files=WORKING_FILES)
+    janitor.sweep()
+    job_dir = config.TEMP_DIR / job_id
+    assert [p.name for p in job_dir.iterdir()] == ["job.json"]
+
+
+def test_edit_files_are_kept_for_their_own_ttl(monkeypatch):
+    monkeypatch.setattr(config, "KEEP_EDIT_FILES_HOURS", 2)
+    fresh = _job(JobStatus.COMPLETED, age_hours=1, files=WORKING_FILES)
+    stale = _job(JobStatus.COMPLETED, age_hours=3, files=WORKING_FILES)
+
+    janitor.sweep()
+
+    fresh_dir = config.TEMP_DIR / fresh
+    assert not (fresh_dir / "assembled.mp4").exists()
+    assert (fresh_dir / "footage" / "scene_1.mp4").exists()
+    assert (fresh_dir / "voiceover.wav").exists()
+    assert [p.name for p in (config.TEMP_DIR / stale).iterdir()] == ["job.json"]
+
+
+def test_quota_evicts_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(config, "CLEAN_TEMP_AFTER_EXPORT", False)
+    for job in store.all():  # start from an empty tree
+        janitor._delete_job(job.job_id)
+    oldest = _job(JobStatus.COMPLETED, age_hours=3, files=[("big.bin", 600 * 1024)])
+    newer = _job(JobStatus.COMPLETED, age_hours=2, files=[("big.bin", 600 * 1024)])
+    running = _job(JobStatus.RUNNING, files=[("big.bin", 600 * 1024)])
+    monkeypatch.setattr(config, "DISK_QUOTA_MB", 1.5)
+
+    report = janitor.sweep()
+
+    assert report["evicted_jobs"] == [oldest]
+    assert store.get(newer) is not None and store.get(running) is not None
+
+
+def _idle(job_id, hours):
+    store.get(job_id).updated_at = time.time() - hours * 3600
+
+
+def test_idle_unfinished_jobs_are_cancelled_and_removed(monkeypatch):
+    monkeypatch.setattr(config, "IDLE_JOB_TTL_HOURS", 12)
+    at_gate = _job(JobStatus.RUNNING, files=[("voiceover.wav", 10)])
+    store.complete_step(at_gate, 2)
+    _idle(at_gate, 13)
+    never_started = _job(JobStatus.PENDING)
+    _idle(never_started, 13)
+    recent = _job(JobStatus.RUNNING)
+    _idle(recent, 1)
+    rendering = _job(JobStatus.RUNNING)
+    store.start_step(rendering, 6)
+    _idle(rendering, 13)
+
+    report = janitor.sweep()
+
+    assert set(report["abandoned_jobs"]) >= {at_gate, never_started}
+    assert recent not in report["abandoned_jobs"] and rendering not in report["abandoned_jobs"]
+    assert store.get(at_gate) is None and not (config.TEMP_DIR / at_gate).exists()
+    assert janitor.cancellation.token_for(rendering).is_set() is False
+    assert store.get(rendering).status == JobStatus.RUNNING
+
+
+def test_any_change_resets_the_idle_clock(monkeypatch):
+    monkeypatch.setattr(config, "IDLE_JOB_TTL_HOURS", 12)
+    job_id = _job(JobStatus.RUNNING)
+    _idle(job_id, 13)
+    store.set_pipeline_data(job_id, "script", {"edited": True})
+    assert job_id not in janitor.sweep()["abandoned_jobs"]
@@ -0,0 +1,87 @@
+import json
+import time
+
+import pytest
+
+from config import config
+from job_store import JobRecord, JobStore
+from models import JobResult, JobStatus, StepStatus
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TEMP_DIR", tmp_path)
+    monkeypatch.setattr(config, "JOB_PERSIST_DELAY_S", 0.0)
+    return JobStore()
+
+
+def _snapshot(job_id):
+    return json.loads((config.TEMP_DIR / job_id / "job.json").read_text(encoding="utf-8"))
+
+
+def test_record_round_trips_without_the_api_model(store):
+    job = store.create_job({"title": "Petra"})
+    store.start_step(job.job_id, 1, "Analyzing…")
+    store.complete_step(job.job_id, 1, "Done")
+    store.start_step(job.job_id, 2)
+    store.complete_job(job.job_id, JobResult(final_video="final.mp4"))
+
+    restored = JobRecord.from_dict(json.loads(json.dumps(job.to_dict())))
+    assert restored.to_model() == job.to_model()
+
+
+def test_changes_reach_disk_in_the_background(store):
+    job_id = store.create_job({"title": "Petra"}).job_id
+    store.set_pipeline_data(job_id, "script", {"scenes": []})
+    store.start_step(job_id, 1)
+    deadline = time.monotonic() + 5
+    while not (config.TEMP_DIR / job_id / "job.json").exists():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    store.flush()
+
+    snapshot = _snapshot(job_id)
+    assert snapshot["record"]["step_status"][0] == StepStatus.RUNNING.value
+    assert snapshot["pipeline_data"] == {"script": {"scenes": []}}
+
+
+def test_restart_restores_jobs(store):
+    job_id = store.create_job({"title": "Petra"}).job_id
+    store.start_step(job_id, 3, "Voicing…")
+    store.set_pipeline_data(job_id, "script", {"scenes": []})
+    store.flush()
+
+    restarted = JobStore()
+    [job] = restarted.load_persisted()
+    assert job.to_model() == store.get(job_id).to_model()
+    assert restarted.get_pipeline_data(job_id, "script") == {"scenes": []}
+
+
+def test_restart_reads_snapshots_of_the_api_model(store):
+    job = store.create_job({"title": "Petra"})
+    store.cancel_job(job.job_id)
+    path = config.TEMP_DIR / job.job_id / "job.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"job": job.to_model().model_dump(mode="json"), "pipeline_data": {}}))
+
+    [restored] = JobStore().load_persisted()
+    assert restored.status == JobStatus.CANCELLED
+    assert restored.to_model() == job.to_model()
+
+
+def test_transitions_do_not_write_synchronously(store, monkeypatch):
+    monkeypatch.setattr(config, "JOB_PERSIST_DELAY_S", 60)
+    job_id = store.create_job({"title": "Petra"}).job_id
+    store.start_step(job_id, 1)
+    assert not (config.TEMP_DIR / job_id / "job.json").exists()
+    store.flush()
+    assert _snapshot(job_id)["record"]["current_step"] == 1
+
+
+def test_deleted_job_is_not_written_back(store, monkeypatch):
+    monkeypatch.setattr(config, "JOB_PERSIST_DELAY_S", 60)
+    job_id = store.create_job({"title": "Petra"}).job_id
+    store.start_step(job_id, 1)
+    store.delete(job_id)
+    store.flush()
+    assert not (config.TEMP_DIR / job_id / "job.json").exists()
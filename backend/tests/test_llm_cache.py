@@ -0,0 +1,84 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from config import config
+from pipeline import llm_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "LLM_CACHE_DIR", tmp_path / "llm_cache")
+    monkeypatch.setattr(config, "LLM_CACHE_TTL_HOURS", 1)
+    monkeypatch.setattr(llm_cache, "_total_bytes", None)
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def _complete(client, user_msg, **kwargs):
+    return llm_cache.complete(client, site="test", model="claude", system="system", user_msg=user_msg,
+                              max_tokens=100, **kwargs)
+
+
+def _entry(user_msg):
+    return config.LLM_CACHE_DIR / f"{llm_cache._cache_key('claude', 'system', user_msg, 100)}.json"
+
+
+def test_entries_expire_after_the_ttl(clock, fake_claude):
+    client = fake_claude("first", "second")
+    assert _complete(client, "hello") == "first"
+
+    clock.now += 3599
+    assert _complete(client, "hello") == "first"
+    assert len(client.calls) == 1
+
+    clock.now += 2
+    assert _complete(client, "hello") == "second"
+    assert len(client.calls) == 2
+    assert json.loads(_entry("hello").read_text())["text"] == "second"
+
+
+def test_least_recently_used_entries_are_evicted_past_the_size_bound(clock, fake_claude, monkeypatch):
+    text = "x" * 1000
+    monkeypatch.setattr(config, "LLM_CACHE_MAX_MB", 2500 / (1024 * 1024))
+    client = fake_claude(text, text, text)
+    _complete(client, "a")
+    _complete(client, "b")
+    os.utime(_entry("a"), (100, 100))
+    os.utime(_entry("b"), (200, 200))
+    _complete(client, "a")  # a hit makes "a" the most recently used
+    assert len(client.calls) == 2
+
+    _complete(client, "c")
+
+    assert _entry("a").exists() and _entry("c").exists()
+    assert not _entry("b").exists()
+    assert llm_cache._total_bytes <= config.LLM_CACHE_MAX_MB * 1024 * 1024
+
+
+def test_truncated_completions_raise_when_not_allowed(clock, fake_claude):
+    client = fake_claude(("cut off", "max_tokens"))
+    with pytest.raises(llm_cache.Truncated):
+        _complete(client, "hello", allow_truncated=False)
+    assert not _entry("hello").exists()
+
+
+def test_truncated_completions_are_returned_but_never_cached(clock, fake_claude):
+    client = fake_claude(("cut off", "max_tokens"), "complete")
+    assert _complete(client, "hello") == "cut off"
+    assert not _entry("hello").exists()
+    assert _complete(client, "hello") == "complete"
+    assert _complete(client, "hello") == "complete"
+    assert len(client.calls) == 2
@@ -0,0 +1,115 @@
+import io
+import zipfile
+from email.utils import formatdate
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import media
+
+BODY = bytes(range(256)) * 4  # 1024 bytes
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "clip.bin"
+    path.write_bytes(BODY)
+    app = FastAPI()
+
+    @app.get("/file")
+    def get_file(request: Request):
+        return media.file_response(request, path, "application/octet-stream")
+
+    @app.get("/virtual")
+    def get_virtual(request: Request):
+        # A computed header followed by a slice of the file
+        return media.ranged_response(request, [b"HEAD", (path, 100, 50)], '"v1"', 0.0, "application/octet-stream")
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=1000-", (1000, 1023)),
+    ("bytes=-24", (1000, 1023)),
+    ("bytes=1000-5000", (1000, 1023)),
+    ("bytes=0-0", (0, 0)),
+    ("bytes=0-1,5-9", None),   # multi-range: serve everything
+    ("items=0-9", None),
+    ("bytes=abc-", None),
+])
+def test_parse_range(header, expected):
+    assert media._parse_range(header, 1024) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=2000-3000", "bytes=10-5"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        media._parse_range(header, 1024)
+
+
+def test_whole_file(client):
+    r = client.get("/file")
+    assert r.status_code == 200
+    assert r.content == BODY
+    assert r.headers["accept-ranges"] == "bytes"
+    assert r.headers["content-length"] == "1024"
+
+
+def test_partial_content(client):
+    r = client.get("/file", headers={"Range": "bytes=10-19"})
+    assert r.status_code == 206
+    assert r.content == BODY[10:20]
+    assert r.headers["content-range"] == "bytes 10-19/1024"
+    assert r.headers["content-length"] == "10"
+
+
+def test_range_across_pieces(client):
+    r = client.get("/virtual", headers={"Range": "bytes=2-9"})
+    assert r.status_code == 206
+    assert r.content == b"AD" + BODY[100:106]
+    assert r.headers["content-range"] == "bytes 2-9/54"
+
+
+def test_unsatisfiable_range(client):
+    r = client.get("/file", headers={"Range": "bytes=5000-"})
+    assert r.status_code == 416
+    assert r.headers["content-range"] == "bytes */1024"
+
+
+def test_if_none_match(client):
+    etag = client.get("/file").headers["etag"]
+    assert client.get("/file", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/file", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/file", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since(client):
+    last_modified = client.get("/file").headers["last-modified"]
+    assert client.get("/file", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/file", headers={"If-Modified-Since": formatdate(0, usegmt=True)}).status_code == 200
+
+
+def test_if_range_mismatch_serves_whole_file(client):
+    r = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert r.status_code == 200
+    assert r.content == BODY
+
+
+def test_zip_response_round_trip():
+    files = {"final_video.mp4": BODY, "script.txt": "Narration — ünïcode".encode("utf-8"), "empty.srt": b""}
+    sources = [(name, len(data), 1_700_000_000.0, lambda data=data: io.BytesIO(data))
+               for name, data in files.items()]
+    app = FastAPI()
+    app.get("/zip")(lambda: media.zip_response(sources, "bundle.zip"))
+
+    r = TestClient(app).get("/zip")
+    assert r.status_code == 200
+    assert int(r.headers["content-length"]) == len(r.content)
+    assert r.headers["content-disposition"] == 'attachment; filename="bundle.zip"'
+    with zipfile.ZipFile(io.BytesIO(r.content)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == list(files)
+        for name, data in files.items():
+            assert archive.read(name) == data
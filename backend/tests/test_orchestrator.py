@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+
+from job_store import store
+from models import AudioDeliverable, GenerateRequest, TTSResult
+from pipeline import checkpoint, orchestrator
+from pipeline.dag import run_graph
+
+
+def test_voiceover_is_not_re_encoded_when_only_visuals_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint.storage, "root", tmp_path)
+    job_id = store.create_job({"title": "Petra"}).job_id
+    encodes = []
+
+    def export_audio(job_id, tts_result, output_base, cancel=None):
+        encodes.append(tts_result.audio_path)
+        mp3 = tmp_path / job_id / "voiceover.mp3"
+        mp3.parent.mkdir(exist_ok=True)
+        mp3.write_bytes(b"mp3")
+        return [AudioDeliverable(format="mp3", file=str(mp3), bitrate_kbps=128, size_bytes=3)]
+
+    monkeypatch.setattr(orchestrator, "export_audio", export_audio)
+    req = GenerateRequest(title="Petra", prompt="A documentary about Petra")
+    [node] = [n for n in orchestrator._pipeline_graph(job_id, req) if n.name == "export_audio"]
+    tts = TTSResult(audio_path="voiceover.wav", total_duration_seconds=10, scenes=[])
+
+    def run(**visuals):
+        data = {"req": req, "tts": tts, "voice_approved": True, **visuals}
+        assert asyncio.run(run_graph(job_id, [node], data, checkpoint_dir=tmp_path / "checkpoints")) is True
+        return data["audio"]
+
+    first = run(blueprint="cut 1", footage="clips 1")
+    again = run(blueprint="cut 2", footage="clips 2")
+    assert encodes == ["voiceover.wav"]
+    assert again == first
+
+    run(blueprint="cut 2", tts=tts.model_copy(update={"audio_path": "revoiced.wav"}))
+    assert encodes == ["voiceover.wav", "revoiced.wav"]
+
+
+def test_variant_shares_the_source_render_re_timed_and_translated():
+    from config import config
+    from models import (AssetItem, BlueprintScene, EditBlueprint, FootageResult, PromptAnalysis,
+                        SceneAssets, Script)
+
+    source_id = store.create_job({"title": "Petra"}).job_id
+    job_id = store.create_job({"title": "Petra", "language": "fr"}).job_id
+    source_dir = config.TEMP_DIR / source_id
+    (source_dir / "footage").mkdir(parents=True)
+    (source_dir / "segments").mkdir()
+    clips = {}
+    for sid in ("scene_1", "scene_2"):
+        clip = source_dir / "footage" / f"{sid}.mp4"
+        clip.write_bytes(b"clip")
+        clips[sid] = AssetItem(asset_type="video", url=f"https://example.com/{sid}", local_path=str(clip))
+        (source_dir / "segments" / f"{sid}_abc.mp4").write_bytes(b"segment")
+    (source_dir / "segments" / "scene_2_def.part.mp4").write_bytes(b"half")
+
+    footage = FootageResult(scenes=[
+        SceneAssets(scene_id=sid, scene_name=name, duration=d, primary_asset=clips[sid])
+        for sid, name, d in (("scene_1", "Hook", 4.0), ("scene_2", "Context", 6.0))
+    ])
+    blueprint = EditBlueprint(total_duration=10.0, video_format="16:9", resolution=(1920, 1080), fps=30, scenes=[
+        BlueprintScene(scene_id="scene_1", scene_name="Hook", start_time=0.0, end_time=4.0, duration=4.0,
+                       narration_excerpt="Hook text.", primary_asset=clips["scene_1"]),
+        BlueprintScene(scene_id="scene_2", scene_name="Context", start_time=4.0, end_time=10.0, duration=6.0,
+                       narration_excerpt="Context text.", primary_asset=clips["scene_2"]),
+    ])
+    checkpoint.save(source_dir / "checkpoints", "footage", footage, "source")
+    checkpoint.save(source_dir / "checkpoints", "blueprint", blueprint, "source")
+
+    script = Script(full_text="Accroche.\n\nContexte.", total_word_count=2, estimated_duration_minutes=1, scenes=[
+        {"scene_id": "scene_1", "name": "Accroche", "narration": "Accroche.", "word_count": 1,
+         "estimated_duration_seconds": 4, "visual_keywords": ["Petra"]},
+        {"scene_id": "scene_2", "name": "Contexte", "narration": "Contexte.", "word_count": 1,
+         "estimated_duration_seconds": 7, "visual_keywords": ["Jordanie"]},
+    ])
+    tts = TTSResult(audio_path="voiceover.wav", total_duration_seconds=11.5, scenes=[
+        {"scene_id": "scene_1", "start_time": 0.0, "end_time": 4.0, "duration": 4.0},
+        {"scene_id": "scene_2", "start_time": 4.0, "end_time": 11.5, "duration": 7.5},
+    ])
+    analysis = PromptAnalysis(topic="Petra", talking_points=[], tone="neutral", style="documentary",
+                              estimated_duration_minutes=1, visual_elements=[], language="fr")
+    data = {"req": GenerateRequest(title="Petra", prompt="A documentary about Petra", language="fr"),
+            "analysis": analysis, "script": script, "tts": tts}
+
+    assert orchestrator._share_source_render(job_id, source_id, data) == 1
+
+    job_dir = config.TEMP_DIR / job_id
+    shared, _ = checkpoint.load_unchecked(job_dir / "checkpoints", "blueprint", EditBlueprint)
+    assert [(s.scene_name, s.narration_excerpt, s.start_time, s.end_time, s.duration) for s in shared.scenes] == [
+        ("Accroche", "Accroche.", 0.0, 4.0, 4.0),
+        ("Contexte", "Contexte.", 4.0, 11.5, 7.5),
+    ]
+    assert shared.total_duration == 11.5
+    assert all(s.primary_asset.local_path.startswith(str(job_dir / "footage")) for s in shared.scenes)
+    shared_footage, _ = checkpoint.load_unchecked(job_dir / "checkpoints", "footage", FootageResult)
+    assert [(s.scene_name, s.duration) for s in shared_footage.scenes] == [("Accroche", 4.0), ("Contexte", 7.5)]
+
+    segments = sorted(p.name for p in (job_dir / "segments").iterdir())
+    assert segments == ["scene_1_abc.mp4", "scene_2_abc.mp4"]
+    assert (job_dir / "segments" / "scene_1_abc.mp4").stat().st_ino == \
+        (source_dir / "segments" / "scene_1_abc.mp4").stat().st_ino
+
+
+def _speculative_script(*narrations):
+    from models import Script
+
+    return Script(full_text=" ".join(narrations), total_word_count=len(narrations), estimated_duration_minutes=0.1,
+                  scenes=[{"scene_id": f"scene_{i + 1}", "name": f"Scene {i + 1}", "narration": text,
+                           "word_count": 2, "estimated_duration_seconds": 1, "visual_keywords": ["Petra"]}
+                          for i, text in enumerate(narrations)])
+
+
+class _Voice:
+    """Stands in for the ElevenLabs client: every conversion waits for ``gate``."""
+
+    def __init__(self):
+        self.voiced = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.text_to_speech = self
+
+    def convert(self, text, **kwargs):
+        self.voiced.append(text)
+        self.started.set()
+        assert self.gate.wait(5)
+        return [b"\0\0" * 10]
+
+
+def _drain_speculative_work(job_id):
+    deadline = time.time() + 5
+    while any(jid == job_id for jid, _kind in list(orchestrator._speculative)):
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_cancel_stops_speculative_voice_and_footage(monkeypatch):
+    from pipeline import footage, tts_gen
+
+    voice = _Voice()
+    monkeypatch.setattr(tts_gen, "_client", lambda: voice)
+    searched, search_started = [], threading.Event()
+
+    def videos(keyword, per_page):
+        searched.append(keyword)
+        search_started.set()
+        assert voice.gate.wait(5)
+        return []
+
+    monkeypatch.setattr(footage, "_search_pexels_videos", videos)
+    monkeypatch.setattr(footage, "_search_pexels_photos", lambda keyword, per_page: [])
+    job_id = store.create_job({"title": "Petra"}).job_id
+    req = GenerateRequest(title="Petra", prompt="A documentary about Petra", speculative_tts=True,
+                          prefetch_footage=True)
+
+    orchestrator._start_speculative_work(job_id, _speculative_script("Scene one.", "Scene two."), req)
+    assert voice.started.wait(5) and search_started.wait(5)
+    orchestrator.cancel_speculative_work(job_id)
+    voice.gate.set()
+    _drain_speculative_work(job_id)
+
+    assert voice.voiced == ["Scene one."]
+    assert searched == ["Petra"]
+    assert len(tts_gen._segment_locks) == 0 and len(footage._scene_locks) == 0
+
+
+def test_script_edit_supersedes_the_speculative_pass(monkeypatch):
+    import numpy as np
+    from config import config
+    from pipeline import tts_gen
+
+    voice = _Voice()
+    monkeypatch.setattr(tts_gen, "_client", lambda: voice)
+    job_id = store.create_job({"title": "Petra"}).job_id
+    job_dir = config.TEMP_DIR / job_id
+    req = GenerateRequest(title="Petra", prompt="A documentary about Petra", speculative_tts=True)
+    before = _speculative_script("Scene one.", "Scene two.")
+    after = _speculative_script("Scene one.", "Scene two, rewritten.")
+    stale = tts_gen._segment_path(job_dir, before.scenes[1], req.voice_id)
+    stale.parent.mkdir(parents=True)
+    np.save(stale, np.zeros(10, dtype=np.float32))
+    monkeypatch.setattr(orchestrator, "modify_script", lambda script, instruction, targeted, cancel=None: after)
+
+    orchestrator._start_speculative_work(job_id, before, req)
+    assert voice.started.wait(5)  # the first pass is synthesizing scene 1
+    asyncio.run(orchestrator.run_pipeline_script_edit(job_id, before, "Rewrite scene 2", req))
+    assert not stale.exists()
+    voice.gate.set()
+    _drain_speculative_work(job_id)
+
+    # Scene 1 is voiced once: the new pass waits on its segment lock and reuses it
+    assert voice.voiced == ["Scene one.", "Scene two, rewritten."]
+    assert sorted(p.name for p in stale.parent.iterdir()) == sorted(
+        tts_gen._segment_path(job_dir, s, req.voice_id).name for s in after.scenes)
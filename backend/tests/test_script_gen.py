@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from pipeline import analyzer, script_gen
+
+ANALYSIS = {
+    "topic": "Petra",
+    "talking_points": [
+        {"index": 1, "title": "Carving", "content": "How the city was cut into rock",
+         "visual_keywords": ["Petra treasury", "sandstone cliffs"]},
+        {"index": 2, "title": "Water", "content": "Nabataean water management",
+         "visual_keywords": ["desert cistern"]},
+    ],
+    "tone": "educational",
+    "style": "documentary",
+    "estimated_duration_minutes": 5,
+    "visual_elements": ["rock-cut facades"],
+    "language": "en",
+}
+
+SCRIPT = {
+    "full_text": "Hook text.\n\nContext text.",
+    "scenes": [
+        {"scene_id": "scene_1", "name": "Hook", "narration": "Hook text.", "word_count": 2,
+         "estimated_duration_seconds": 1, "visual_keywords": ["Petra"]},
+        {"scene_id": "scene_2", "name": "Context", "narration": "Context text.", "word_count": 2,
+         "estimated_duration_seconds": 1, "visual_keywords": ["Jordan desert"]},
+    ],
+    "total_word_count": 4,
+    "estimated_duration_minutes": 5,
+}
+
+
+def test_fused_call_matches_two_call_path(monkeypatch, fake_claude):
+    two_call = fake_claude(json.dumps(ANALYSIS), json.dumps(SCRIPT))
+    monkeypatch.setattr(analyzer, "client", two_call)
+    monkeypatch.setattr(script_gen, "client", two_call)
+    analysis = analyzer.analyze_prompt("Petra", "A documentary about Petra", "documentary", 5, "en")
+    script = script_gen.generate_script("Petra", analysis, 5)
+
+    fused = fake_claude(json.dumps({"analysis": ANALYSIS, "script": SCRIPT}))
+    monkeypatch.setattr(script_gen, "client", fused)
+    fused_analysis, fused_script = script_gen.analyze_and_generate_script(
+        "Petra", "A documentary about Petra", "documentary", 5, "en")
+
+    assert len(two_call.calls) == 2 and len(fused.calls) == 1
+    assert fused_analysis == analysis
+    assert fused_script == script
+
+
+def test_fused_analysis_falls_back_to_requested_language(monkeypatch, fake_claude):
+    analysis = {k: v for k, v in ANALYSIS.items() if k != "language"}
+    monkeypatch.setattr(script_gen, "client", fake_claude(json.dumps({"analysis": analysis, "script": SCRIPT})))
+    fused_analysis, _ = script_gen.analyze_and_generate_script("Petra", "A documentary about Petra",
+                                                               "documentary", 5, "es")
+    assert fused_analysis.language == "es"
+    assert fused_analysis == analyzer._analysis_from_data(analysis, "es")
+
+
+def _scene_reply(words):
+    return json.dumps({"narration": " ".join(["word"] * words), "visual_keywords": ["Petra"]})
+
+
+def test_long_talking_point_is_split_across_scenes(monkeypatch):
+    monkeypatch.setattr(script_gen.config, "NARRATION_WPM", 150)
+    analysis = analyzer._analysis_from_data({**ANALYSIS, "talking_points": ANALYSIS["talking_points"][:1]}, "en")
+    outline = script_gen._build_outline(analysis, 60)
+    points = [e for e in outline if e["name"].startswith("Carving")]
+    assert len(points) > 1
+    assert all(e["words"] <= script_gen._MAX_SCENE_WORDS for e in outline)
+    assert [e["scene_id"] for e in outline] == [f"scene_{i + 1}" for i in range(len(outline))]
+
+
+def test_truncated_scene_is_retried_with_larger_budget(monkeypatch, fake_claude):
+    fake = fake_claude(('{"narration": "cut of', "max_tokens"), _scene_reply(50))
+    monkeypatch.setattr(script_gen, "client", fake)
+    analysis = analyzer._analysis_from_data(ANALYSIS, "en")
+    outline = script_gen._build_outline(analysis, 20)
+    scene = script_gen._expand_scene("Petra", analysis, outline, 2)
+
+    assert scene.word_count == 50
+    assert fake.calls[1]["max_tokens"] == 2 * fake.calls[0]["max_tokens"]
+
+
+def test_scene_still_truncated_after_retry_fails(monkeypatch, fake_claude):
+    fake = fake_claude(('{"narration": "cut', "max_tokens"), ('{"narration": "still cut', "max_tokens"))
+    monkeypatch.setattr(script_gen, "client", fake)
+    analysis = analyzer._analysis_from_data(ANALYSIS, "en")
+    outline = script_gen._build_outline(analysis, 20)
+    with pytest.raises(script_gen.llm_cache.Truncated):
+        script_gen._expand_scene("Petra", analysis, outline, 2)
+
+
+def test_targeted_edit_leaves_echoed_neighbours_untouched(monkeypatch, fake_claude):
+    script = script_gen.Script(**SCRIPT)
+    rewrite = {"scenes": [
+        {"scene_id": "scene_1", "name": "Hook", "narration": "A rewritten hook.", "visual_keywords": ["Petra"]},
+        {"scene_id": "scene_2", "name": "Context", "narration": "Context, now shorter.",
+         "visual_keywords": ["Jordan desert"]},
+    ]}
+    fake = fake_claude(json.dumps({"scene_ids": ["scene_2"]}), json.dumps(rewrite))
+    monkeypatch.setattr(script_gen, "client", fake)
+
+    edited = script_gen.modify_script(script, "Shorten the context scene")
+
+    assert len(fake.calls) == 2
+    assert edited.scenes[0] == script.scenes[0]
+    assert edited.scenes[1].narration == "Context, now shorter."
@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import storage as storage_module
+from storage import LocalStorage, S3Storage
+
+
+def test_local_publish_copies_or_moves_into_the_job_directory(tmp_path):
+    store = LocalStorage(tmp_path / "outputs")
+    staged = tmp_path / "script.txt"
+    staged.write_text("narration")
+
+    store.put("job", "script.txt", staged)
+    assert staged.exists()
+    store.put("job", "hls/index.m3u8", staged, move=True)
+    assert not staged.exists()
+
+    assert store.local_path("job", "hls/index.m3u8") == tmp_path / "outputs" / "job" / "hls" / "index.m3u8"
+    assert store.local_path("job", "missing.txt") is None
+    assert store.stat("job", "script.txt")[0] == len("narration")
+    with store.open("job", "script.txt") as f:
+        assert f.read() == b"narration"
+    assert store.presigned_url("job", "script.txt") is None
+    assert store.delete_job("job") == 2 * len("narration")
+    assert store.stat("job", "script.txt") is None
+
+
+def test_local_publish_of_a_file_already_in_place_is_a_no_op(tmp_path):
+    store = LocalStorage(tmp_path)
+    (tmp_path / "job").mkdir()
+    (tmp_path / "job" / "final_video.mp4").write_bytes(b"mp4")
+    store.put("job", "final_video.mp4", tmp_path / "job" / "final_video.mp4", move=True)
+    assert (tmp_path / "job" / "final_video.mp4").read_bytes() == b"mp4"
+
+
+class _S3Client:
+    """Records the S3 calls S3Storage makes; ``objects`` maps keys to sizes."""
+
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.uploads = []
+        self.deleted = []
+
+    def upload_file(self, src, bucket, key, ExtraArgs=None, Config=None):
+        self.uploads.append((bucket, key, ExtraArgs, Config))
+
+    def head_object(self, Bucket, Key):
+        from botocore.exceptions import ClientError
+
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": self.objects[Key], "LastModified": datetime(2026, 1, 1, tzinfo=timezone.utc)}
+
+    def generate_presigned_url(self, method, Params, ExpiresIn):
+        query = [f"{k}={v}" for k, v in sorted(Params.items()) if k not in ("Bucket", "Key")]
+        return f"https://{Params['Bucket']}.s3.example.com/{Params['Key']}?" + "&".join(query + [f"expires={ExpiresIn}"])
+
+    def get_paginator(self, name):
+        listed = [{"Key": k, "Size": size} for k, size in sorted(self.objects.items())]
+        return SimpleNamespace(paginate=lambda Bucket, Prefix: [
+            {"Contents": [o for o in listed[:2] if o["Key"].startswith(Prefix)]},
+            {"Contents": [o for o in listed[2:] if o["Key"].startswith(Prefix)]},
+            {},  # a page past the last object has no Contents
+        ])
+
+    def delete_objects(self, Bucket, Delete):
+        self.deleted += [o["Key"] for o in Delete["Objects"]]
+
+
+@pytest.fixture
+def s3():
+    pytest.importorskip("botocore")
+    store = S3Storage.__new__(S3Storage)  # skip boto3.client: the stub stands in for it
+    store.bucket, store.prefix, store.transfer = "videos", "jobs/", "transfer-config"
+    store.client = _S3Client({"jobs/job/final_video.mp4": 300, "jobs/job/hls/index.m3u8": 20,
+                              "jobs/job/script.txt": 10, "jobs/other/script.txt": 5})
+    return store
+
+
+def test_s3_keys_are_prefixed_and_typed(s3, tmp_path):
+    staged = tmp_path / "seg_00000.m4s"
+    staged.write_bytes(b"m4s")
+    s3.put("job", "hls/seg_00000.m4s", staged, move=True)
+    assert s3.client.uploads == [
+        ("videos", "jobs/job/hls/seg_00000.m4s", {"ContentType": "video/iso.segment"}, "transfer-config")]
+    assert not staged.exists()
+
+
+def test_s3_urls_are_presigned_only_for_existing_objects(s3, monkeypatch):
+    monkeypatch.setattr(storage_module.config, "S3_PRESIGN_EXPIRES_S", 600)
+    assert s3.stat("job", "script.txt") == (10, datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp())
+    assert s3.presigned_url("job", "final_video.mp4") == \
+        "https://videos.s3.example.com/jobs/job/final_video.mp4?expires=600"
+    assert s3.presigned_url("job", "script.txt", "script.txt") == (
+        "https://videos.s3.example.com/jobs/job/script.txt"
+        '?ResponseContentDisposition=attachment; filename="script.txt"&expires=600')
+    assert s3.stat("job", "missing.txt") is None
+    assert s3.presigned_url("job", "missing.txt") is None
+    assert s3.local_path("job", "script.txt") is None
+
+
+def test_s3_delete_job_removes_only_that_job(s3):
+    assert s3.delete_job("job") == 330
+    assert sorted(s3.client.deleted) == ["jobs/job/final_video.mp4", "jobs/job/hls/index.m3u8",
+                                         "jobs/job/script.txt"]
+
+
+def test_downloads_redirect_to_presigned_urls(s3, monkeypatch):
+    monkeypatch.setattr(main, "storage", s3)
+    client = TestClient(main.app)
+
+    r = client.get("/api/download/job/script.txt", follow_redirects=False)
+    assert r.status_code == 307
+    assert r.headers["location"].startswith("https://videos.s3.example.com/jobs/job/script.txt?")
+    assert client.get("/api/download/job/missing.txt", follow_redirects=False).status_code == 404
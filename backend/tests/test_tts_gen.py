@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from models import Scene, Script, TTSResult
+from pipeline import tts_gen
+
+RATE = tts_gen.SAMPLE_RATE
+
+
+def _tone(seconds, level):
+    return np.full(int(RATE * seconds), level, dtype=np.float32)
+
+
+def _scene(scene_id):
+    return Scene(scene_id=scene_id, name=scene_id, narration=f"Narration of {scene_id}.", word_count=3,
+                 estimated_duration_seconds=1, visual_keywords=[])
+
+
+@pytest.fixture
+def voiced(tmp_path, monkeypatch):
+    """A three-scene voiceover on disk, laid out the way generate_tts writes it."""
+    monkeypatch.setattr(tts_gen, "_client", lambda: None)
+    parts = [_tone(1.0, 0.1), _tone(0.5, 0.2), _tone(0.75, 0.3)]
+    gap = np.zeros(tts_gen.SILENCE_SAMPLES, dtype=np.float32)
+    timings, offset = [], 0
+    for i, part in enumerate(parts):
+        timings.append(tts_gen._timing(f"scene_{i + 1}", offset, len(part)))
+        offset += len(part) + len(gap)
+    audio = np.concatenate([parts[0], gap, parts[1], gap, parts[2]])
+    path = tmp_path / "voiceover.wav"
+    sf.write(str(path), audio, RATE)
+    script = Script(full_text="", scenes=[_scene(f"scene_{i + 1}") for i in range(3)],
+                    total_word_count=9, estimated_duration_minutes=0.1)
+    tts = TTSResult(audio_path=str(path), total_duration_seconds=len(audio) / RATE, scenes=timings)
+    return script, tts, parts, gap
+
+
+@pytest.mark.parametrize("seconds", [1.5, 0.2], ids=["grow", "shrink"])
+def test_regenerate_scene_splices_in_place(voiced, monkeypatch, tmp_path, seconds):
+    script, tts, parts, gap = voiced
+    new = _tone(seconds, -0.4)
+    monkeypatch.setattr(tts_gen, "synthesize_scene", lambda *args, **kwargs: new)
+    monkeypatch.setattr(tts_gen, "generate_tts", lambda *a, **k: pytest.fail("fell back to re-assembly"))
+
+    result = tts_gen.regenerate_scene(script, tts, "scene_2", "voice", tmp_path)
+
+    expected = np.concatenate([parts[0], gap, new, gap, parts[2]])
+    audio, rate = sf.read(result.audio_path, dtype="float32")
+    assert rate == RATE and len(audio) == len(expected)
+    assert np.allclose(audio, expected, atol=1 / 32768)
+
+    delta = len(new) - len(parts[1])
+    first, second, third = result.scenes
+    assert first == tts.scenes[0]
+    assert (second["start_sample"], second["num_samples"]) == (tts.scenes[1]["start_sample"], len(new))
+    assert third["start_sample"] == tts.scenes[2]["start_sample"] + delta
+    assert third["num_samples"] == len(parts[2])
+    assert result.total_duration_seconds == round(len(expected) / RATE, 2)
+    assert tts_gen._peaks_path(tmp_path / "voiceover.wav").exists()
+
+
+def test_regenerate_scene_without_sample_timings_reassembles(voiced, monkeypatch, tmp_path):
+    script, tts, _, _ = voiced
+    legacy = tts.model_copy(update={"scenes": [
+        {k: v for k, v in t.items() if k not in ("start_sample", "num_samples")} for t in tts.scenes]})
+    monkeypatch.setattr(tts_gen, "synthesize_scene", lambda *args, **kwargs: _tone(0.3, 0.5))
+    monkeypatch.setattr(tts_gen, "generate_tts", lambda *a, **k: "reassembled")
+    assert tts_gen.regenerate_scene(script, legacy, "scene_2", "voice", tmp_path) == "reassembled"
@@ -2,7 +2,7 @@
 
 import { useState, useEffect, useRef, useCallback } from 'react';
 import { Job, GenerateRequest } from '@/types';
-import { generateVideo, getJob, getScript, editScript, regenerateVoice, approveScript, approveVoice } from '@/lib/api';
+import { generateVideo, getJob, getScript, editScript, regenerateVoice, regenerateSceneVoice, approveScript, approveVoice, cancelJob, deriveVariant } from '@/lib/api';
 import VideoForm from '@/components/VideoForm';
 import PipelineStatus from '@/components/PipelineStatus';
 import ResultPanel from '@/components/ResultPanel';
@@ -22,6 +22,8 @@ export default function Home() {
   const [isLoading, setIsLoading] = useState(false);
   const [submitError, setSubmitError] = useState<string | null>(null);
   const pollRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  // Idempotency-Key of the submission awaiting its response: a resubmit after a lost response reuses it
+  const submitKeyRef = useRef<string | null>(null);
 
   // Script & voice state
   const [scriptData, setScriptData] = useState<ScriptData | null>(null);
@@ -52,7 +54,7 @@ export default function Home() {
   // Poll active job
   useEffect(() => {
     if (!activeJob) return;
-    if (activeJob.status === 'completed' || activeJob.status === 'failed') {
+    if (activeJob.status === 'completed' || activeJob.status === 'failed' || activeJob.status === 'cancelled') {
       if (pollRef.current) clearInterval(pollRef.current);
       setIsLoading(false);
       return;
@@ -68,14 +70,14 @@ export default function Home() {
         if (step2?.status === 'completed' && !scriptData) {
           fetchScript(updated.job_id);
         }
-        // Re-fetch script after edit (step 2 running again)
-        if (step2?.status === 'running') {
+        // Re-fetch script after edit (step 2 running again); variants have no approvals to reset
+        if (step2?.status === 'running' && !updated.config.variant_of) {
           setScriptData(null);
           setScriptApproved(false);
           setVoiceApproved(false);
         }
 
-        if (updated.status === 'completed' || updated.status === 'failed') {
+        if (updated.status === 'completed' || updated.status === 'failed' || updated.status === 'cancelled') {
           clearInterval(pollRef.current!);
           setIsLoading(false);
           // Fetch final script if available
@@ -96,16 +98,42 @@ export default function Home() {
     setScriptData(null);
     setScriptApproved(false);
     setVoiceApproved(false);
+    submitKeyRef.current ??= crypto.randomUUID();
     try {
-      const { job_id } = await generateVideo(req);
+      const { job_id } = await generateVideo(req, submitKeyRef.current);
+      submitKeyRef.current = null;
       const job = await getJob(job_id);
       setActiveJob(job);
     } catch (e: unknown) {
+      // fetch rejects with a TypeError when no response arrived, and the job may have started anyway
+      if (!(e instanceof TypeError)) submitKeyRef.current = null;
       setSubmitError(e instanceof Error ? e.message : 'Unknown error');
       setIsLoading(false);
     }
   };
 
+  // A variant is a new job that runs straight through: its script and voice need no approval
+  const handleDeriveVariant = async (language: string) => {
+    if (!activeJob) return;
+    const { job_id } = await deriveVariant(activeJob.job_id, language);
+    const job = await getJob(job_id);
+    setScriptData(null);
+    setScriptApproved(true);
+    setVoiceApproved(true);
+    setIsLoading(true);
+    setActiveJob(job);
+  };
+
+  const handleCancel = async () => {
+    if (!activeJob) return;
+    try {
+      await cancelJob(activeJob.job_id);
+      setActiveJob(await getJob(activeJob.job_id));
+    } catch {
+      // job already finished — the next poll shows its final state
+    }
+  };
+
   const handleReset = () => {
     setActiveJob(null);
     setScriptData(null);
@@ -154,6 +182,17 @@ export default function Home() {
     }
   };
 
+  const handleRegenerateSceneVoice = async (sceneId: string) => {
+    if (!activeJob) return;
+    setIsRegenerating(true);
+    try {
+      await regenerateSceneVoice(activeJob.job_id, sceneId);
+      setVoiceApproved(false);
+    } finally {
+      setIsRegenerating(false);
+    }
+  };
+
   // ── No active job: show form ───────────────────────────────────────────────
   if (!activeJob) {
     return (
@@ -220,6 +259,7 @@ export default function Home() {
               <span className={`text-xs px-2 py-0.5 rounded-full font-medium ${
                 activeJob.status === 'completed' ? 'bg-green-400/10 text-green-300'
                 : activeJob.status === 'failed'  ? 'bg-red-400/10 text-red-300'
+                : activeJob.status === 'cancelled' ? 'bg-[#30363d] text-[#8b949e]'
                 : 'bg-brand/10 text-brand-light'
               }`}>
                 {activeJob.status}
@@ -233,6 +273,14 @@ export default function Home() {
               sidebar
             />
           </div>
+          {(activeJob.status === 'pending' || activeJob.status === 'running') && (
+            <button
+              onClick={handleCancel}
+              className="text-xs text-red-300 hover:text-red-200 px-3 py-2 rounded-lg border border-red-400/30 hover:border-red-400/60 transition-all"
+            >
+              Cancel job
+            </button>
+          )}
           <button
             onClick={handleReset}
             className="text-xs text-[#8b949e] hover:text-[#e6edf3] px-3 py-2 rounded-lg border border-[#30363d] hover:border-[#484f58] transition-all"
@@ -248,10 +296,11 @@ export default function Home() {
               <span className="inline-block w-10 h-10 border-3 border-brand border-t-transparent rounded-full animate-spin" />
               <div>
                 <p className="text-[#e6edf3] font-medium">
-                  {activeJob.status === 'failed' ? 'Pipeline failed' : 'Generating…'}
+                  {activeJob.status === 'failed' ? 'Pipeline failed'
+                    : activeJob.status === 'cancelled' ? 'Job cancelled' : 'Generating…'}
                 </p>
                 <p className="text-[#484f58] text-sm mt-1">
-                  {activeJob.status === 'failed'
+                  {activeJob.status === 'failed' || activeJob.status === 'cancelled'
                     ? activeJob.error
                     : 'Script will appear here once ready'}
                 </p>
@@ -285,6 +334,7 @@ export default function Home() {
                   approved={voiceApproved}
                   onApprove={handleApproveVoice}
                   onRegenerate={handleRegenerateVoice}
+                  onRegenerateScene={handleRegenerateSceneVoice}
                   isRegenerating={isRegenerating}
                 />
               </div>
@@ -294,7 +344,12 @@ export default function Home() {
           {contentView === 'result' && activeJob.result && (
             <div className="h-full rounded-xl border border-[#21262d] bg-[#161b22] p-6 overflow-y-auto">
               <h2 className="font-semibold text-[#e6edf3] mb-4">Deliverables</h2>
-              <ResultPanel result={activeJob.result} jobId={activeJob.job_id} />
+              <ResultPanel
+                result={activeJob.result}
+                jobId={activeJob.job_id}
+                language={String(activeJob.config.language ?? 'en')}
+                onDeriveVariant={handleDeriveVariant}
+              />
             </div>
           )}
 
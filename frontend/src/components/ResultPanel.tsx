@@ -1,10 +1,62 @@
 'use client';
 
+import { useEffect, useState } from 'react';
 import { JobResult } from '@/types';
 
 interface Props {
   result: JobResult;
   jobId: string;
+  language: string;
+  onDeriveVariant: (language: string) => Promise<void>;
+}
+
+const LANGUAGES: Record<string, string> = {
+  en: 'English',
+  es: 'Spanish',
+  fr: 'French',
+  de: 'German',
+  pt: 'Portuguese',
+};
+
+function VariantRow({ language, onDerive }: { language: string; onDerive: (language: string) => Promise<void> }) {
+  const choices = Object.keys(LANGUAGES).filter((l) => l !== language);
+  const [target, setTarget] = useState(choices[0]);
+  const [busy, setBusy] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  const derive = async () => {
+    setBusy(true);
+    setError(null);
+    try {
+      await onDerive(target);
+    } catch (e: unknown) {
+      setError(e instanceof Error ? e.message : 'Variant failed');
+      setBusy(false);
+    }
+  };
+
+  return (
+    <div className="space-y-2">
+      <p className="text-xs text-[#484f58] uppercase tracking-wider">Other Languages</p>
+      <div className="flex gap-2">
+        <select value={target} onChange={(e) => setTarget(e.target.value)} className="input flex-1" disabled={busy}>
+          {choices.map((l) => (
+            <option key={l} value={l}>{LANGUAGES[l]}</option>
+          ))}
+        </select>
+        <button
+          type="button"
+          onClick={derive}
+          disabled={busy}
+          className="px-4 rounded-lg border border-brand/50 text-sm text-brand-light hover:bg-brand/10 transition-all disabled:opacity-40"
+        >
+          {busy ? 'Starting…' : 'Translate video'}
+        </button>
+      </div>
+      <p className="text-xs text-[#484f58]">Reuses this video&apos;s footage and edit; only the narration is redone.</p>
+      {error && <p className="text-xs text-red-400">{error}</p>}
+    </div>
+  );
 }
 
 function DownloadRow({ label, url, ext }: { label: string; url: string | null; ext: string }) {
@@ -35,9 +87,11 @@ function extIcon(ext: string) {
   const icons: Record<string, string> = {
     mp4: '🎬',
     mp3: '🎙️',
+    opus: '🎙️',
     txt: '📝',
     json: '📋',
     srt: '💬',
+    zip: '📦',
   };
   return icons[ext] ?? '📄';
 }
@@ -49,7 +103,14 @@ function formatDuration(seconds: number | null) {
   return `${m}m ${s}s`;
 }
 
-export default function ResultPanel({ result, jobId }: Props) {
+export default function ResultPanel({ result, jobId, language, onDeriveVariant }: Props) {
+  // Browsers with native HLS (Safari, iOS) start from the playlist; others get the faststart MP4
+  const [playbackUrl, setPlaybackUrl] = useState(result.final_video);
+  useEffect(() => {
+    const nativeHls = document.createElement('video').canPlayType('application/vnd.apple.mpegurl') !== '';
+    setPlaybackUrl(result.stream_playlist && nativeHls ? result.stream_playlist : result.final_video);
+  }, [result.stream_playlist, result.final_video]);
+
   return (
     <div className="space-y-4">
       {/* Duration badge */}
@@ -64,21 +125,47 @@ export default function ResultPanel({ result, jobId }: Props) {
       {result.final_video && (
         <div className="rounded-xl border border-brand/40 bg-brand/5 p-4">
           <p className="text-brand-light font-semibold text-sm mb-3">Final Video</p>
+          {playbackUrl && (
+            <video src={playbackUrl} controls preload="metadata" className="w-full rounded-lg mb-3 bg-black" />
+          )}
           <DownloadRow label="final_video" url={result.final_video} ext="mp4" />
+          {result.renditions?.slice(1).map((r) => (
+            <div key={r.video_format} className="mt-2">
+              <DownloadRow
+                label={`final_video ${r.video_format} (${r.resolution[0]}×${r.resolution[1]})`}
+                url={r.file}
+                ext="mp4"
+              />
+            </div>
+          ))}
         </div>
       )}
 
       {/* Other deliverables */}
       <div className="space-y-2">
         <p className="text-xs text-[#484f58] uppercase tracking-wider">All Deliverables</p>
+        <DownloadRow label="Everything (one archive)" url={`/api/download/${jobId}/bundle.zip`} ext="zip" />
         <DownloadRow label="Narration Script" url={result.script_file} ext="txt" />
-        <DownloadRow label="Voiceover Audio" url={result.voiceover_file} ext="mp3" />
+        {result.voiceover_files?.length ? (
+          result.voiceover_files.map((a) => (
+            <DownloadRow
+              key={a.format}
+              label={`Voiceover Audio (${a.bitrate_kbps} kbps, ${(a.size_bytes / 1e6).toFixed(1)} MB)`}
+              url={a.file}
+              ext={a.format}
+            />
+          ))
+        ) : (
+          <DownloadRow label="Voiceover Audio" url={result.voiceover_file} ext="mp3" />
+        )}
         <DownloadRow label="Asset List" url={result.asset_list_file} ext="json" />
         <DownloadRow label="Edit Timeline" url={result.timeline_file} ext="json" />
         {result.subtitles_file && (
           <DownloadRow label="Subtitles" url={result.subtitles_file} ext="srt" />
         )}
       </div>
+
+      <VariantRow language={language} onDerive={onDeriveVariant} />
     </div>
   );
 }
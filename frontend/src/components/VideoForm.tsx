@@ -46,6 +46,7 @@ export default function VideoForm({ onSubmit, isLoading }: Props) {
   const [language, setLanguage] = useState('en');
   const [bgMusic, setBgMusic] = useState(true);
   const [captions, setCaptions] = useState(false);
+  const [bothFormats, setBothFormats] = useState(false);
 
   const [voices, setVoices] = useState<Voice[]>([]);
   const [voicesLoading, setVoicesLoading] = useState(false);
@@ -85,6 +86,7 @@ export default function VideoForm({ onSubmit, isLoading }: Props) {
       language,
       add_background_music: bgMusic,
       add_captions: captions,
+      extra_formats: bothFormats ? [format === '16:9' ? '9:16' : '16:9'] : [],
     });
   };
 
@@ -218,6 +220,15 @@ export default function VideoForm({ onSubmit, isLoading }: Props) {
                 />
                 Captions (SRT)
               </label>
+              <label className="flex items-center gap-2 cursor-pointer text-sm text-[#8b949e]">
+                <input
+                  type="checkbox"
+                  checked={bothFormats}
+                  onChange={(e) => setBothFormats(e.target.checked)}
+                  className="accent-brand"
+                />
+                Also render {format === '16:9' ? '9:16 (Shorts)' : '16:9 (YouTube)'}
+              </label>
             </div>
           </div>
         </div>
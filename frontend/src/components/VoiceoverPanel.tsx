@@ -2,12 +2,15 @@
 
 import { useEffect, useRef, useState, useMemo } from 'react';
 import SlideToApprove from './SlideToApprove';
+import { getVoicePeaks } from '@/lib/api';
+import { VoicePeaks } from '@/types';
 
 interface Props {
   jobId: string;
   approved: boolean;
   onApprove: () => void;
   onRegenerate: () => void;
+  onRegenerateScene: (sceneId: string) => void;
   isRegenerating: boolean;
 }
 
@@ -19,21 +22,37 @@ function formatTime(sec: number) {
   return `${m}:${String(s).padStart(2, '0')}`;
 }
 
-export default function VoiceoverPanel({ jobId, approved, onApprove, onRegenerate, isRegenerating }: Props) {
+export default function VoiceoverPanel({ jobId, approved, onApprove, onRegenerate, onRegenerateScene, isRegenerating }: Props) {
   const audioRef = useRef<HTMLAudioElement>(null);
   const [playing, setPlaying] = useState(false);
   const [currentTime, setCurrentTime] = useState(0);
   const [duration, setDuration] = useState(0);
+  const [peaks, setPeaks] = useState<VoicePeaks | null>(null);
 
   const audioUrl = `/api/jobs/${jobId}/voice`;
 
-  // Pseudo-random waveform seeded by bar index
-  const waveform = useMemo(() =>
-    Array.from({ length: BARS }, (_, i) => {
-      const v = Math.abs(Math.sin(i * 2.3) * 0.4 + Math.sin(i * 0.9) * 0.35 + Math.cos(i * 1.5) * 0.25);
-      return Math.max(0.12, Math.min(1, v));
-    }),
-  []);
+  // Precomputed peaks; refetched once a regeneration finishes
+  useEffect(() => {
+    if (isRegenerating) return;
+    let stale = false;
+    getVoicePeaks(jobId).then((p) => { if (!stale) setPeaks(p); }).catch(() => {});
+    return () => { stale = true; };
+  }, [jobId, isRegenerating]);
+
+  // One bar per slice of peaks; a flat placeholder until they arrive
+  const waveform = useMemo(() => {
+    if (!peaks || peaks.length === 0) return Array.from({ length: BARS }, () => 0.12);
+    const full = 2 ** (peaks.bits - 1);
+    return Array.from({ length: BARS }, (_, i) => {
+      const from = Math.floor((i * peaks.length) / BARS);
+      const to = Math.max(from + 1, Math.floor(((i + 1) * peaks.length) / BARS));
+      let amp = 0;
+      for (let j = from; j < to && j < peaks.length; j++) {
+        amp = Math.max(amp, -peaks.data[2 * j], peaks.data[2 * j + 1]);
+      }
+      return Math.max(0.12, Math.min(1, amp / full));
+    });
+  }, [peaks]);
 
   useEffect(() => {
     const audio = audioRef.current;
@@ -69,6 +88,17 @@ export default function VoiceoverPanel({ jobId, approved, onApprove, onRegenerat
     onRegenerate();
   };
 
+  const handleRegenerateScene = (sceneId: string) => {
+    const audio = audioRef.current;
+    if (audio) { audio.pause(); setPlaying(false); }
+    onRegenerateScene(sceneId);
+  };
+
+  const seek = (sec: number) => {
+    const audio = audioRef.current;
+    if (audio) audio.currentTime = sec;
+  };
+
   const progress = duration > 0 ? currentTime / duration : 0;
 
   return (
@@ -131,6 +161,33 @@ export default function VoiceoverPanel({ jobId, approved, onApprove, onRegenerat
           </div>
         </div>
 
+        {/* Scenes: jump to one, or re-voice just that scene */}
+        {peaks && peaks.scenes.length > 0 && (
+          <div className="flex-1 min-h-0 overflow-y-auto space-y-1">
+            {peaks.scenes.map((scene, i) => (
+              <div
+                key={scene.scene_id}
+                className="flex items-center justify-between gap-3 px-3 py-2 rounded-lg border border-[#21262d] text-xs"
+              >
+                <button
+                  onClick={() => seek(scene.start_time)}
+                  className="text-[#8b949e] hover:text-[#e6edf3] transition-colors tabular-nums text-left"
+                >
+                  Scene {i + 1} · {formatTime(scene.start_time)}–{formatTime(scene.end_time)}
+                </button>
+                <button
+                  onClick={() => handleRegenerateScene(scene.scene_id)}
+                  disabled={approved || isRegenerating}
+                  title="Regenerate this scene's voice only"
+                  className="text-brand-light hover:text-[#e6edf3] transition-colors disabled:opacity-40 disabled:cursor-not-allowed"
+                >
+                  Re-voice
+                </button>
+              </div>
+            ))}
+          </div>
+        )}
+
         <audio ref={audioRef} src={audioUrl} preload="metadata" />
       </div>
 
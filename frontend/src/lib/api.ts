@@ -1,11 +1,16 @@
-import { GenerateRequest, Job, Voice } from '@/types';
+import { GenerateRequest, Job, Voice, VoicePeaks } from '@/types';
 
 const BASE = '/api';
 
-export async function generateVideo(req: GenerateRequest): Promise<{ job_id: string }> {
+export async function generateVideo(
+  req: GenerateRequest,
+  idempotencyKey?: string,
+): Promise<{ job_id: string; deduplicated: boolean }> {
+  const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+  if (idempotencyKey) headers['Idempotency-Key'] = idempotencyKey;
   const res = await fetch(`${BASE}/generate`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers,
     body: JSON.stringify(req),
   });
   if (!res.ok) {
@@ -21,6 +26,12 @@ export async function getJob(jobId: string): Promise<Job> {
   return res.json();
 }
 
+export async function getVoicePeaks(jobId: string, resolution = 4096): Promise<VoicePeaks> {
+  const res = await fetch(`${BASE}/jobs/${jobId}/voice/peaks?resolution=${resolution}`);
+  if (!res.ok) throw new Error('Voice not ready yet');
+  return res.json();
+}
+
 export async function getVoices(): Promise<Voice[]> {
   const res = await fetch(`${BASE}/voices`);
   if (!res.ok) return [];
@@ -56,6 +67,23 @@ export async function regenerateVoice(jobId: string): Promise<void> {
   }
 }
 
+export async function deriveVariant(
+  jobId: string,
+  language: string,
+  voiceId?: string,
+): Promise<{ job_id: string }> {
+  const res = await fetch(`${BASE}/jobs/${jobId}/variants`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ language, voice_id: voiceId ?? null }),
+  });
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({ detail: res.statusText }));
+    throw new Error(err.detail || 'Variant failed');
+  }
+  return res.json();
+}
+
 export async function approveScript(jobId: string): Promise<void> {
   const res = await fetch(`${BASE}/jobs/${jobId}/approve-script`, { method: 'POST' });
   if (!res.ok) {
@@ -71,3 +99,19 @@ export async function approveVoice(jobId: string): Promise<void> {
     throw new Error(err.detail || 'Approval failed');
   }
 }
+
+export async function cancelJob(jobId: string): Promise<void> {
+  const res = await fetch(`${BASE}/jobs/${jobId}/cancel`, { method: 'POST' });
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({ detail: res.statusText }));
+    throw new Error(err.detail || 'Cancel failed');
+  }
+}
+
+export async function regenerateSceneVoice(jobId: string, sceneId: string): Promise<void> {
+  const res = await fetch(`${BASE}/jobs/${jobId}/voice/scenes/${sceneId}/regenerate`, { method: 'POST' });
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({ detail: res.statusText }));
+    throw new Error(err.detail || 'Regeneration failed');
+  }
+}
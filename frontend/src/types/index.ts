@@ -1,7 +1,8 @@
 export type VideoFormat = '16:9' | '9:16';
 export type VideoType = 'documentary' | 'top10' | 'mystery' | 'news' | 'educational';
+export type BlueprintPlanner = 'auto' | 'local' | 'llm';
 export type StepStatus = 'pending' | 'running' | 'completed' | 'failed' | 'skipped';
-export type JobStatus = 'pending' | 'running' | 'completed' | 'failed';
+export type JobStatus = 'pending' | 'running' | 'completed' | 'failed' | 'cancelled';
 
 export interface Voice {
   id: string;
@@ -25,10 +26,26 @@ export interface PipelineStep {
   completed_at: string | null;
 }
 
+export interface AudioDeliverable {
+  format: 'mp3' | 'opus';
+  file: string;
+  bitrate_kbps: number;
+  size_bytes: number;
+}
+
+export interface VideoRendition {
+  video_format: VideoFormat;
+  resolution: [number, number];
+  file: string;
+}
+
 export interface JobResult {
   final_video: string | null;
+  renditions: VideoRendition[];
   script_file: string | null;
   voiceover_file: string | null;
+  voiceover_files: AudioDeliverable[];
+  stream_playlist: string | null;
   asset_list_file: string | null;
   timeline_file: string | null;
   subtitles_file: string | null;
@@ -47,6 +64,34 @@ export interface Job {
   completed_at: string | null;
 }
 
+export interface JobSummary {
+  job_id: string;
+  title: string;
+  status: JobStatus;
+  current_step: number;
+  created_at: string;
+}
+
+export interface JobPage {
+  jobs: JobSummary[];
+  next_cursor: string | null;
+}
+
+export interface SceneBoundary {
+  scene_id: string;
+  start_time: number;
+  end_time: number;
+}
+
+export interface VoicePeaks {
+  sample_rate: number;
+  samples_per_peak: number;
+  bits: number;
+  length: number;
+  data: number[]; // interleaved min, max pairs
+  scenes: SceneBoundary[];
+}
+
 export interface GenerateRequest {
   title: string;
   prompt: string;
@@ -57,4 +102,9 @@ export interface GenerateRequest {
   language: string;
   add_background_music: boolean;
   add_captions: boolean;
+  fused_analysis?: boolean;
+  blueprint_planner?: BlueprintPlanner;
+  speculative_tts?: boolean;
+  prefetch_footage?: boolean;
+  extra_formats?: VideoFormat[];
 }